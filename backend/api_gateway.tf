@@ -7,6 +7,12 @@ resource "aws_api_gateway_rest_api" "main" {
     types = ["REGIONAL"]
   }
 
+  # Compressed responses are returned base64-encoded and only decoded for
+  # clients if their Accept header matches a binary media type. */* matches
+  # every request, so request bodies arrive base64-encoded too (get_body
+  # decodes them).
+  binary_media_types = var.response_compression ? ["*/*"] : []
+
   tags = {
     Environment = var.environment
   }
@@ -34,6 +40,20 @@ resource "aws_api_gateway_resource" "order_id" {
   path_part   = "{order_id}"
 }
 
+# /orders/batch Resource
+resource "aws_api_gateway_resource" "orders_batch" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  parent_id   = aws_api_gateway_resource.orders.id
+  path_part   = "batch"
+}
+
+# /orders/lookup Resource
+resource "aws_api_gateway_resource" "orders_lookup" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  parent_id   = aws_api_gateway_resource.orders.id
+  path_part   = "lookup"
+}
+
 # /coupons Resource
 resource "aws_api_gateway_resource" "coupons" {
   rest_api_id = aws_api_gateway_rest_api.main.id
@@ -245,6 +265,42 @@ resource "aws_api_gateway_integration" "get_order" {
   uri                     = module.get_order_lambda.lambda_function_qualified_invoke_arn
 }
 
+# POST /orders/batch - Create Orders in Bulk
+resource "aws_api_gateway_method" "create_orders_batch" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.orders_batch.id
+  http_method   = "POST"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+}
+
+resource "aws_api_gateway_integration" "create_orders_batch" {
+  rest_api_id             = aws_api_gateway_rest_api.main.id
+  resource_id             = aws_api_gateway_resource.orders_batch.id
+  http_method             = aws_api_gateway_method.create_orders_batch.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = module.create_orders_batch_lambda.lambda_function_qualified_invoke_arn
+}
+
+# POST /orders/lookup - Get Orders by ID
+resource "aws_api_gateway_method" "lookup_orders" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.orders_lookup.id
+  http_method   = "POST"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+}
+
+resource "aws_api_gateway_integration" "lookup_orders" {
+  rest_api_id             = aws_api_gateway_rest_api.main.id
+  resource_id             = aws_api_gateway_resource.orders_lookup.id
+  http_method             = aws_api_gateway_method.lookup_orders.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = module.get_order_lambda.lambda_function_qualified_invoke_arn
+}
+
 # OPTIONS /orders - CORS Preflight
 resource "aws_api_gateway_method" "orders_options" {
   rest_api_id   = aws_api_gateway_rest_api.main.id
@@ -284,7 +340,7 @@ resource "aws_api_gateway_integration_response" "orders_options" {
   status_code = aws_api_gateway_method_response.orders_options.status_code
 
   response_parameters = {
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,x-session-id,traceparent,tracestate'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,x-session-id,Idempotency-Key,traceparent,tracestate'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,POST,PUT,DELETE,OPTIONS'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
@@ -335,6 +391,96 @@ resource "aws_api_gateway_integration_response" "order_id_options" {
   }
 }
 
+# OPTIONS /orders/batch - CORS Preflight
+resource "aws_api_gateway_method" "orders_batch_options" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.orders_batch.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "orders_batch_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.orders_batch.id
+  http_method = aws_api_gateway_method.orders_batch_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "orders_batch_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.orders_batch.id
+  http_method = aws_api_gateway_method.orders_batch_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "orders_batch_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.orders_batch.id
+  http_method = aws_api_gateway_method.orders_batch_options.http_method
+  status_code = aws_api_gateway_method_response.orders_batch_options.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,x-session-id,traceparent,tracestate'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,POST,PUT,DELETE,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+}
+
+# OPTIONS /orders/lookup - CORS Preflight
+resource "aws_api_gateway_method" "orders_lookup_options" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.orders_lookup.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "orders_lookup_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.orders_lookup.id
+  http_method = aws_api_gateway_method.orders_lookup_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "orders_lookup_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.orders_lookup.id
+  http_method = aws_api_gateway_method.orders_lookup_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "orders_lookup_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.orders_lookup.id
+  http_method = aws_api_gateway_method.orders_lookup_options.http_method
+  status_code = aws_api_gateway_method_response.orders_lookup_options.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,x-session-id,traceparent,tracestate'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+}
+
 # API Gateway Deployment
 resource "aws_api_gateway_deployment" "main" {
   rest_api_id = aws_api_gateway_rest_api.main.id
@@ -349,6 +495,14 @@ resource "aws_api_gateway_deployment" "main" {
     aws_api_gateway_integration.validate_coupon_options,
     aws_api_gateway_integration.orders_options,
     aws_api_gateway_integration.order_id_options,
+    aws_api_gateway_integration.create_orders_batch,
+    aws_api_gateway_integration.orders_batch_options,
+    aws_api_gateway_integration.lookup_orders,
+    aws_api_gateway_integration.orders_lookup_options,
+    aws_api_gateway_method.lookup_orders,
+    aws_api_gateway_method.orders_lookup_options,
+    aws_api_gateway_method.create_orders_batch,
+    aws_api_gateway_method.orders_batch_options,
     aws_api_gateway_method.create_order,
     aws_api_gateway_method.list_orders,
     aws_api_gateway_method.get_order,
@@ -424,3 +578,11 @@ resource "aws_lambda_permission" "get_order" {
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
 }
+
+resource "aws_lambda_permission" "create_orders_batch" {
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = "${module.create_orders_batch_lambda.lambda_function_name}:${module.create_orders_batch_lambda.lambda_function_version}"
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
+}
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Compare order throughput of single create-order calls and create-orders-batch"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import boto3
+
+ITEMS = [
+    {"product_id": "6", "quantity": 2},  # Wireless Mouse
+    {"product_id": "5", "quantity": 1},  # USB-C Hub
+]
+
+
+def api_event(body, user_id):
+    """API Gateway proxy event as the Cognito authorizer would deliver it"""
+    return {
+        "httpMethod": "POST",
+        "headers": {"x-session-id": "benchmark"},
+        "body": json.dumps(body),
+        "requestContext": {
+            "authorizer": {
+                "claims": {
+                    "sub": user_id,
+                    "email": f"{user_id}@example.com",
+                    "cognito:username": user_id,
+                }
+            }
+        },
+    }
+
+
+def remote_invoker(environment):
+    """Invoke the environment's deployed functions"""
+    lambda_client = boto3.client("lambda")
+
+    def invoke(function_name, event):
+        response = lambda_client.invoke(
+            FunctionName=f"{environment}-{function_name}",
+            InvocationType="RequestResponse",
+            Payload=json.dumps(event),
+        )
+        return json.loads(response["Payload"].read())
+
+    return invoke
+
+
+def local_invoker():
+    """
+    Run the handlers in-process against moto, with the tables and products
+    bench_handlers seeds, so the comparison needs no AWS environment
+    """
+    import bench_handlers
+
+    os.environ.update(bench_handlers.ENVIRONMENT)
+    for layer in ("honeycomb-layer", "chaos-layer", "shop-layer"):
+        sys.path.insert(
+            0, os.path.join(bench_handlers.BACKEND_DIR, "layers", layer, "python")
+        )
+
+    from moto import mock_aws
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+
+    mock_aws().start()
+    bench_handlers.seed_data(argparse.Namespace(products=200, orders=0))
+    trace.set_tracer_provider(TracerProvider())
+    handlers = {
+        name: bench_handlers.load_handler(name).lambda_handler
+        for name in ("create-order", "create-orders-batch")
+    }
+
+    def invoke(function_name, event):
+        # Keep handler log lines out of the results table
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return handlers[function_name](
+                event, bench_handlers.LambdaContext(function_name)
+            )
+
+    return invoke
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--environment", default="dev")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--user-id", default="benchmark-user")
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Run the handlers in-process against moto instead of deployed ones",
+    )
+    args = parser.parse_args()
+
+    invoke = local_invoker() if args.local else remote_invoker(args.environment)
+    order = {"items": ITEMS}
+
+    start = time.perf_counter()
+    for _ in range(args.orders):
+        invoke("create-order", api_event(order, args.user_id))
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    created = 0
+    for offset in range(0, args.orders, args.batch_size):
+        count = min(args.batch_size, args.orders - offset)
+        result = invoke(
+            "create-orders-batch",
+            api_event({"orders": [order] * count}, args.user_id),
+        )
+        created += json.loads(result["body"]).get("created", 0)
+    batch_seconds = time.perf_counter() - start
+
+    print(f"{'path':<12} {'orders':>8} {'seconds':>10} {'orders/sec':>12}")
+    print(
+        f"{'single':<12} {args.orders:>8} {single_seconds:>10.2f} "
+        f"{args.orders / single_seconds:>12.1f}"
+    )
+    print(
+        f"{'batch':<12} {created:>8} {batch_seconds:>10.2f} "
+        f"{created / batch_seconds:>12.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
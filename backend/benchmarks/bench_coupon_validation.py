@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare in-process and remote-invoke coupon validation latency"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for layer in ("honeycomb-layer", "chaos-layer", "shop-layer"):
+    sys.path.insert(0, os.path.join(BACKEND_DIR, "layers", layer, "python"))
+
+# Measure the validation path itself, not chaos injection
+os.environ.setdefault("CHAOS_ENABLED", "false")
+
+import boto3  # noqa: E402
+from shop.coupon_cache import CouponCache  # noqa: E402
+from shop.coupons import validate_coupon  # noqa: E402
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def measure(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--environment", default="dev")
+    parser.add_argument("--coupon", default="SCD10")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    args = parser.parse_args()
+
+    coupons_table = boto3.resource("dynamodb").Table(f"{args.environment}-coupons")
+    lambda_client = boto3.client("lambda")
+    coupon_service_function = f"{args.environment}-coupon-service"
+
+    cached = CouponCache(coupons_table)
+    uncached = CouponCache(coupons_table, ttl_seconds=0, negative_ttl_seconds=0)
+
+    def remote():
+        payload = {"body": {"coupon_code": args.coupon}, "headers": {}, "requestContext": {}}
+        response = lambda_client.invoke(
+            FunctionName=coupon_service_function,
+            InvocationType="RequestResponse",
+            Payload=json.dumps(payload),
+        )
+        json.loads(response["Payload"].read())
+
+    modes = {
+        "local (cached)": lambda: validate_coupon(args.coupon, cached),
+        "local (uncached)": lambda: validate_coupon(args.coupon, uncached),
+        "remote": remote,
+    }
+
+    print(f"{'mode':<18} {'p50 ms':>10} {'p99 ms':>10} {'mean ms':>10}")
+    for name, fn in modes.items():
+        samples = measure(fn, args.iterations, args.warmup)
+        print(
+            f"{name:<18} {percentile(samples, 50):>10.2f} "
+            f"{percentile(samples, 99):>10.2f} {sum(samples) / len(samples):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
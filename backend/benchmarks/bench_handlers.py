@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""Benchmark every Lambda handler in-process against moto-backed AWS services"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+from multiprocessing import get_context
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS_DIR = os.path.join(BACKEND_DIR, "functions")
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "handler_baseline.json"
+)
+
+USER_ID = "benchmark-user"
+COUPON_CODE = "BENCH10"
+CATEGORIES = ["Electronics", "Accessories", "Audio", "Office", "Outdoors"]
+
+# Table names match the Terraform resources for a "bench" environment
+ENVIRONMENT = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "ORDERS_TABLE": "bench-orders",
+    "ORDER_STATS_TABLE": "bench-order-stats",
+    "COUPONS_TABLE": "bench-coupons",
+    "COUPON_USAGE_TABLE": "bench-coupon-usage",
+    "IDEMPOTENCY_TABLE": "bench-idempotency",
+    "PRODUCTS_TABLE": "bench-products",
+    "COUPON_SERVICE_FUNCTION": "bench-coupon-service",
+}
+
+# Metrics compared against the baseline; lower is better for all of them.
+# p99 and the cold-start timings are reported but too noisy to gate on.
+COMPARED_METRICS = ("p50_ms", "p95_ms", "alloc_kib", "spans_per_call")
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def api_event(method, resource, body=None, query=None, path_params=None):
+    """API Gateway proxy event as the Cognito authorizer would deliver it"""
+    path = resource
+    for name, value in (path_params or {}).items():
+        path = path.replace("{" + name + "}", value)
+    return {
+        "httpMethod": method,
+        "resource": resource,
+        "path": path,
+        "headers": {"x-session-id": "benchmark"},
+        "queryStringParameters": query,
+        "pathParameters": path_params,
+        "body": json.dumps(body) if body is not None else None,
+        "requestContext": {
+            "authorizer": {
+                "claims": {
+                    "sub": USER_ID,
+                    "email": f"{USER_ID}@example.com",
+                    "cognito:username": USER_ID,
+                }
+            }
+        },
+    }
+
+
+class LambdaContext:
+    """The parts of the Lambda context object the handlers use"""
+
+    def __init__(self, function_name, timeout_ms=30000):
+        self.function_name = function_name
+        self.aws_request_id = "benchmark"
+        self.memory_limit_in_mb = 512
+        self._deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+class LocalLambda:
+    """Stand-in Lambda client that runs another handler in-process"""
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+
+    def invoke(self, FunctionName, Payload, InvocationType="RequestResponse"):
+        result = self.handlers[FunctionName](
+            json.loads(Payload), LambdaContext(FunctionName)
+        )
+        return {"StatusCode": 200, "Payload": io.BytesIO(json.dumps(result).encode())}
+
+
+def product_ids(count):
+    return [str(index) for index in range(1, count + 1)]
+
+
+def order_items(index, product_count):
+    ids = product_ids(product_count)
+    return [
+        {"product_id": ids[index % len(ids)], "quantity": 1 + index % 3},
+        {"product_id": ids[(index * 7 + 3) % len(ids)], "quantity": 1},
+    ]
+
+
+KEY_NAMES = ("user_id", "order_id")
+
+
+class LocalOrderStream:
+    """
+    Stand-in for the orders table stream: writes orders and returns the
+    stream batch the event source mappings would deliver for them.
+    """
+
+    def __init__(self, product_count):
+        self.product_count = product_count
+        self.sequence_number = 0
+        self.created_keys = []
+
+    def pending_batch(self, index, size=10):
+        """New PENDING orders, as process-orders receives them"""
+        return self.write_batch(index, size, {"status": "PENDING"})
+
+    def created_batch(self, index, size=10):
+        """
+        New CREATED orders, as update-order-stats receives them. The previous
+        batch is deleted first: moto copies every table for each transaction,
+        so a growing orders table would slow every later call down.
+        """
+        with self.orders_table().batch_writer() as batch:
+            for key in self.created_keys:
+                batch.delete_item(Key=key)
+        stream = self.write_batch(
+            index, size, {"status": "CREATED", "total_price": Decimal("42.5")}
+        )
+        self.created_keys = [
+            {name: record["dynamodb"]["NewImage"][name]["S"] for name in KEY_NAMES}
+            for record in stream["Records"]
+        ]
+        return stream
+
+    def orders_table(self):
+        import boto3
+
+        return boto3.resource("dynamodb").Table(ENVIRONMENT["ORDERS_TABLE"])
+
+    def write_batch(self, index, size, attributes):
+        from boto3.dynamodb.types import TypeSerializer
+        from ulid import ULID
+
+        serializer = TypeSerializer()
+        records = []
+        with self.orders_table().batch_writer() as batch:
+            for n in range(size):
+                order = {
+                    "user_id": USER_ID,
+                    "order_id": str(ULID()),
+                    "session_id": "benchmark",
+                    "user_email": f"{USER_ID}@example.com",
+                    "items": order_items(index * size + n, self.product_count),
+                    "coupon_code": COUPON_CODE if n % 2 else "none",
+                    "created_at": datetime.utcnow().isoformat(),
+                    **attributes,
+                }
+                batch.put_item(Item=order)
+                self.sequence_number += 1
+                records.append(
+                    {
+                        "eventName": "INSERT",
+                        "eventSource": "aws:dynamodb",
+                        "dynamodb": {
+                            "NewImage": {
+                                name: serializer.serialize(value)
+                                for name, value in order.items()
+                            },
+                            "SequenceNumber": str(self.sequence_number),
+                            "StreamViewType": "NEW_IMAGE",
+                        },
+                    }
+                )
+        return {"Records": records}
+
+
+def scenarios(order_ids, product_count):
+    """Event factory per function, given the call index"""
+    searches = [
+        None,
+        {"category": "electronics"},
+        {"q": "wire"},
+        {"sort": "-price", "min_price": "50", "page_size": "48"},
+    ]
+    order_stream = LocalOrderStream(product_count)
+    return {
+        "process-orders": order_stream.pending_batch,
+        "update-order-stats": order_stream.created_batch,
+        "list-products": lambda i: api_event(
+            "GET", "/products", query=searches[i % len(searches)]
+        ),
+        "get-order": lambda i: api_event(
+            "GET",
+            "/orders/{order_id}",
+            path_params={"order_id": order_ids[i % len(order_ids)]},
+        ),
+        "list-orders": lambda i: api_event(
+            "GET", "/orders", query={"page_size": "25"} if i % 2 else None
+        ),
+        "create-order": lambda i: api_event(
+            "POST",
+            "/orders",
+            body={
+                "items": order_items(i, product_count),
+                "coupon_code": COUPON_CODE if i % 2 else None,
+            },
+        ),
+        "create-orders-batch": lambda i: api_event(
+            "POST",
+            "/orders/batch",
+            body={
+                "orders": [
+                    {"items": order_items(i * 10 + n, product_count)}
+                    for n in range(10)
+                ]
+            },
+        ),
+        "validate-coupon": lambda i: api_event(
+            "POST", "/coupons/validate", body={"coupon_code": COUPON_CODE}
+        ),
+        "coupon-service": lambda i: {
+            "body": {"coupon_code": COUPON_CODE},
+            "headers": {"x-session-id": "benchmark"},
+            "requestContext": {},
+        },
+    }
+
+
+def create_tables(dynamodb):
+    """Tables as defined in dynamodb.tf"""
+
+    def create(name, hash_key, range_key=None, **extra):
+        keys = [(hash_key, "HASH")] + ([(range_key, "RANGE")] if range_key else [])
+        attributes = {name for name, _ in keys}
+        for index in extra.get("GlobalSecondaryIndexes", []):
+            attributes.update(key["AttributeName"] for key in index["KeySchema"])
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": k, "KeyType": t} for k, t in keys],
+            AttributeDefinitions=[
+                {"AttributeName": attribute, "AttributeType": "S"}
+                for attribute in sorted(attributes)
+            ],
+            BillingMode="PAY_PER_REQUEST",
+            **extra,
+        )
+
+    create(ENVIRONMENT["ORDERS_TABLE"], "user_id", "order_id")
+    create(ENVIRONMENT["ORDER_STATS_TABLE"], "user_id")
+    create(ENVIRONMENT["COUPONS_TABLE"], "coupon_code")
+    create(ENVIRONMENT["COUPON_USAGE_TABLE"], "shard_key")
+    create(ENVIRONMENT["IDEMPOTENCY_TABLE"], "idempotency_key")
+    create(
+        ENVIRONMENT["PRODUCTS_TABLE"],
+        "product_id",
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "updated_at-index",
+                "KeySchema": [
+                    {"AttributeName": "catalog", "KeyType": "HASH"},
+                    {"AttributeName": "updated_at", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+        ],
+    )
+
+
+def seed_data(args):
+    """Products, a coupon and a page of orders; returns the order IDs"""
+    import boto3
+    from ulid import ULID
+    from shop.orders import build_order
+
+    dynamodb = boto3.resource("dynamodb")
+    create_tables(dynamodb.meta.client)
+
+    updated_at = datetime.now(timezone.utc).isoformat()
+    with dynamodb.Table(ENVIRONMENT["PRODUCTS_TABLE"]).batch_writer() as batch:
+        for index, product_id in enumerate(product_ids(args.products)):
+            batch.put_item(
+                Item={
+                    "product_id": product_id,
+                    "name": f"Wireless Gadget {index}",
+                    "description": f"Benchmark product number {index}",
+                    "price": Decimal(f"{10 + index % 290}.99"),
+                    "image": f"https://placehold.co/300x200?text={index}",
+                    "category": CATEGORIES[index % len(CATEGORIES)],
+                    "catalog": "products",
+                    "status": "ACTIVE",
+                    "updated_at": updated_at,
+                }
+            )
+
+    dynamodb.Table(ENVIRONMENT["COUPONS_TABLE"]).put_item(
+        Item={
+            "coupon_code": COUPON_CODE,
+            "discount_percentage": 10,
+            "status": "ACTIVE",
+            "expiry_date": "2099-12-31T23:59:59+00:00",
+            "max_usage_count": 10**9,
+            "current_usage_count": 0,
+        }
+    )
+
+    user_context = {"user_id": USER_ID, "email": f"{USER_ID}@example.com"}
+    order_ids = []
+    with dynamodb.Table(ENVIRONMENT["ORDERS_TABLE"]).batch_writer() as batch:
+        for index in range(args.orders):
+            order_id = str(ULID())
+            items = [
+                {**item, "name": f"Wireless Gadget {item['product_id']}", "price": 9.99}
+                for item in order_items(index, args.products)
+            ]
+            batch.put_item(
+                Item=build_order(
+                    order_id, user_context, "benchmark", items, None, 0, 19.98
+                )
+            )
+            order_ids.append(order_id)
+
+    # Chaos stays off, but its config is still read from SSM as in production
+    boto3.client("ssm").put_parameter(
+        Name="/dev/order-processing/chaos/dynamodb",
+        Value=json.dumps({"enabled": False}),
+        Type="String",
+    )
+
+    # Leave layer imports for the handler's own cold init to pay for
+    for name in list(sys.modules):
+        if name.split(".")[0] in ("shop", "ulid"):
+            del sys.modules[name]
+    return order_ids
+
+
+def load_handler(function_name):
+    """Import a function's app module the way the Lambda runtime would"""
+    path = os.path.join(FUNCTIONS_DIR, function_name, "app.py")
+    spec = importlib.util.spec_from_file_location(
+        function_name.replace("-", "_"), path
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_function(function_name, args):
+    """
+    Benchmark one function in a fresh interpreter, so its cold init includes
+    the layer imports and client construction it would pay on Lambda.
+    """
+    # Keep handler log lines out of the results table
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return measure_function(function_name, args)
+
+
+def measure_function(function_name, args):
+    os.environ.update(ENVIRONMENT)
+    for layer in ("honeycomb-layer", "chaos-layer", "shop-layer"):
+        sys.path.insert(0, os.path.join(BACKEND_DIR, "layers", layer, "python"))
+
+    from moto import mock_aws
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    with mock_aws():
+        order_ids = seed_data(args)
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+
+        if function_name == "create-order":
+            os.environ["COUPON_VALIDATION_MODE"] = args.coupon_validation
+            os.environ["ORDER_PROCESSING_MODE"] = args.order_processing
+
+        start = time.perf_counter()
+        module = load_handler(function_name)
+        init_ms = (time.perf_counter() - start) * 1000
+
+        if getattr(module, "coupon_validation_mode", None) == "remote":
+            coupon_service = load_handler("coupon-service")
+            module.lambda_client = LocalLambda(
+                {ENVIRONMENT["COUPON_SERVICE_FUNCTION"]: coupon_service.lambda_handler}
+            )
+
+        make_event = scenarios(order_ids, args.products)[function_name]
+
+        def call(event):
+            response = module.lambda_handler(event, LambdaContext(function_name))
+            status = response.get("statusCode", 200)
+            if status >= 500 or response.get("batchItemFailures"):
+                raise RuntimeError(f"{function_name} returned {response}")
+
+        # Events are built outside the timed region: some factories write
+        # to the tables, as the stream consumers need their orders to exist
+        event = make_event(0)
+        start = time.perf_counter()
+        call(event)
+        first_call_ms = (time.perf_counter() - start) * 1000
+
+        for index in range(1, args.warmup + 1):
+            call(make_event(index))
+
+        exporter.clear()
+        samples = []
+        for index in range(args.iterations):
+            event = make_event(index)
+            start = time.perf_counter()
+            call(event)
+            samples.append((time.perf_counter() - start) * 1000)
+        spans_per_call = len(exporter.get_finished_spans()) / args.iterations
+
+        # Peak traced memory above the baseline during each call; a separate
+        # pass because tracemalloc slows every allocation down
+        peaks = []
+        tracemalloc.start()
+        for index in range(args.alloc_iterations):
+            event = make_event(index)
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            call(event)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - before) / 1024)
+        tracemalloc.stop()
+
+    return {
+        "init_ms": round(init_ms, 2),
+        "first_call_ms": round(first_call_ms, 2),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "alloc_kib": round(sum(peaks) / len(peaks), 1),
+        "spans_per_call": round(spans_per_call, 2),
+    }
+
+
+def find_regressions(results, baseline, threshold, min_delta_ms):
+    """
+    (function, metric, baseline, current) for metrics worse than allowed.
+    Latencies must also have grown by at least `min_delta_ms`, so jitter on
+    sub-millisecond handlers is not reported as a regression.
+    """
+    regressions = []
+    for function_name, metrics in results.items():
+        previous = baseline.get(function_name)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in previous:
+                continue
+            if metric.endswith("_ms") and (
+                metrics[metric] - previous[metric] < min_delta_ms
+            ):
+                continue
+            if metrics[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    (function_name, metric, previous[metric], metrics[metric])
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--function",
+        action="append",
+        dest="functions",
+        help="Function to benchmark (repeatable); defaults to all",
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--alloc-iterations", type=int, default=20)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument(
+        "--coupon-validation", choices=("local", "remote"), default="local"
+    )
+    parser.add_argument(
+        "--order-processing", choices=("sync", "async"), default="sync"
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed fractional increase over the baseline before failing",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="Smallest latency increase that can count as a regression",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Write these results to --baseline instead of comparing",
+    )
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    functions = args.functions or sorted(os.listdir(FUNCTIONS_DIR))
+
+    results = {}
+    print(
+        f"{'function':<22} {'init ms':>9} {'first ms':>9} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'alloc KiB':>10} {'spans':>6}"
+    )
+    for function_name in functions:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            metrics = executor.submit(run_function, function_name, args).result()
+        results[function_name] = metrics
+        print(
+            f"{function_name:<22} {metrics['init_ms']:>9.1f} "
+            f"{metrics['first_call_ms']:>9.1f} {metrics['p50_ms']:>8.2f} "
+            f"{metrics['p95_ms']:>8.2f} {metrics['p99_ms']:>8.2f} "
+            f"{metrics['alloc_kib']:>10.1f} {metrics['spans_per_call']:>6.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(
+        results, baseline, args.threshold, args.min_delta_ms
+    )
+    if not regressions:
+        print(f"\nNo regressions beyond {args.threshold:.0%} of the baseline")
+        return
+
+    print(f"\nRegressions beyond {args.threshold:.0%} of the baseline:")
+    for function_name, metric, previous, current in regressions:
+        print(f"  {function_name:<22} {metric:<15} {previous:>10} -> {current}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
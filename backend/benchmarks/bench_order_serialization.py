@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Compare resource-layer and wire-format serialization of order pages"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for layer in ("honeycomb-layer", "chaos-layer", "shop-layer"):
+    sys.path.insert(0, os.path.join(BACKEND_DIR, "layers", layer, "python"))
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer  # noqa: E402
+from honeycomb.utils import DecimalEncoder  # noqa: E402
+from shop.dynamodb import items_to_json  # noqa: E402
+
+
+def wire_order(index):
+    """One orders table item in low-level (wire) format"""
+    serializer = TypeSerializer()
+    order = {
+        "user_id": "benchmark-user",
+        "order_id": f"01JBENCHMARK{index:014d}",
+        "session_id": "benchmark",
+        "user_email": "benchmark-user@example.com",
+        "items": [
+            {"name": "Wireless Mouse", "price": Decimal("39.99"), "quantity": 2},
+            {"name": "USB-C Hub", "price": Decimal("49.99"), "quantity": 1},
+            {"name": "Laptop Backpack", "price": Decimal("79.99"), "quantity": 1},
+        ],
+        "coupon_code": "SCD10",
+        "discount_percentage": Decimal("10"),
+        "total_price": Decimal("188.99"),
+        "status": "CREATED",
+        "created_at": "2025-03-01T12:00:00.000000",
+    }
+    return {name: serializer.serialize(value) for name, value in order.items()}
+
+
+def resource_path(items):
+    """What the boto3 resource layer and DecimalEncoder did"""
+    deserializer = TypeDeserializer()
+    plain = [
+        {name: deserializer.deserialize(value) for name, value in item.items()}
+        for item in items
+    ]
+    return json.dumps({"items": plain}, cls=DecimalEncoder)
+
+
+def wire_path(items):
+    return '{"items":' + items_to_json(items) + "}"
+
+
+def time_path(path, items, iterations):
+    """Microseconds per page"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        path(items)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    items = [wire_order(index) for index in range(args.page_size)]
+
+    print(f"{'path':<10} {'us/page':>10} {'bytes':>8}")
+    for name, path in (("resource", resource_path), ("wire", wire_path)):
+        micros = time_path(path, items, args.iterations)
+        print(f"{name:<10} {micros:>10.0f} {len(path(items)):>8}")
+
+
+if __name__ == "__main__":
+    main()
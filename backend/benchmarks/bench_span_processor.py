@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure per-span overhead of ContextEnrichmentProcessor, before and after"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "layers", "honeycomb-layer", "python"))
+
+from opentelemetry.context import get_value  # noqa: E402
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider  # noqa: E402
+from honeycomb.context import set_trace_context  # noqa: E402
+from honeycomb.span_processor import ContextEnrichmentProcessor  # noqa: E402
+
+EVENT = {
+    "httpMethod": "GET",
+    "path": "/orders",
+    "headers": {"x-session-id": "benchmark"},
+    "requestContext": {
+        "authorizer": {
+            "claims": {
+                "sub": "benchmark-user",
+                "email": "benchmark-user@example.com",
+                "cognito:username": "benchmark-user",
+            }
+        }
+    },
+}
+
+
+class LegacyContextEnrichmentProcessor(SpanProcessor):
+    """on_start as it was before attributes were prepared per invocation"""
+
+    def on_start(self, span, parent_context=None):
+        session_id = get_value("session_id")
+        user_context = get_value("user_context")
+
+        if session_id:
+            span.set_attribute("session_id", session_id)
+
+        if user_context:
+            span.set_attribute("user.id", user_context.get("user_id", "unknown"))
+            span.set_attribute("user.email", user_context.get("email", "unknown"))
+            span.set_attribute("user.username", user_context.get("username", "unknown"))
+
+        span.set_attribute("operation.name", span.name)
+        span.set_attribute("event.processTime", datetime.utcnow().isoformat() + "Z")
+
+
+def time_spans(processor, spans):
+    """Nanoseconds per span to start and end `spans` spans"""
+    provider = TracerProvider()
+    if processor is not None:
+        provider.add_span_processor(processor)
+    tracer = provider.get_tracer("benchmark")
+
+    start = time.perf_counter_ns()
+    for _ in range(spans):
+        with tracer.start_as_current_span("list_orders"):
+            pass
+    return (time.perf_counter_ns() - start) / spans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spans", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    set_trace_context(EVENT)
+
+    processors = {
+        "none": lambda: None,
+        "legacy": LegacyContextEnrichmentProcessor,
+        "current": ContextEnrichmentProcessor,
+    }
+    results = {
+        name: min(time_spans(factory(), args.spans) for _ in range(args.repeat))
+        for name, factory in processors.items()
+    }
+
+    print(f"{'processor':<10} {'ns/span':>10} {'overhead ns':>12}")
+    for name, ns_per_span in results.items():
+        overhead = ns_per_span - results["none"]
+        print(f"{name:<10} {ns_per_span:>10.0f} {overhead:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
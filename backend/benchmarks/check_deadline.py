@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Check that a deadline-bound client gives up on a slow endpoint in time"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "layers", "honeycomb-layer", "python"))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "check")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "check")
+
+from honeycomb.clients import (  # noqa: E402
+    DEFAULT_CONFIG,
+    bound_to_deadline,
+    get_session,
+)
+from honeycomb.deadline import DeadlineExceeded, start_deadline  # noqa: E402
+
+
+class LambdaContext:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def slow_server(delay_seconds):
+    """Local HTTP server answering every request after `delay_seconds`"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay_seconds)
+            body = b'{"Item": {}}'
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-amz-json-1.0")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=int, default=800)
+    parser.add_argument("--endpoint-delay", type=float, default=2.0)
+    parser.add_argument(
+        "--tolerance-ms",
+        type=int,
+        default=150,
+        help="Time allowed past the planned budget for the client to give up",
+    )
+    args = parser.parse_args()
+
+    server = slow_server(args.endpoint_delay)
+    client = get_session().client(
+        "dynamodb",
+        endpoint_url=f"http://127.0.0.1:{server.server_port}",
+        config=DEFAULT_CONFIG,
+    )
+    bound_to_deadline(client)
+
+    deadline = start_deadline(LambdaContext(args.budget_ms))
+    planned_ms = deadline.remaining_ms()
+
+    started = time.monotonic()
+    try:
+        client.get_item(TableName="check", Key={"id": {"S": "slow"}})
+        outcome = "completed"
+    except DeadlineExceeded as e:
+        outcome = f"DeadlineExceeded: {e}"
+    except Exception as e:
+        outcome = f"{type(e).__name__}: {e}"
+    elapsed_ms = (time.monotonic() - started) * 1000
+    server.shutdown()
+
+    print(f"Planned budget: {planned_ms:.0f} ms ({args.budget_ms} ms less reserve)")
+    print(f"Endpoint delay: {args.endpoint_delay * 1000:.0f} ms")
+    print(f"Call ended after {elapsed_ms:.0f} ms: {outcome}")
+
+    if args.endpoint_delay * 1000 < planned_ms:
+        # The endpoint answers within the budget: the call must succeed
+        if outcome != "completed":
+            print("FAIL: the call failed although it fitted the budget")
+            sys.exit(1)
+    elif outcome == "completed" or elapsed_ms > planned_ms + args.tolerance_ms:
+        print("FAIL: the call was not bounded by the remaining budget")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ resource "aws_dynamodb_table" "orders" {
   hash_key     = "user_id"
   range_key    = "order_id"
 
+  # New PENDING orders are finalised by process-orders from the stream
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   attribute {
     name = "user_id"
     type = "S"
@@ -15,6 +19,25 @@ resource "aws_dynamodb_table" "orders" {
     type = "S"
   }
 
+  attribute {
+    name = "pending_status"
+    type = "S"
+  }
+
+  attribute {
+    name = "created_at"
+    type = "S"
+  }
+
+  # Sparse: only orders still PENDING carry pending_status, so the
+  # process-orders sweep finds stale ones without scanning every order
+  global_secondary_index {
+    name            = "pending-index"
+    hash_key        = "pending_status"
+    range_key       = "created_at"
+    projection_type = "KEYS_ONLY"
+  }
+
   tags = {
     Environment = var.environment
     Name        = "${var.environment}-orders"
@@ -37,3 +60,94 @@ resource "aws_dynamodb_table" "coupons" {
     Name        = "${var.environment}-coupons"
   }
 }
+
+# Coupon Usage Counter Shards
+resource "aws_dynamodb_table" "coupon_usage" {
+  name         = "${var.environment}-coupon-usage"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "shard_key"
+
+  attribute {
+    name = "shard_key"
+    type = "S"
+  }
+
+  tags = {
+    Environment = var.environment
+    Name        = "${var.environment}-coupon-usage"
+  }
+}
+
+# Per-User Order Totals
+resource "aws_dynamodb_table" "order_stats" {
+  name         = "${var.environment}-order-stats"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "user_id"
+
+  attribute {
+    name = "user_id"
+    type = "S"
+  }
+
+  tags = {
+    Environment = var.environment
+    Name        = "${var.environment}-order-stats"
+  }
+}
+
+# Create-Order Idempotency Keys
+resource "aws_dynamodb_table" "idempotency" {
+  name         = "${var.environment}-idempotency"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "idempotency_key"
+
+  attribute {
+    name = "idempotency_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Environment = var.environment
+    Name        = "${var.environment}-idempotency"
+  }
+}
+
+# Product Catalog
+resource "aws_dynamodb_table" "products" {
+  name         = "${var.environment}-products"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "product_id"
+
+  attribute {
+    name = "product_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "catalog"
+    type = "S"
+  }
+
+  attribute {
+    name = "updated_at"
+    type = "S"
+  }
+
+  # Products changed since a point in time, for incremental catalog refresh
+  global_secondary_index {
+    name            = "updated_at-index"
+    hash_key        = "catalog"
+    range_key       = "updated_at"
+    projection_type = "ALL"
+  }
+
+  tags = {
+    Environment = var.environment
+    Name        = "${var.environment}-products"
+  }
+}
@@ -1,163 +1,320 @@
 import json
 import os
-from datetime import datetime
-from decimal import Decimal
-import boto3
-from ulid import ULID
 from opentelemetry import trace
-from honeycomb.init import initialize_tracing
-from honeycomb.context import set_trace_context
-from honeycomb.common_attributes import add_span_exception, add_span_status
-from honeycomb.enums import HoneycombStatus, HoneycombErrorType
-from honeycomb.utils import get_user_context, get_cors_headers
-from honeycomb.event_processor import add_common_span_attributes
-from chaos_utils import inject_dynamodb_chaos
+from honeycomb.init_profiler import LazyClient, profile_init
+
+with profile_init("import.boto3"):
+    from honeycomb.clients import get_resource, get_client, add_connection_stats
+with profile_init("import.ulid"):
+    from ulid import ULID
+with profile_init("import.honeycomb"):
+    from honeycomb.init import initialize_tracing
+    from honeycomb.context import set_trace_context
+    from honeycomb.deadline import start_deadline, using_reserve, DeadlineExceeded
+    from honeycomb.common_attributes import add_span_exception, add_span_status
+    from honeycomb.enums import HoneycombStatus, HoneycombErrorType
+    from honeycomb.utils import (
+        get_user_context,
+        get_cors_headers,
+        get_header,
+        get_body,
+    )
+    from honeycomb.event_processor import add_common_span_attributes
+with profile_init("import.chaos_utils"):
+    from chaos_utils import inject_dynamodb_chaos
+with profile_init("import.shop"):
+    from shop.coupon_cache import CouponCache
+    from shop.coupons import validate_coupon
+    from shop.coupon_usage import CouponUsage
+    from shop.idempotency import IdempotencyStore, IdempotencyError, hash_request
+    from shop.pricing import PriceResolver
+    from shop.orders import (
+        validate_order_items,
+        calculate_base_price,
+        apply_discount,
+        build_order,
+        build_pending_order,
+    )
 
 # Initialize custom tracing processor
 initialize_tracing()
 
-dynamodb = boto3.resource("dynamodb")
-lambda_client = boto3.client("lambda")
-orders_table = dynamodb.Table(os.environ["ORDERS_TABLE"])
-coupon_service_function = os.environ["COUPON_SERVICE_FUNCTION"]
+# Built on first use; construction time is recorded on the cold-start span
+dynamodb = LazyClient("dynamodb", lambda: get_resource("dynamodb"))
+orders_table = LazyClient(
+    "orders_table", lambda: dynamodb.Table(os.environ["ORDERS_TABLE"])
+)
+coupon_usage = CouponUsage(dynamodb, os.environ["COUPON_USAGE_TABLE"])
+price_resolver = PriceResolver(dynamodb, os.environ["PRODUCTS_TABLE"])
+idempotency_store = IdempotencyStore(
+    LazyClient(
+        "idempotency_table", lambda: dynamodb.Table(os.environ["IDEMPOTENCY_TABLE"])
+    )
+)
+
+# "sync" prices, redeems and saves the order in the request; "async" saves
+# it as PENDING for the process-orders worker (via the orders table stream)
+order_processing_mode = os.environ.get("ORDER_PROCESSING_MODE", "sync")
+
+# "local" validates coupons in-process; "remote" invokes the coupon service
+coupon_validation_mode = os.environ.get("COUPON_VALIDATION_MODE", "local")
+if coupon_validation_mode == "remote":
+    # Allow for the coupon service's own run time on synchronous invokes
+    lambda_client = LazyClient("lambda", lambda: get_client("lambda", read_timeout=30))
+    coupon_service_function = os.environ["COUPON_SERVICE_FUNCTION"]
+else:
+    coupon_cache = CouponCache(
+        LazyClient(
+            "coupons_table", lambda: dynamodb.Table(os.environ["COUPONS_TABLE"])
+        ),
+        usage_reader=coupon_usage.usage_attributes,
+    )
 
 tracer = trace.get_tracer(__name__)
 
 
 def lambda_handler(event, context):
-    """Create a new order"""
+    """Create a new order, replaying the first response for a reused Idempotency-Key"""
 
     # Extract context first
-    body = json.loads(event.get("body", "{}"))
     headers = event.get("headers", {})
     session_id = headers.get("x-session-id", "unknown")
 
     user_context = get_user_context(event)
 
     set_trace_context(event)
+    start_deadline(context)
 
     with tracer.start_as_current_span("create_order") as span:
+        idempotency_key = get_header(event, "Idempotency-Key")
+        if not idempotency_key:
+            return create_order(event, span, session_id, user_context)
+
+        span.set_attribute("idempotency.key", idempotency_key)
+        record_key = f"{user_context['user_id']}#{idempotency_key}"
+
+        try:
+            replay = idempotency_store.begin(
+                record_key, hash_request(get_body(event))
+            )
+        except IdempotencyError as e:
+            add_span_exception(span, e, HoneycombErrorType.INVALID_DATA)
+            return {
+                "statusCode": e.status_code,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": e.msg}),
+            }
+        except Exception as e:
+            add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+            return {
+                "statusCode": 500,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
+
+        if replay is not None:
+            span.set_attribute("idempotency.replayed", True)
+            add_span_status(span, HoneycombStatus.SUCCESS)
+            return replay
+
+        response = create_order(event, span, session_id, user_context)
+
+        # Client errors are final; server errors free the key for a retry.
+        # The record is written even if the order used up the budget.
         try:
-            # Add event input to span
-            add_common_span_attributes(event, span)
+            with using_reserve():
+                if response["statusCode"] < 500:
+                    idempotency_store.complete(record_key, response)
+                else:
+                    idempotency_store.abandon(record_key)
+        except Exception as e:
+            span.set_attribute("idempotency.error", str(e))
 
-            # Extract context first
-            body = json.loads(event.get("body", "{}"))
+        return response
 
-            # Validate order
-            with tracer.start_as_current_span("validate_order"):
-                items = body.get("items", [])
-                if not items:
-                    raise ValueError("Order must contain at least one item")
 
-                for item in items:
-                    if item.get("quantity", 0) <= 0:
-                        raise ValueError("Item quantity must be positive")
+def create_order(event, span, session_id, user_context):
+    """Validate, price and save an order, returning the API response"""
+    try:
+        # Add event input to span
+        add_common_span_attributes(event, span)
+        add_connection_stats(span)
 
-                add_span_status(span, HoneycombStatus.SUCCESS)
+        # Extract context first
+        body = json.loads(get_body(event))
 
-            # Calculate base price
-            with tracer.start_as_current_span("calculate_price") as price_span:
-                total_price = sum(item["price"] * item["quantity"] for item in items)
-                price_span.set_attribute("base_price", float(total_price))
+        # Validate order
+        with tracer.start_as_current_span("validate_order"):
+            items = body.get("items", [])
+            validate_order_items(items)
 
-            # Validate coupon if provided
-            discount = 0
-            coupon_code = body.get("coupon_code")
-            if coupon_code:
-                with tracer.start_as_current_span("validate_coupon") as coupon_span:
-                    coupon_span.set_attribute("coupon.code", coupon_code)
+            add_span_status(span, HoneycombStatus.SUCCESS)
 
+        span.set_attribute("order.processing_mode", order_processing_mode)
+        if order_processing_mode == "async":
+            return accept_order(body, items, session_id, user_context)
+
+        # Calculate base price from stored prices, not the client's
+        with tracer.start_as_current_span("calculate_price") as price_span:
+            items = price_resolver.price_items(items)
+            total_price = calculate_base_price(items)
+            price_span.set_attribute("base_price", float(total_price))
+            price_resolver.add_span_attributes(price_span)
+
+        # Validate coupon if provided
+        discount = 0
+        usage_shard = None
+        coupon_code = body.get("coupon_code")
+        if coupon_code:
+            with tracer.start_as_current_span("validate_coupon") as coupon_span:
+                coupon_span.set_attribute("coupon.code", coupon_code)
+                coupon_span.set_attribute(
+                    "coupon.validation_mode", coupon_validation_mode
+                )
+
+                if coupon_validation_mode == "remote":
                     coupon_result = invoke_coupon_service(
                         coupon_code, session_id, user_context, event
                     )
-
-                    print("Coupon result:", coupon_result)
-                    span.set_attribute("coupon.result", json.dumps(coupon_result))
-
-                    if coupon_result["valid"]:
-                        discount = coupon_result["discount_percentage"]
-                        total_price = round(total_price * (1 - discount / 100), 2)
-                        coupon_span.set_attribute("coupon.discount", discount)
-                        add_span_status(coupon_span, HoneycombStatus.SUCCESS)
-                    else:
-                        error_msg = coupon_result["error"]
-                        add_span_exception(
-                            coupon_span,
-                            ValueError(error_msg),
-                            HoneycombErrorType.INVALID_DATA,
-                        )
-                        add_span_exception(
-                            span, ValueError(error_msg), HoneycombErrorType.INVALID_DATA
-                        )
-                        return {
-                            "statusCode": 400,
-                            "headers": get_cors_headers(),
-                            "body": json.dumps({"error": error_msg}),
-                        }
-
-            # Save order to DynamoDB
-            with tracer.start_as_current_span("save_order_to_dynamodb") as db_span:
-                order_id = str(ULID())
-
-                # Convert items to use Decimal for DynamoDB
-                items_decimal = [
-                    {
-                        **item,
-                        "price": Decimal(str(item["price"])),
-                        "quantity": item["quantity"],
+                else:
+                    coupon_result = validate_coupon_locally(coupon_code)
+
+                print("Coupon result:", coupon_result)
+                span.set_attribute("coupon.result", json.dumps(coupon_result))
+
+                if coupon_result["valid"]:
+                    discount = coupon_result["discount_percentage"]
+                    usage_shard = coupon_result.get("usage_shard")
+                    total_price = apply_discount(total_price, discount)
+                    coupon_span.set_attribute("coupon.discount", discount)
+                    add_span_status(coupon_span, HoneycombStatus.SUCCESS)
+                elif coupon_result.get("retryable"):
+                    # Coupons could not be checked: a 503 leaves the
+                    # idempotency key free for the client's retry
+                    error_msg = coupon_result["error"]
+                    add_span_exception(
+                        span, RuntimeError(error_msg), HoneycombErrorType.EXCEPTION
+                    )
+                    return {
+                        "statusCode": 503,
+                        "headers": get_cors_headers(),
+                        "body": json.dumps({"error": error_msg}),
+                    }
+                else:
+                    error_msg = coupon_result["error"]
+                    add_span_exception(
+                        coupon_span,
+                        ValueError(error_msg),
+                        HoneycombErrorType.INVALID_DATA,
+                    )
+                    add_span_exception(
+                        span, ValueError(error_msg), HoneycombErrorType.INVALID_DATA
+                    )
+                    return {
+                        "statusCode": 400,
+                        "headers": get_cors_headers(),
+                        "body": json.dumps({"error": error_msg}),
                     }
-                    for item in items
-                ]
 
-                order = {
-                    "user_id": user_context["user_id"],
-                    "order_id": order_id,
-                    "session_id": session_id,
-                    "user_email": user_context["email"],
-                    "items": items_decimal,
-                    "coupon_code": coupon_code or "none",
-                    "discount_percentage": Decimal(str(discount)),
-                    "total_price": Decimal(str(total_price)),
-                    "status": "CREATED",
-                    "created_at": datetime.utcnow().isoformat(),
-                }
+        # Save order to DynamoDB
+        with tracer.start_as_current_span("save_order_to_dynamodb") as db_span:
+            order_id = str(ULID())
+            order = build_order(
+                order_id,
+                user_context,
+                session_id,
+                items,
+                coupon_code,
+                discount,
+                total_price,
+            )
 
+            try:
                 inject_dynamodb_chaos()
                 orders_table.put_item(Item=order)
-                db_span.set_attribute("order_id", order_id)
-                db_span.set_attribute("user_id", user_context["user_id"])
-                add_span_status(db_span, HoneycombStatus.SUCCESS)
-
-            add_span_status(span, HoneycombStatus.SUCCESS)
-
-            return {
-                "statusCode": 201,
-                "headers": get_cors_headers(),
-                "body": json.dumps(
-                    {
-                        "order_id": order_id,
-                        "total_price": round(float(total_price), 2),
-                        "discount_applied": discount,
-                        "status": "CREATED",
-                    }
-                ),
-            }
-
-        except ValueError as e:
-            add_span_exception(span, e, HoneycombErrorType.INVALID_DATA)
-            return {
-                "statusCode": 400,
-                "headers": get_cors_headers(),
-                "body": json.dumps({"error": str(e)}),
-            }
-        except Exception as e:
-            add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
-            return {
-                "statusCode": 500,
-                "headers": get_cors_headers(),
-                "body": json.dumps({"error": str(e)}),
-            }
+            except Exception:
+                # Hand the redeemed coupon use back before failing
+                if usage_shard is not None:
+                    coupon_usage.release(coupon_code, usage_shard)
+                raise
+            db_span.set_attribute("order_id", order_id)
+            db_span.set_attribute("user_id", user_context["user_id"])
+            add_span_status(db_span, HoneycombStatus.SUCCESS)
+
+        add_span_status(span, HoneycombStatus.SUCCESS)
+
+        return {
+            "statusCode": 201,
+            "headers": get_cors_headers(),
+            "body": json.dumps(
+                {
+                    "order_id": order_id,
+                    "total_price": round(float(total_price), 2),
+                    "discount_applied": discount,
+                    "status": "CREATED",
+                }
+            ),
+        }
+
+    except ValueError as e:
+        add_span_exception(span, e, HoneycombErrorType.INVALID_DATA)
+        return {
+            "statusCode": 400,
+            "headers": get_cors_headers(),
+            "body": json.dumps({"error": str(e)}),
+        }
+    except DeadlineExceeded as e:
+        add_span_exception(span, e, HoneycombErrorType.TIMEOUT)
+        return {
+            "statusCode": 503,
+            "headers": get_cors_headers(),
+            "body": json.dumps({"error": str(e)}),
+        }
+    except Exception as e:
+        add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+        return {
+            "statusCode": 500,
+            "headers": get_cors_headers(),
+            "body": json.dumps({"error": str(e)}),
+        }
+
+
+def accept_order(body, items, session_id, user_context):
+    """Save the order as PENDING for the worker and return 202 Accepted"""
+    with tracer.start_as_current_span("save_pending_order") as db_span:
+        order_id = str(ULID())
+        order = build_pending_order(
+            order_id, user_context, session_id, items, body.get("coupon_code")
+        )
+
+        inject_dynamodb_chaos()
+        orders_table.put_item(Item=order)
+        db_span.set_attribute("order_id", order_id)
+        db_span.set_attribute("user_id", user_context["user_id"])
+        add_span_status(db_span, HoneycombStatus.SUCCESS)
+
+    return {
+        "statusCode": 202,
+        "headers": get_cors_headers(),
+        "body": json.dumps({"order_id": order_id, "status": "PENDING"}),
+    }
+
+
+def validate_coupon_locally(coupon_code):
+    """Validate and redeem coupon in-process against the coupons table"""
+    try:
+        return validate_coupon(coupon_code, coupon_cache, coupon_usage)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        span = trace.get_current_span()
+        span.set_attribute("error.exception", str(e))
+        add_span_status(span, HoneycombStatus.FAILURE)
+        return {
+            "valid": False,
+            "error": f"Coupon validation failed: {str(e)}",
+            "retryable": True,
+        }
 
 
 def invoke_coupon_service(coupon_code, session_id, user_context, event):
@@ -170,6 +327,7 @@ def invoke_coupon_service(coupon_code, session_id, user_context, event):
             payload = {
                 "body": {
                     "coupon_code": coupon_code,
+                    "redeem": True,
                     "session_id": session_id,
                     "user_context": user_context,
                 },
@@ -184,10 +342,18 @@ def invoke_coupon_service(coupon_code, session_id, user_context, event):
             )
 
             result = json.loads(response["Payload"].read())
+            if "FunctionError" in response:
+                raise RuntimeError(f"Coupon service failed: {result}")
             add_span_status(span, HoneycombStatus.SUCCESS)
             return result
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             span.set_attribute("error.exception", str(e))
             add_span_status(span, HoneycombStatus.FAILURE)
-            return {"valid": False, "error": "Coupon service unavailable"}
+            return {
+                "valid": False,
+                "error": "Coupon service unavailable",
+                "retryable": True,
+            }
@@ -0,0 +1,287 @@
+import json
+import os
+from opentelemetry import trace
+from honeycomb.init_profiler import LazyClient, profile_init
+
+with profile_init("import.boto3"):
+    from honeycomb.clients import get_resource, add_connection_stats
+with profile_init("import.ulid"):
+    from ulid import ULID
+with profile_init("import.honeycomb"):
+    from honeycomb.init import initialize_tracing
+    from honeycomb.context import set_trace_context
+    from honeycomb.deadline import start_deadline, DeadlineExceeded
+    from honeycomb.common_attributes import add_span_exception, add_span_status
+    from honeycomb.enums import HoneycombStatus, HoneycombErrorType
+    from honeycomb.utils import get_user_context, get_cors_headers, get_body
+    from honeycomb.event_processor import add_common_span_attributes
+with profile_init("import.chaos_utils"):
+    from chaos_utils import inject_dynamodb_chaos
+with profile_init("import.shop"):
+    from shop.coupon_cache import CouponCache
+    from shop.coupons import validate_coupon
+    from shop.coupon_usage import CouponUsage
+    from shop.dynamodb import batch_write_items
+    from shop.pricing import PriceResolver
+    from shop.orders import (
+        validate_order_items,
+        calculate_base_price,
+        apply_discount,
+        build_order,
+    )
+
+# Initialize custom tracing processor
+initialize_tracing()
+
+# Built on first use; construction time is recorded on the cold-start span
+dynamodb = LazyClient("dynamodb", lambda: get_resource("dynamodb"))
+orders_table_name = os.environ["ORDERS_TABLE"]
+coupon_usage = CouponUsage(dynamodb, os.environ["COUPON_USAGE_TABLE"])
+price_resolver = PriceResolver(dynamodb, os.environ["PRODUCTS_TABLE"])
+coupon_cache = CouponCache(
+    LazyClient("coupons_table", lambda: dynamodb.Table(os.environ["COUPONS_TABLE"])),
+    usage_reader=coupon_usage.usage_attributes,
+)
+
+max_batch_orders = int(os.environ.get("MAX_BATCH_ORDERS", 500))
+
+tracer = trace.get_tracer(__name__)
+
+
+def lambda_handler(event, context):
+    """Create many orders in one request, returning a result per order"""
+
+    # Extract context first
+    headers = event.get("headers", {})
+    session_id = headers.get("x-session-id", "unknown")
+
+    user_context = get_user_context(event)
+
+    set_trace_context(event)
+    start_deadline(context)
+
+    with tracer.start_as_current_span("create_orders_batch") as span:
+        try:
+            add_common_span_attributes(event, span)
+            add_connection_stats(span)
+
+            body = json.loads(get_body(event))
+            orders = body.get("orders", [])
+            if not isinstance(orders, list) or not orders:
+                raise ValueError("Batch must contain at least one order")
+            if len(orders) > max_batch_orders:
+                raise ValueError(
+                    f"Batch cannot contain more than {max_batch_orders} orders"
+                )
+
+            span.set_attribute("batch.size", len(orders))
+            results = [None] * len(orders)
+
+            # Validate orders
+            with tracer.start_as_current_span("validate_orders"):
+                for index, order in enumerate(orders):
+                    if not isinstance(order, dict):
+                        results[index] = failed_result(
+                            index, "Order must be an object"
+                        )
+                        continue
+                    try:
+                        validate_order_items(order.get("items", []))
+                        coupon_code = order.get("coupon_code")
+                        if coupon_code is not None and not isinstance(
+                            coupon_code, str
+                        ):
+                            raise ValueError("coupon_code must be a string")
+                    except ValueError as e:
+                        results[index] = failed_result(index, str(e))
+
+            # Look up stored prices for every product in the batch at once
+            product_ids = {
+                item["product_id"]
+                for index, order in enumerate(orders)
+                if results[index] is None
+                for item in order["items"]
+            }
+            with tracer.start_as_current_span("resolve_prices") as price_span:
+                price_span.set_attribute("products.distinct_ids", len(product_ids))
+                products = price_resolver.get_products(product_ids)
+                price_resolver.add_span_attributes(price_span)
+
+            # Validate each distinct coupon once for the whole batch
+            coupon_codes = {
+                order.get("coupon_code")
+                for index, order in enumerate(orders)
+                if results[index] is None and order.get("coupon_code")
+            }
+            with tracer.start_as_current_span("validate_coupons") as coupon_span:
+                coupon_span.set_attribute("coupon.distinct_codes", len(coupon_codes))
+                coupon_results = {
+                    code: validate_coupon(code, coupon_cache) for code in coupon_codes
+                }
+
+            # Price orders and redeem coupon uses
+            pending = {}
+            try:
+                with tracer.start_as_current_span("calculate_prices"):
+                    for index, order in enumerate(orders):
+                        if results[index] is not None:
+                            continue
+
+                        try:
+                            items = price_resolver.price_items(
+                                order["items"], products
+                            )
+                        except ValueError as e:
+                            results[index] = failed_result(index, str(e))
+                            continue
+                        total_price = calculate_base_price(items)
+                        discount = 0
+                        usage_shard = None
+                        coupon_code = order.get("coupon_code")
+
+                        if coupon_code:
+                            coupon_result = coupon_results[coupon_code]
+                            if coupon_result["valid"]:
+                                usage_shard = coupon_usage.redeem(
+                                    coupon_cache.get_coupon(coupon_code)
+                                )
+                            if not coupon_result["valid"] or usage_shard is None:
+                                error_msg = coupon_result.get(
+                                    "error", "Coupon usage limit exceeded"
+                                )
+                                results[index] = failed_result(index, error_msg)
+                                continue
+                            discount = coupon_result["discount_percentage"]
+                            total_price = apply_discount(total_price, discount)
+
+                        order_id = str(ULID())
+                        pending[order_id] = {
+                            "index": index,
+                            "usage_shard": usage_shard,
+                            "item": build_order(
+                                order_id,
+                                user_context,
+                                session_id,
+                                items,
+                                coupon_code,
+                                discount,
+                                total_price,
+                            ),
+                        }
+
+                # Injected before the first write, while nothing is saved
+                inject_dynamodb_chaos()
+            except Exception:
+                # Nothing is saved yet: hand back every coupon use redeemed
+                release_coupon_uses(pending.values())
+                raise
+
+            # Save orders to DynamoDB. Orders in chunks that were written stay
+            # created even if a later chunk fails or time runs out.
+            with tracer.start_as_current_span("save_orders_to_dynamodb") as db_span:
+                db_span.set_attribute("order_count", len(pending))
+
+                def record_write_error(error):
+                    error_type = (
+                        HoneycombErrorType.TIMEOUT
+                        if isinstance(error, DeadlineExceeded)
+                        else HoneycombErrorType.EXCEPTION
+                    )
+                    add_span_exception(db_span, error, error_type)
+
+                unwritten = batch_write_items(
+                    dynamodb,
+                    orders_table_name,
+                    [entry["item"] for entry in pending.values()],
+                    on_error=record_write_error,
+                )
+                db_span.set_attribute("unprocessed_count", len(unwritten))
+
+                unsaved = [pending.pop(item["order_id"]) for item in unwritten]
+                release_coupon_uses(unsaved)
+                for entry in unsaved:
+                    results[entry["index"]] = failed_result(
+                        entry["index"], "Order could not be saved, please retry"
+                    )
+
+                if unwritten:
+                    add_span_status(db_span, HoneycombStatus.FAILURE)
+                else:
+                    add_span_status(db_span, HoneycombStatus.SUCCESS)
+
+            for order_id, entry in pending.items():
+                item = entry["item"]
+                results[entry["index"]] = {
+                    "index": entry["index"],
+                    "order_id": order_id,
+                    "total_price": round(float(item["total_price"]), 2),
+                    "discount_applied": float(item["discount_percentage"]),
+                    "status": "CREATED",
+                }
+
+            created = len(pending)
+            span.set_attribute("batch.created", created)
+            span.set_attribute("batch.failed", len(orders) - created)
+
+            if created == len(orders):
+                add_span_status(span, HoneycombStatus.SUCCESS)
+                status_code = 201
+            else:
+                add_span_status(span, HoneycombStatus.FAILURE)
+                status_code = 207
+
+            return {
+                "statusCode": status_code,
+                "headers": get_cors_headers(),
+                "body": json.dumps(
+                    {
+                        "created": created,
+                        "failed": len(orders) - created,
+                        "results": results,
+                    }
+                ),
+            }
+
+        except ValueError as e:
+            add_span_exception(span, e, HoneycombErrorType.INVALID_DATA)
+            return {
+                "statusCode": 400,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
+        except DeadlineExceeded as e:
+            add_span_exception(span, e, HoneycombErrorType.TIMEOUT)
+            return {
+                "statusCode": 503,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
+        except Exception as e:
+            add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+            return {
+                "statusCode": 500,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
+
+
+def failed_result(index, error):
+    """Per-order result for an order that was not created"""
+    return {"index": index, "status": "FAILED", "error": error}
+
+
+def release_coupon_uses(entries):
+    """
+    Give back coupon uses redeemed for orders that were not saved. A failed
+    release is recorded on the span rather than raised, so it cannot turn
+    a partly saved batch into an error response.
+    """
+    for entry in entries:
+        if entry["usage_shard"] is None:
+            continue
+        try:
+            coupon_usage.release(entry["item"]["coupon_code"], entry["usage_shard"])
+        except Exception as e:
+            add_span_exception(
+                trace.get_current_span(), e, HoneycombErrorType.EXCEPTION
+            )
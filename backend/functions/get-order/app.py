@@ -1,32 +1,59 @@
 import json
 import os
-import boto3
 from opentelemetry import trace
-from honeycomb.init import initialize_tracing
-from honeycomb.context import set_trace_context
-from honeycomb.common_attributes import add_span_exception, add_span_status
-from honeycomb.enums import HoneycombStatus, HoneycombErrorType
-from honeycomb.utils import get_user_context, get_cors_headers, DecimalEncoder
-from honeycomb.event_processor import add_common_span_attributes
-from chaos_utils import inject_dynamodb_chaos
+from honeycomb.init_profiler import LazyClient, profile_init
+
+with profile_init("import.boto3"):
+    from honeycomb.clients import get_client, add_connection_stats
+with profile_init("import.honeycomb"):
+    from honeycomb.init import initialize_tracing
+    from honeycomb.context import set_trace_context
+    from honeycomb.deadline import start_deadline, DeadlineExceeded
+    from honeycomb.common_attributes import add_span_exception, add_span_status
+    from honeycomb.enums import HoneycombStatus, HoneycombErrorType
+    from honeycomb.utils import (
+        get_user_context,
+        get_cors_headers,
+        get_body,
+        compress_response,
+    )
+    from honeycomb.event_processor import add_common_span_attributes
+with profile_init("import.chaos_utils"):
+    from chaos_utils import inject_dynamodb_chaos
+with profile_init("import.shop"):
+    from shop.dynamodb import batch_get_items, item_to_json, items_to_json
 
 # Initialize custom tracing processor
 initialize_tracing()
 
-dynamodb = boto3.resource("dynamodb")
-orders_table = dynamodb.Table(os.environ["ORDERS_TABLE"])
+# Low-level client: items are serialized from the wire format directly.
+# Built on first use; construction time is recorded on the cold-start span
+dynamodb = LazyClient("dynamodb", lambda: get_client("dynamodb"))
+orders_table_name = os.environ["ORDERS_TABLE"]
+
+# Most order IDs accepted by one POST /orders/lookup
+max_lookup_orders = int(os.environ.get("MAX_LOOKUP_ORDERS", 100))
 
 tracer = trace.get_tracer(__name__)
 
 
 def lambda_handler(event, context):
-    """Get order by ID"""
+    """Get order by ID, or several orders with POST /orders/lookup"""
     set_trace_context(event)
+    start_deadline(context)
+
+    if event.get("httpMethod") == "POST":
+        return lookup_orders(event)
+    return get_order(event)
 
+
+def get_order(event):
+    """Get one of the user's orders by ID"""
     with tracer.start_as_current_span("get_order") as span:
         try:
             # Extract context first
             add_common_span_attributes(event, span)
+            add_connection_stats(span)
 
             order_id = event["pathParameters"]["order_id"]
             user_context = get_user_context(event)
@@ -35,8 +62,12 @@ def lambda_handler(event, context):
 
             # Get order from DynamoDB using composite key
             inject_dynamodb_chaos()
-            response = orders_table.get_item(
-                Key={"user_id": user_context["user_id"], "order_id": order_id}
+            response = dynamodb.get_item(
+                TableName=orders_table_name,
+                Key={
+                    "user_id": {"S": user_context["user_id"]},
+                    "order_id": {"S": order_id},
+                },
             )
 
             if "Item" not in response:
@@ -50,12 +81,94 @@ def lambda_handler(event, context):
 
             add_span_status(span, HoneycombStatus.SUCCESS)
 
+            return compress_response(
+                event,
+                {
+                    "statusCode": 200,
+                    "headers": get_cors_headers(),
+                    "body": item_to_json(response["Item"]),
+                },
+            )
+
+        except DeadlineExceeded as e:
+            add_span_exception(span, e, HoneycombErrorType.TIMEOUT)
             return {
-                "statusCode": 200,
+                "statusCode": 503,
                 "headers": get_cors_headers(),
-                "body": json.dumps(response["Item"], cls=DecimalEncoder),
+                "body": json.dumps({"error": str(e)}),
             }
+        except Exception as e:
+            add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+            return {
+                "statusCode": 500,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
+
+
+def lookup_orders(event):
+    """
+    Get up to max_lookup_orders of the user's orders in one request.
+
+    The orders are fetched with BatchGetItem rather than one GetItem
+    each, and returned in the requested order; IDs that do not match
+    one of the user's orders are listed under "missing".
+    """
+    with tracer.start_as_current_span("lookup_orders") as span:
+        try:
+            add_common_span_attributes(event, span)
+            add_connection_stats(span)
+
+            user_context = get_user_context(event)
+            body = json.loads(get_body(event))
+            order_ids = parse_order_ids(body.get("order_ids"))
+            span.set_attribute("orders.requested", len(order_ids))
+
+            keys = [
+                {
+                    "user_id": {"S": user_context["user_id"]},
+                    "order_id": {"S": order_id},
+                }
+                for order_id in order_ids
+            ]
 
+            inject_dynamodb_chaos()
+            items = batch_get_items(dynamodb, orders_table_name, keys)
+
+            found = {item["order_id"]["S"]: item for item in items}
+            missing = [order_id for order_id in order_ids if order_id not in found]
+            span.set_attribute("orders.found", len(found))
+            span.set_attribute("orders.missing", len(missing))
+            add_span_status(span, HoneycombStatus.SUCCESS)
+
+            orders = [found[order_id] for order_id in order_ids if order_id in found]
+            return compress_response(
+                event,
+                {
+                    "statusCode": 200,
+                    "headers": get_cors_headers(),
+                    "body": '{"orders":'
+                    + items_to_json(orders)
+                    + ',"missing":'
+                    + json.dumps(missing)
+                    + "}",
+                },
+            )
+
+        except ValueError as e:
+            add_span_exception(span, e, HoneycombErrorType.INVALID_DATA)
+            return {
+                "statusCode": 400,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
+        except DeadlineExceeded as e:
+            add_span_exception(span, e, HoneycombErrorType.TIMEOUT)
+            return {
+                "statusCode": 503,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
         except Exception as e:
             add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
             return {
@@ -63,3 +176,16 @@ def lambda_handler(event, context):
                 "headers": get_cors_headers(),
                 "body": json.dumps({"error": str(e)}),
             }
+
+
+def parse_order_ids(order_ids):
+    """Distinct requested order IDs in request order; ValueError if invalid"""
+    if not isinstance(order_ids, list) or not order_ids:
+        raise ValueError("order_ids must be a non-empty list")
+    if not all(isinstance(order_id, str) and order_id for order_id in order_ids):
+        raise ValueError("order_ids must be non-empty strings")
+
+    order_ids = list(dict.fromkeys(order_ids))
+    if len(order_ids) > max_lookup_orders:
+        raise ValueError(f"At most {max_lookup_orders} order_ids per lookup")
+    return order_ids
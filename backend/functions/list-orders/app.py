@@ -1,31 +1,62 @@
 import json
 import os
 import base64
-import boto3
-from boto3.dynamodb.conditions import Key
 from opentelemetry import trace
-from honeycomb.init import initialize_tracing
-from honeycomb.context import set_trace_context
-from honeycomb.common_attributes import add_span_exception, add_span_status
-from honeycomb.enums import HoneycombStatus, HoneycombErrorType
-from honeycomb.utils import get_user_context, get_cors_headers, DecimalEncoder
-from honeycomb.event_processor import add_common_span_attributes
-from chaos_utils import inject_dynamodb_chaos
+from honeycomb.init_profiler import LazyClient, profile_init
+
+with profile_init("import.boto3"):
+    from honeycomb.clients import get_client, add_connection_stats
+with profile_init("import.honeycomb"):
+    from honeycomb.init import initialize_tracing
+    from honeycomb.context import set_trace_context
+    from honeycomb.deadline import start_deadline, DeadlineExceeded
+    from honeycomb.common_attributes import add_span_exception, add_span_status
+    from honeycomb.enums import HoneycombStatus, HoneycombErrorType
+    from honeycomb.utils import (
+        get_user_context,
+        get_cors_headers,
+        compress_response,
+    )
+    from honeycomb.event_processor import add_common_span_attributes
+with profile_init("import.chaos_utils"):
+    from chaos_utils import inject_dynamodb_chaos
+with profile_init("import.shop"):
+    from shop.dynamodb import item_to_json, items_to_json
+    from shop.orders import parse_order_date, ulid_lower_bound, ulid_upper_bound
 
 # Initialize custom tracing processor
 initialize_tracing()
 
-dynamodb = boto3.resource("dynamodb")
-orders_table = dynamodb.Table(os.environ["ORDERS_TABLE"])
+# Low-level client: items are serialized from the wire format directly.
+# Built on first use; construction time is recorded on the cold-start span
+dynamodb = LazyClient("dynamodb", lambda: get_client("dynamodb"))
+orders_table_name = os.environ["ORDERS_TABLE"]
+order_stats_table_name = os.environ["ORDER_STATS_TABLE"]
+
+# Server-enforced page size bounds
+default_page_size = int(os.environ.get("LIST_ORDERS_DEFAULT_PAGE_SIZE", 25))
+max_page_size = int(os.environ.get("LIST_ORDERS_MAX_PAGE_SIZE", 100))
+
+# fields=summary reads only what an order history list shows
+SUMMARY_PROJECTION = "order_id, created_at, total_price, #status"
+SUMMARY_ATTRIBUTE_NAMES = {"#status": "status"}
+
+# Open ends of a from/to date range
+MIN_DATE = "1970-01-01"
+MAX_DATE = "9999-12-31"
 
 tracer = trace.get_tracer(__name__)
 
 
 def lambda_handler(event, context):
-    """List all orders for the authenticated user"""
+    """
+    List all orders for the authenticated user, or with ?view=stats their
+    order count, total spent and latest order from a single item read
+    """
 
     # Extract context first
     set_trace_context(event)
+    start_deadline(context)
 
     with tracer.start_as_current_span("list_orders") as span:
         try:
@@ -33,51 +64,122 @@ def lambda_handler(event, context):
 
             # Get pagination params
             query_params = event.get("queryStringParameters") or {}
-            page_size = int(query_params.get("page_size", 100))
+            page_size = parse_page_size(query_params.get("page_size"))
+            fields = query_params.get("fields", "full")
             after = query_params.get("after")
+            date_from = query_params.get("from")
+            date_to = query_params.get("to")
+            view = query_params.get("view", "orders")
 
             add_common_span_attributes(event, span)
+            add_connection_stats(span)
+
+            if view not in ("orders", "stats"):
+                raise ValueError("view must be 'orders' or 'stats'")
+            span.set_attribute("orders.view", view)
+
+            if view == "stats":
+                body = get_order_stats(user_context["user_id"])
+                add_span_status(span, HoneycombStatus.SUCCESS)
+                return compress_response(
+                    event,
+                    {"statusCode": 200, "headers": get_cors_headers(), "body": body},
+                )
+
+            if fields not in ("full", "summary"):
+                raise ValueError("fields must be 'full' or 'summary'")
+
+            span.set_attribute("pagination.page_size", page_size)
+            span.set_attribute("orders.fields", fields)
+
+            # Order IDs are ULIDs, so a date range is a range of order IDs
+            key_condition = "user_id = :user_id"
+            attribute_values = {":user_id": {"S": user_context["user_id"]}}
+            if date_from or date_to:
+                lower = ulid_lower_bound(parse_order_date(date_from or MIN_DATE))
+                upper = ulid_upper_bound(
+                    parse_order_date(date_to or MAX_DATE, end_of_day=True)
+                )
+                if lower > upper:
+                    raise ValueError("from must not be after to")
+                key_condition += " AND order_id BETWEEN :lower AND :upper"
+                attribute_values[":lower"] = {"S": lower}
+                attribute_values[":upper"] = {"S": upper}
+                span.set_attribute("orders.from", date_from or "")
+                span.set_attribute("orders.to", date_to or "")
 
             # Build query params
             query_kwargs = {
-                "KeyConditionExpression": Key("user_id").eq(user_context["user_id"]),
+                "TableName": orders_table_name,
+                "KeyConditionExpression": key_condition,
+                "ExpressionAttributeValues": attribute_values,
                 "Limit": page_size,
                 "ScanIndexForward": False,
+                "ReturnConsumedCapacity": "TOTAL",
             }
 
+            if fields == "summary":
+                query_kwargs["ProjectionExpression"] = SUMMARY_PROJECTION
+                query_kwargs["ExpressionAttributeNames"] = SUMMARY_ATTRIBUTE_NAMES
+
             # Add exclusive start key if cursor provided
             if after:
                 try:
                     start_key = json.loads(base64.b64decode(after).decode())
-                    query_kwargs["ExclusiveStartKey"] = start_key
+                    query_kwargs["ExclusiveStartKey"] = {
+                        name: {"S": value} for name, value in start_key.items()
+                    }
                     span.set_attribute("pagination.has_cursor", True)
                 except Exception as e:
                     span.set_attribute("pagination.cursor_error", str(e))
 
             # Query orders
             inject_dynamodb_chaos()
-            response = orders_table.query(**query_kwargs)
+            response = dynamodb.query(**query_kwargs)
 
             span.set_attribute("order_count", len(response["Items"]))
+            span.set_attribute(
+                "dynamodb.consumed_capacity",
+                float(response.get("ConsumedCapacity", {}).get("CapacityUnits", 0)),
+            )
             add_span_status(span, HoneycombStatus.SUCCESS)
 
-            # Build response
-            result = {"items": response["Items"]}
+            # Build response straight from the wire-format items
+            body = '{"items":' + items_to_json(response["Items"])
 
-            # Add next cursor if more results exist
+            # Add next cursor if more results exist; keys are plain strings
             if "LastEvaluatedKey" in response:
-                next_cursor = base64.b64encode(
-                    json.dumps(response["LastEvaluatedKey"]).encode()
-                ).decode()
-                result["after"] = next_cursor
+                last_key = {
+                    name: value["S"]
+                    for name, value in response["LastEvaluatedKey"].items()
+                }
+                next_cursor = base64.b64encode(json.dumps(last_key).encode()).decode()
+                body += ',"after":' + json.dumps(next_cursor)
                 span.set_attribute("pagination.has_more", True)
 
+            return compress_response(
+                event,
+                {
+                    "statusCode": 200,
+                    "headers": get_cors_headers(),
+                    "body": body + "}",
+                },
+            )
+
+        except ValueError as e:
+            add_span_exception(span, e, HoneycombErrorType.INVALID_DATA)
             return {
-                "statusCode": 200,
+                "statusCode": 400,
                 "headers": get_cors_headers(),
-                "body": json.dumps(result, cls=DecimalEncoder),
+                "body": json.dumps({"error": str(e)}),
+            }
+        except DeadlineExceeded as e:
+            add_span_exception(span, e, HoneycombErrorType.TIMEOUT)
+            return {
+                "statusCode": 503,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
             }
-
         except Exception as e:
             add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
             return {
@@ -85,3 +187,30 @@ def lambda_handler(event, context):
                 "headers": get_cors_headers(),
                 "body": json.dumps({"error": str(e)}),
             }
+
+
+def get_order_stats(user_id):
+    """JSON text of the user's order stats, with zero totals if they have none"""
+    inject_dynamodb_chaos()
+    response = dynamodb.get_item(
+        TableName=order_stats_table_name, Key={"user_id": {"S": user_id}}
+    )
+    item = response.get("Item") or {
+        "user_id": {"S": user_id},
+        "order_count": {"N": "0"},
+        "total_spent": {"N": "0"},
+    }
+    return item_to_json(item)
+
+
+def parse_page_size(value):
+    """Requested page size, clamped to the server maximum"""
+    if value is None:
+        return default_page_size
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise ValueError("page_size must be an integer")
+    if page_size < 1:
+        raise ValueError("page_size must be positive")
+    return min(page_size, max_page_size)
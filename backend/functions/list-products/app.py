@@ -1,80 +1,244 @@
+import hashlib
 import json
+import os
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
 from opentelemetry import trace
-from honeycomb.init import initialize_tracing
-from honeycomb.context import set_trace_context
-from honeycomb.common_attributes import add_span_status
-from honeycomb.enums import HoneycombStatus
-from honeycomb.utils import get_user_context, get_cors_headers, DecimalEncoder
-from honeycomb.event_processor import add_common_span_attributes
-from chaos_utils import inject_dynamodb_chaos
+from honeycomb.init_profiler import LazyClient, profile_init
+
+with profile_init("import.boto3"):
+    from honeycomb.clients import get_client, add_connection_stats
+with profile_init("import.honeycomb"):
+    from honeycomb.init import initialize_tracing
+    from honeycomb.context import set_trace_context
+    from honeycomb.deadline import start_deadline, DeadlineExceeded
+    from honeycomb.common_attributes import add_span_exception, add_span_status
+    from honeycomb.enums import HoneycombStatus, HoneycombErrorType
+    from honeycomb.utils import (
+        get_cors_headers,
+        get_header,
+        compress_response,
+        encoded_etag,
+        ENCODERS,
+    )
+    from honeycomb.event_processor import add_common_span_attributes
+with profile_init("import.shop"):
+    from shop.catalog import ProductCatalog
 
 initialize_tracing()
 tracer = trace.get_tracer(__name__)
 
-PRODUCTS = [
-    {
-        "id": 1,
-        "name": "Wireless Headphones",
-        "description": "Premium noise-cancelling wireless headphones",
-        "price": 299.99,
-        "image": "https://placehold.co/300x200/1976D2/white?text=Headphones",
-        "category": "Electronics",
-    },
-    {
-        "id": 2,
-        "name": "Smart Watch",
-        "description": "Fitness tracking smartwatch with heart rate monitor",
-        "price": 199.99,
-        "image": "https://placehold.co/300x200/1976D2/white?text=Smart+Watch",
-        "category": "Electronics",
-    },
-    {
-        "id": 3,
-        "name": "Laptop Backpack",
-        "description": "Durable laptop backpack with multiple compartments",
-        "price": 79.99,
-        "image": "https://placehold.co/300x200/1976D2/white?text=Backpack",
-        "category": "Accessories",
-    },
-    {
-        "id": 4,
-        "name": "Bluetooth Speaker",
-        "description": "Portable waterproof Bluetooth speaker",
-        "price": 89.99,
-        "image": "https://placehold.co/300x200/1976D2/white?text=Speaker",
-        "category": "Electronics",
-    },
-    {
-        "id": 5,
-        "name": "USB-C Hub",
-        "description": "7-in-1 USB-C hub with HDMI and card reader",
-        "price": 49.99,
-        "image": "https://placehold.co/300x200/1976D2/white?text=USB+Hub",
-        "category": "Accessories",
-    },
-    {
-        "id": 6,
-        "name": "Wireless Mouse",
-        "description": "Ergonomic wireless mouse with precision tracking",
-        "price": 39.99,
-        "image": "https://placehold.co/300x200/1976D2/white?text=Mouse",
-        "category": "Accessories",
-    },
-]
+# Shared caches (CloudFront) may keep the catalog longer than browsers
+CACHE_CONTROL = os.environ.get(
+    "CATALOG_CACHE_CONTROL",
+    "public, max-age=60, s-maxage=300, stale-while-revalidate=600",
+)
+default_page_size = int(os.environ.get("CATALOG_DEFAULT_PAGE_SIZE", 24))
+max_page_size = int(os.environ.get("CATALOG_MAX_PAGE_SIZE", 100))
+
+# Rendered responses per catalog version and query
+RESPONSE_CACHE_SIZE = int(os.environ.get("CATALOG_RESPONSE_CACHE_SIZE", 256))
+response_cache = OrderedDict()
+
+dynamodb = LazyClient("dynamodb", lambda: get_client("dynamodb"))
+catalog = ProductCatalog(dynamodb, os.environ["PRODUCTS_TABLE"])
+
+# Load the index during init; if that fails the first request retries it
+try:
+    with profile_init("catalog.load"):
+        catalog.load()
+except Exception as e:
+    print(f"Catalog load during init failed: {e}")
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Weak comparison of an If-None-Match header against our ETag or that of
+    any compressed representation, returning the matching tag (or None)
+    """
+    if not if_none_match:
+        return None
+    current = {etag} | {encoded_etag(etag, encoding) for encoding in ENCODERS}
+    for tag in (tag.strip() for tag in if_none_match.split(",")):
+        if tag == "*":
+            return etag
+        if tag.removeprefix("W/") in current:
+            return tag.removeprefix("W/")
+    return None
+
+
+def parse_price(value, name):
+    if value is None:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"{name} must be a number")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    return price
+
+
+def parse_positive_int(value, name, default):
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if number < 1:
+        raise ValueError(f"{name} must be positive")
+    return number
+
+
+def parse_query(query_params):
+    """Validated, normalised search parameters from the query string"""
+    category = query_params.get("category")
+    page_size = parse_positive_int(
+        query_params.get("page_size"), "page_size", default_page_size
+    )
+    return {
+        "category": tuple(
+            sorted(
+                name.strip().lower() for name in category.split(",") if name.strip()
+            )
+        )
+        if category
+        else (),
+        "min_price": parse_price(query_params.get("min_price"), "min_price"),
+        "max_price": parse_price(query_params.get("max_price"), "max_price"),
+        "query": (query_params.get("q") or "").strip(),
+        "sort": query_params.get("sort", "name"),
+        "page": parse_positive_int(query_params.get("page"), "page", 1),
+        "page_size": min(page_size, max_page_size),
+    }
+
+
+def render_response(search):
+    """Body and ETag for one search of the catalog, with room for encodings"""
+    items, total = catalog.search(
+        category=search["category"],
+        min_price=search["min_price"],
+        max_price=search["max_price"],
+        query=search["query"],
+        sort=search["sort"],
+        offset=(search["page"] - 1) * search["page_size"],
+        limit=search["page_size"],
+    )
+    body = (
+        '{"items":['
+        + ",".join(items)
+        + f'],"total":{total},"page":{search["page"]},'
+        + f'"page_size":{search["page_size"]}}}'
+    )
+    etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+    # Compressed bodies are kept with the response by compress_response
+    return {"body": body, "etag": etag, "encoded": {}, "total": total}
+
+
+def get_response(search):
+    """Rendered response for a search, cached per catalog version"""
+    key = (catalog.version, tuple(search.items()))
+    response = response_cache.get(key)
+    if response is not None:
+        response_cache.move_to_end(key)
+        return response, True
+
+    response = render_response(search)
+    response_cache[key] = response
+    if len(response_cache) > RESPONSE_CACHE_SIZE:
+        response_cache.popitem(last=False)
+    return response, False
 
 
 def lambda_handler(event, context):
     set_trace_context(event)
+    deadline = start_deadline(context)
 
     with tracer.start_as_current_span("list_products") as span:
-        span.set_attribute("product_count", len(PRODUCTS))
+        try:
+            add_common_span_attributes(event, span)
+            add_connection_stats(span)
+
+            search = parse_query(event.get("queryStringParameters") or {})
+
+            due = catalog.refresh_due()
+            # An incremental refresh can wait for a request with time to spare
+            if due == "refresh" and not deadline.allows_optional("catalog_refresh"):
+                due = None
+            if due:
+                with tracer.start_as_current_span("refresh_catalog") as refresh_span:
+                    refresh_span.set_attribute("catalog.refresh", due)
+                    try:
+                        catalog.ensure_fresh()
+                    except Exception as e:
+                        # Nothing to serve until a load succeeds
+                        if catalog.loaded_at is None:
+                            raise
+                        error_type = (
+                            HoneycombErrorType.TIMEOUT
+                            if isinstance(e, DeadlineExceeded)
+                            else HoneycombErrorType.EXCEPTION
+                        )
+                        add_span_exception(refresh_span, e, error_type)
+                        span.set_attribute("catalog.stale", True)
+                    catalog.add_span_attributes(refresh_span)
+            catalog.add_span_attributes(span)
+
+            with tracer.start_as_current_span("query_catalog") as query_span:
+                for name, value in search.items():
+                    if value:
+                        query_span.set_attribute(f"catalog.query.{name}", str(value))
+                response, cached = get_response(search)
+                query_span.set_attribute("catalog.response_cached", cached)
+                query_span.set_attribute("product_count", response["total"])
+
+            headers = {
+                **get_cors_headers(),
+                "Cache-Control": CACHE_CONTROL,
+                "ETag": response["etag"],
+                "Vary": "Accept-Encoding",
+            }
+
+            matched_etag = etag_matches(
+                get_header(event, "If-None-Match"), response["etag"]
+            )
+            span.set_attribute("cache.not_modified", matched_etag is not None)
+
+            add_span_status(span, HoneycombStatus.SUCCESS)
 
-        add_common_span_attributes(event, span)
+            if matched_etag is not None:
+                # The tag of the representation the client already holds
+                return {
+                    "statusCode": 304,
+                    "headers": {**headers, "ETag": matched_etag},
+                    "body": "",
+                }
 
-        add_span_status(span, HoneycombStatus.SUCCESS)
+            return compress_response(
+                event,
+                {"statusCode": 200, "headers": headers, "body": response["body"]},
+                cache=response["encoded"],
+            )
 
-        return {
-            "statusCode": 200,
-            "headers": get_cors_headers(),
-            "body": json.dumps({"items": PRODUCTS}),
-        }
+        except ValueError as e:
+            add_span_exception(span, e, HoneycombErrorType.INVALID_DATA)
+            return {
+                "statusCode": 400,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
+        except DeadlineExceeded as e:
+            add_span_exception(span, e, HoneycombErrorType.TIMEOUT)
+            return {
+                "statusCode": 503,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
+        except Exception as e:
+            add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+            return {
+                "statusCode": 500,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"error": str(e)}),
+            }
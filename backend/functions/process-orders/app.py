@@ -0,0 +1,289 @@
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+from opentelemetry import trace
+from honeycomb.init_profiler import LazyClient, profile_init
+
+with profile_init("import.boto3"):
+    from boto3.dynamodb.conditions import Key
+    from boto3.dynamodb.types import TypeDeserializer
+    from botocore.exceptions import ClientError
+    from honeycomb.clients import get_resource, add_connection_stats
+with profile_init("import.honeycomb"):
+    from honeycomb.init import initialize_tracing
+    from honeycomb.context import set_trace_context
+    from honeycomb.deadline import start_deadline, DeadlineExceeded
+    from honeycomb.common_attributes import (
+        add_common_context,
+        add_span_exception,
+        add_span_status,
+    )
+    from honeycomb.enums import HoneycombStatus, HoneycombErrorType
+with profile_init("import.chaos_utils"):
+    from chaos_utils import inject_dynamodb_chaos
+with profile_init("import.shop"):
+    from shop.coupon_cache import CouponCache
+    from shop.coupons import validate_coupon
+    from shop.coupon_usage import CouponUsage
+    from shop.pricing import PriceResolver
+    from shop.orders import (
+        calculate_base_price,
+        apply_discount,
+        PENDING_INDEX,
+        PENDING_ATTRIBUTE,
+    )
+
+# Initialize custom tracing processor
+initialize_tracing()
+
+# Built on first use; construction time is recorded on the cold-start span
+dynamodb = LazyClient("dynamodb", lambda: get_resource("dynamodb"))
+orders_table = LazyClient(
+    "orders_table", lambda: dynamodb.Table(os.environ["ORDERS_TABLE"])
+)
+coupon_usage = CouponUsage(dynamodb, os.environ["COUPON_USAGE_TABLE"])
+price_resolver = PriceResolver(dynamodb, os.environ["PRODUCTS_TABLE"])
+coupon_cache = CouponCache(
+    LazyClient("coupons_table", lambda: dynamodb.Table(os.environ["COUPONS_TABLE"])),
+    usage_reader=coupon_usage.usage_attributes,
+)
+
+# Longer than the stream mapping's maximum record age, so an order is only
+# swept once its stream record can no longer be retried
+pending_timeout_seconds = int(os.environ.get("PENDING_ORDER_TIMEOUT_SECONDS", 900))
+
+deserializer = TypeDeserializer()
+
+tracer = trace.get_tracer(__name__)
+
+
+def lambda_handler(event, context):
+    """
+    Finalise PENDING orders from the orders table stream: price their items,
+    redeem coupons and mark each order CREATED or FAILED.
+
+    Products and coupons are looked up once for the whole batch. Records
+    that hit an unexpected error are reported as batch item failures so
+    only they (and later records) are retried; finalising is conditional
+    on the order still being PENDING, so a retried order is never applied
+    twice.
+
+    A scheduled (EventBridge) invocation instead sweeps orders left PENDING
+    past PENDING_ORDER_TIMEOUT_SECONDS, e.g. because their stream record
+    was dropped after its last retry, and marks them FAILED.
+    """
+    set_trace_context(event)
+    start_deadline(context)
+
+    if event.get("source") == "aws.events":
+        return sweep_stale_orders()
+
+    with tracer.start_as_current_span("process_orders") as span:
+        add_connection_stats(span)
+
+        pending = pending_orders(event.get("Records", []))
+        span.set_attribute("batch.records", len(event.get("Records", [])))
+        span.set_attribute("batch.pending_orders", len(pending))
+
+        failures = []
+        try:
+            with tracer.start_as_current_span("resolve_prices") as price_span:
+                products = price_resolver.get_products(
+                    item["product_id"]
+                    for _, order in pending
+                    for item in order["items"]
+                )
+                price_resolver.add_span_attributes(price_span)
+
+            # Validate each distinct coupon once for the whole batch
+            coupon_codes = {
+                order["coupon_code"]
+                for _, order in pending
+                if order.get("coupon_code", "none") != "none"
+            }
+            with tracer.start_as_current_span("validate_coupons") as coupon_span:
+                coupon_span.set_attribute("coupon.distinct_codes", len(coupon_codes))
+                coupon_results = {
+                    code: validate_coupon(code, coupon_cache) for code in coupon_codes
+                }
+        except Exception as e:
+            # Nothing finalised yet: retry the whole batch
+            add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+            return {
+                "batchItemFailures": [
+                    {"itemIdentifier": sequence} for sequence, _ in pending
+                ]
+            }
+
+        outcomes = {"CREATED": 0, "FAILED": 0, "SKIPPED": 0}
+        for sequence_number, order in pending:
+            try:
+                outcome = process_order(order, products, coupon_results)
+                outcomes[outcome] += 1
+            except Exception as e:
+                if not isinstance(e, DeadlineExceeded):
+                    add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+                failures.append({"itemIdentifier": sequence_number})
+
+        for outcome, count in outcomes.items():
+            span.set_attribute(f"batch.{outcome.lower()}", count)
+        span.set_attribute("batch.retried", len(failures))
+        add_span_status(
+            span, HoneycombStatus.FAILURE if failures else HoneycombStatus.SUCCESS
+        )
+        return {"batchItemFailures": failures}
+
+
+def sweep_stale_orders():
+    """Mark orders PENDING for longer than the timeout FAILED"""
+    with tracer.start_as_current_span("sweep_pending_orders") as span:
+        add_connection_stats(span)
+        cutoff = datetime.utcnow() - timedelta(seconds=pending_timeout_seconds)
+        span.set_attribute("sweep.cutoff", cutoff.isoformat())
+
+        outcomes = {"FAILED": 0, "SKIPPED": 0}
+        query_kwargs = {
+            "IndexName": PENDING_INDEX,
+            "KeyConditionExpression": Key(PENDING_ATTRIBUTE).eq("PENDING")
+            & Key("created_at").lt(cutoff.isoformat()),
+        }
+        try:
+            while True:
+                inject_dynamodb_chaos()
+                response = orders_table.query(**query_kwargs)
+                for order in response["Items"]:
+                    with tracer.start_as_current_span("expire_order") as order_span:
+                        order_span.set_attribute("order_id", order["order_id"])
+                        outcome = fail_order(
+                            order_span, order, "Order processing timed out"
+                        )
+                        outcomes[outcome] += 1
+                if "LastEvaluatedKey" not in response:
+                    break
+                query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except DeadlineExceeded as e:
+            # The next scheduled sweep carries on from the oldest order left
+            add_span_exception(span, e, HoneycombErrorType.TIMEOUT)
+        except Exception as e:
+            add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+            raise
+
+        for outcome, count in outcomes.items():
+            span.set_attribute(f"sweep.{outcome.lower()}", count)
+        add_span_status(span, HoneycombStatus.SUCCESS)
+        return outcomes
+
+
+def pending_orders(records):
+    """(sequence number, order) for each newly inserted PENDING order"""
+    orders = []
+    for record in records:
+        image = record.get("dynamodb", {}).get("NewImage")
+        if record.get("eventName") != "INSERT" or not image:
+            continue
+        order = {name: deserializer.deserialize(value) for name, value in image.items()}
+        if order.get("status") == "PENDING":
+            orders.append((record["dynamodb"]["SequenceNumber"], order))
+    return orders
+
+
+def process_order(order, products, coupon_results):
+    """Finalise one order, returning CREATED, FAILED or SKIPPED"""
+    with tracer.start_as_current_span("process_order") as span:
+        add_common_context(
+            span,
+            order.get("session_id", "unknown"),
+            {"user_id": order["user_id"], "email": order.get("user_email", "unknown")},
+        )
+        span.set_attribute("order_id", order["order_id"])
+
+        items = [
+            {"product_id": item["product_id"], "quantity": int(item["quantity"])}
+            for item in order["items"]
+        ]
+        try:
+            items = price_resolver.price_items(items, products)
+        except ValueError as e:
+            return fail_order(span, order, str(e))
+
+        total_price = calculate_base_price(items)
+        discount = 0
+        usage_shard = None
+        coupon_code = order.get("coupon_code", "none")
+        if coupon_code != "none":
+            coupon_result = coupon_results[coupon_code]
+            if not coupon_result["valid"]:
+                return fail_order(span, order, coupon_result["error"])
+            usage_shard = coupon_usage.redeem(coupon_cache.get_coupon(coupon_code))
+            if usage_shard is None:
+                return fail_order(span, order, "Coupon usage limit exceeded")
+            discount = coupon_result["discount_percentage"]
+            total_price = apply_discount(total_price, discount)
+
+        try:
+            finalise_order(
+                order,
+                "CREATED",
+                {
+                    "items": [
+                        {**item, "price": Decimal(str(item["price"]))} for item in items
+                    ],
+                    "discount_percentage": Decimal(str(discount)),
+                    "total_price": Decimal(str(total_price)),
+                },
+            )
+        except Exception as e:
+            # Hand the redeemed coupon use back; a retry redeems it again
+            if usage_shard is not None:
+                coupon_usage.release(coupon_code, usage_shard)
+            if is_condition_failure(e):
+                span.set_attribute("order.already_processed", True)
+                return "SKIPPED"
+            raise
+
+        span.set_attribute("order.total_price", float(total_price))
+        add_span_status(span, HoneycombStatus.SUCCESS)
+        return "CREATED"
+
+
+def fail_order(span, order, reason):
+    """Mark an order FAILED with the reason it could not be created"""
+    add_span_exception(span, ValueError(reason), HoneycombErrorType.INVALID_DATA)
+    try:
+        finalise_order(order, "FAILED", {"failure_reason": reason})
+    except Exception as e:
+        if not is_condition_failure(e):
+            raise
+        span.set_attribute("order.already_processed", True)
+        return "SKIPPED"
+    return "FAILED"
+
+
+def finalise_order(order, status, attributes):
+    """
+    Move an order out of PENDING (and the pending index), setting the given
+    attributes
+    """
+    attributes = {**attributes, "status": status}
+    attributes["processed_at"] = datetime.utcnow().isoformat()
+
+    inject_dynamodb_chaos()
+    orders_table.update_item(
+        Key={"user_id": order["user_id"], "order_id": order["order_id"]},
+        UpdateExpression="SET "
+        + ", ".join(f"#{name} = :{name}" for name in attributes)
+        + f" REMOVE {PENDING_ATTRIBUTE}",
+        ConditionExpression="#status = :pending",
+        ExpressionAttributeNames={f"#{name}": name for name in attributes},
+        ExpressionAttributeValues={
+            **{f":{name}": value for name, value in attributes.items()},
+            ":pending": "PENDING",
+        },
+    )
+
+
+def is_condition_failure(error):
+    return (
+        isinstance(error, ClientError)
+        and error.response["Error"]["Code"] == "ConditionalCheckFailedException"
+    )
@@ -0,0 +1,92 @@
+import os
+from opentelemetry import trace
+from honeycomb.init_profiler import LazyClient, profile_init
+
+with profile_init("import.boto3"):
+    from honeycomb.clients import get_client, add_connection_stats
+with profile_init("import.honeycomb"):
+    from honeycomb.init import initialize_tracing
+    from honeycomb.context import set_trace_context
+    from honeycomb.deadline import start_deadline, DeadlineExceeded
+    from honeycomb.common_attributes import add_span_exception, add_span_status
+    from honeycomb.enums import HoneycombStatus, HoneycombErrorType
+with profile_init("import.shop"):
+    from shop.order_stats import OrderStats
+
+# Initialize custom tracing processor
+initialize_tracing()
+
+# Built on first use; construction time is recorded on the cold-start span
+dynamodb = LazyClient("dynamodb", lambda: get_client("dynamodb"))
+order_stats = OrderStats(
+    dynamodb, os.environ["ORDER_STATS_TABLE"], os.environ["ORDERS_TABLE"]
+)
+
+tracer = trace.get_tracer(__name__)
+
+
+def lambda_handler(event, context):
+    """
+    Add newly CREATED orders from the orders table stream to their users'
+    order stats, off the order request path.
+
+    Each user's orders are counted in one transaction that also marks
+    them, so records retried after a failure (or delivered twice) are not
+    counted again. A user's records are reported as batch item failures
+    if their update fails.
+    """
+    set_trace_context(event)
+    start_deadline(context)
+
+    with tracer.start_as_current_span("update_order_stats") as span:
+        add_connection_stats(span)
+
+        records = event.get("Records", [])
+        orders = created_orders(records)
+        span.set_attribute("batch.records", len(records))
+        span.set_attribute("batch.created_orders", len(orders))
+
+        by_user = {}
+        for sequence_number, order in orders:
+            by_user.setdefault(order["user_id"]["S"], []).append(
+                (sequence_number, order)
+            )
+
+        recorded = 0
+        failures = []
+        for user_orders in by_user.values():
+            try:
+                recorded += order_stats.record([order for _, order in user_orders])
+            except Exception as e:
+                if not isinstance(e, DeadlineExceeded):
+                    add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
+                failures.extend(
+                    {"itemIdentifier": sequence_number}
+                    for sequence_number, _ in user_orders
+                )
+
+        span.set_attribute("batch.users", len(by_user))
+        already_recorded = len(orders) - recorded - len(failures)
+        span.set_attribute("batch.recorded", recorded)
+        span.set_attribute("batch.already_recorded", already_recorded)
+        span.set_attribute("batch.retried", len(failures))
+        add_span_status(
+            span, HoneycombStatus.FAILURE if failures else HoneycombStatus.SUCCESS
+        )
+        return {"batchItemFailures": failures}
+
+
+def created_orders(records):
+    """
+    (sequence number, wire-format order) for each CREATED, uncounted order,
+    keeping only the last record of an order that appears more than once
+    """
+    orders = {}
+    for record in records:
+        image = record.get("dynamodb", {}).get("NewImage")
+        if not image or "stats_recorded_at" in image:
+            continue
+        if image.get("status", {}).get("S") == "CREATED":
+            sequence_number = record["dynamodb"]["SequenceNumber"]
+            orders[image["order_id"]["S"]] = (sequence_number, image)
+    return list(orders.values())
@@ -1,20 +1,32 @@
 import json
 import os
-from datetime import datetime, timezone
-import boto3
 from opentelemetry import trace
-from honeycomb.init import initialize_tracing
-from honeycomb.context import set_trace_context
-from honeycomb.common_attributes import add_span_exception, add_span_status
-from honeycomb.enums import HoneycombStatus, HoneycombErrorType
-from honeycomb.utils import get_user_context, get_cors_headers
-from honeycomb.event_processor import add_common_span_attributes
-from chaos_utils import inject_dynamodb_chaos
+from honeycomb.init_profiler import LazyClient, profile_init
+
+with profile_init("import.boto3"):
+    from honeycomb.clients import get_resource, add_connection_stats
+with profile_init("import.honeycomb"):
+    from honeycomb.init import initialize_tracing
+    from honeycomb.context import set_trace_context
+    from honeycomb.deadline import start_deadline, DeadlineExceeded
+    from honeycomb.common_attributes import add_span_exception, add_span_status
+    from honeycomb.enums import HoneycombStatus, HoneycombErrorType
+    from honeycomb.utils import get_user_context, get_cors_headers, get_body
+    from honeycomb.event_processor import add_common_span_attributes
+with profile_init("import.shop"):
+    from shop.coupon_cache import CouponCache
+    from shop.coupons import validate_coupon
+    from shop.coupon_usage import CouponUsage
 
 initialize_tracing()
 
-dynamodb = boto3.resource("dynamodb")
-coupons_table = dynamodb.Table(os.environ["COUPONS_TABLE"])
+# Built on first use; construction time is recorded on the cold-start span
+dynamodb = LazyClient("dynamodb", lambda: get_resource("dynamodb"))
+coupons_table = LazyClient(
+    "coupons_table", lambda: dynamodb.Table(os.environ["COUPONS_TABLE"])
+)
+coupon_usage = CouponUsage(dynamodb, os.environ["COUPON_USAGE_TABLE"])
+coupon_cache = CouponCache(coupons_table, usage_reader=coupon_usage.usage_attributes)
 
 tracer = trace.get_tracer(__name__)
 
@@ -22,15 +34,17 @@ tracer = trace.get_tracer(__name__)
 def lambda_handler(event, context):
     """Validate coupon without reducing usage count"""
     set_trace_context(event)
+    start_deadline(context)
 
     with tracer.start_as_current_span("validate_coupon_preview") as span:
         try:
-            body = json.loads(event.get("body", "{}"))
+            body = json.loads(get_body(event))
             coupon_code = body.get("coupon_code")
             if coupon_code:
                 coupon_code = coupon_code.upper()
 
             add_common_span_attributes(event, span)
+            add_connection_stats(span)
 
             span.set_attribute("coupon.code", coupon_code)
 
@@ -44,73 +58,26 @@ def lambda_handler(event, context):
                     ),
                 }
 
-            inject_dynamodb_chaos()
-            response = coupons_table.get_item(Key={"coupon_code": coupon_code})
-
-            if "Item" not in response:
-                add_span_status(span, HoneycombStatus.INVALID_DATA)
-                return {
-                    "statusCode": 200,
-                    "headers": get_cors_headers(),
-                    "body": json.dumps(
-                        {"valid": False, "error": "Invalid coupon code"}
-                    ),
-                }
-
-            coupon = response["Item"]
-
-            if coupon.get("status") != "ACTIVE":
-                add_span_status(span, HoneycombStatus.INVALID_DATA)
-                return {
-                    "statusCode": 200,
-                    "headers": get_cors_headers(),
-                    "body": json.dumps(
-                        {
-                            "valid": False,
-                            "error": f"Coupon is {coupon.get('status', 'inactive')}",
-                        }
-                    ),
-                }
-
-            expiry_date = coupon.get("expiry_date")
-            if expiry_date:
-                expiry = datetime.fromisoformat(expiry_date)
-                if expiry < datetime.now(timezone.utc):
-                    return {
-                        "statusCode": 200,
-                        "headers": get_cors_headers(),
-                        "body": json.dumps(
-                            {"valid": False, "error": "Coupon has expired"}
-                        ),
-                    }
-
-            max_usage = int(coupon.get("max_usage_count", 0))
-            current_usage = int(coupon.get("current_usage_count", 0))
-
-            if max_usage > 0 and current_usage >= max_usage:
-                return {
-                    "statusCode": 200,
-                    "headers": get_cors_headers(),
-                    "body": json.dumps(
-                        {"valid": False, "error": "Coupon usage limit exceeded"}
-                    ),
-                }
-
-            discount_percentage = float(coupon.get("discount_percentage", 0))
-            add_span_status(span, HoneycombStatus.SUCCESS)
+            # Same rules as order creation, without redeeming a use
+            result = validate_coupon(coupon_code, coupon_cache)
+            add_span_status(
+                span,
+                HoneycombStatus.SUCCESS if result["valid"] else HoneycombStatus.FAILURE,
+            )
 
             return {
                 "statusCode": 200,
                 "headers": get_cors_headers(),
-                "body": json.dumps(
-                    {
-                        "valid": True,
-                        "discount_percentage": discount_percentage,
-                        "coupon_code": coupon_code,
-                    }
-                ),
+                "body": json.dumps(result),
             }
 
+        except DeadlineExceeded as e:
+            add_span_exception(span, e, HoneycombErrorType.TIMEOUT)
+            return {
+                "statusCode": 503,
+                "headers": get_cors_headers(),
+                "body": json.dumps({"valid": False, "error": str(e)}),
+            }
         except Exception as e:
             add_span_exception(span, e, HoneycombErrorType.EXCEPTION)
             return {
@@ -42,7 +42,9 @@ resource "aws_iam_policy" "dynamodb_access" {
         Effect = "Allow"
         Action = [
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
@@ -50,8 +52,24 @@ resource "aws_iam_policy" "dynamodb_access" {
         ]
         Resource = [
           aws_dynamodb_table.orders.arn,
-          aws_dynamodb_table.coupons.arn
+          "${aws_dynamodb_table.orders.arn}/index/*",
+          aws_dynamodb_table.order_stats.arn,
+          aws_dynamodb_table.coupons.arn,
+          aws_dynamodb_table.coupon_usage.arn,
+          aws_dynamodb_table.idempotency.arn,
+          aws_dynamodb_table.products.arn,
+          "${aws_dynamodb_table.products.arn}/index/*"
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = [aws_dynamodb_table.orders.stream_arn]
       }
     ]
   })
@@ -3,19 +3,64 @@
 
 locals {
   common_env_variables = {
-    ORDERS_TABLE  = aws_dynamodb_table.orders.name
-    COUPONS_TABLE = aws_dynamodb_table.coupons.name
+    ORDERS_TABLE      = aws_dynamodb_table.orders.name
+    ORDER_STATS_TABLE = aws_dynamodb_table.order_stats.name
+    COUPONS_TABLE     = aws_dynamodb_table.coupons.name
+
+    PRODUCTS_TABLE = aws_dynamodb_table.products.name
+
+    COUPON_USAGE_TABLE  = aws_dynamodb_table.coupon_usage.name
+    COUPON_USAGE_SHARDS = 10
 
     ENVIRONMENT                        = var.environment
     OPENTELEMETRY_COLLECTOR_CONFIG_URI = var.collector_config_s3_uri
     AWS_LAMBDA_EXEC_WRAPPER            = "/opt/otel-instrument"
     OTEL_PROPAGATORS                   = "tracecontext,xray"
     OTEL_SERVICE_NAME                  = var.honeycomb_dataset
+
+    HONEYCOMB_MAX_ATTRIBUTE_LENGTH = 4096
+    HONEYCOMB_FULL_EVENT           = "on_error"
+    HONEYCOMB_RECORD_RESPONSE      = "on_error"
+    HONEYCOMB_SLOW_TRACE_MS        = 1000
+    HONEYCOMB_DEFAULT_SAMPLE_RATE  = 1
+    HONEYCOMB_SAMPLE_RATES = jsonencode({
+      "GET /products"          = 5
+      "GET /orders"            = 5
+      "GET /orders/{order_id}" = 5
+    })
+    # Head-dropped traces are never recorded, failures included; the tail
+    # rates apply to the rest (GET /products keeps 1 in 2 x 5 successes)
+    HONEYCOMB_DEFAULT_HEAD_SAMPLE_RATE = 1
+    HONEYCOMB_HEAD_SAMPLE_RATES = jsonencode({
+      "GET /products" = 2
+    })
+
+    EMF_METRICS   = true
+    EMF_NAMESPACE = "ShopTrace/${var.environment}"
+
+    CHAOS_CONFIG_TTL_SECONDS = 60
+
+    BOTO_CONNECT_TIMEOUT      = 1
+    BOTO_READ_TIMEOUT         = 5
+    BOTO_MAX_ATTEMPTS         = 3
+    BOTO_MAX_POOL_CONNECTIONS = 25
+
+    DEADLINE_RESERVE_MS           = 500
+    DEADLINE_MIN_CALL_MS          = 50
+    DEADLINE_OPTIONAL_WORK_MIN_MS = 1500
+
+    RESPONSE_COMPRESSION           = var.response_compression
+    RESPONSE_COMPRESSION_MIN_BYTES = 1024
+
+    COUPON_CACHE_TTL_SECONDS          = 300
+    COUPON_CACHE_USAGE_TTL_SECONDS    = 5
+    COUPON_CACHE_NEGATIVE_TTL_SECONDS = 60
   }
   layers = [
     "arn:aws:lambda:${local.region}:901920570463:layer:aws-otel-python-amd64-ver-1-32-0:2",
     module.honeycomb_layer.lambda_layer_arn,
-    module.chaos_layer.lambda_layer_arn
+    module.chaos_layer.lambda_layer_arn,
+    module.shop_layer.lambda_layer_arn
   ]
   publish_lambda_version = false
   enable_snap_start      = false // This will incur additional cost; enable only if needed
@@ -45,6 +90,51 @@ module "create_order_lambda" {
   environment_variables = merge(
     local.common_env_variables, {
       COUPON_SERVICE_FUNCTION = module.coupon_service_lambda.lambda_function_name
+      COUPON_VALIDATION_MODE  = "local"
+      IDEMPOTENCY_TABLE       = aws_dynamodb_table.idempotency.name
+      ORDER_PROCESSING_MODE   = var.order_processing_mode
+    }
+  )
+
+  tracing_mode = "Active"
+
+  allowed_triggers = {
+    APIGateway = {
+      service    = "apigateway"
+      source_arn = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
+    }
+  }
+
+  tags = {
+    Environment = var.environment
+  }
+}
+
+# Create Orders Batch Lambda
+module "create_orders_batch_lambda" {
+  source  = "terraform-aws-modules/lambda/aws"
+  version = "~> 7.0"
+
+  function_name = "${var.environment}-create-orders-batch"
+  description   = "Bulk create orders function"
+  handler       = "app.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 30
+  memory_size   = 1024
+
+  source_path = "${path.module}/functions/create-orders-batch"
+
+  create_role                             = false
+  publish                                 = local.publish_lambda_version
+  snap_start                              = local.enable_snap_start
+  create_current_version_allowed_triggers = false
+  lambda_role                             = aws_iam_role.lambda_execution.arn
+
+  layers = local.layers
+
+  environment_variables = merge(
+    local.common_env_variables, {
+      MAX_BATCH_ORDERS = 500
     }
   )
 
@@ -84,8 +174,11 @@ module "get_order_lambda" {
 
   layers = local.layers
 
-  environment_variables = local.common_env_variables
-
+  environment_variables = merge(
+    local.common_env_variables, {
+      MAX_LOOKUP_ORDERS = 100
+    }
+  )
 
   tracing_mode = "Active"
 
@@ -123,7 +216,12 @@ module "list_orders_lambda" {
 
   layers = local.layers
 
-  environment_variables = local.common_env_variables
+  environment_variables = merge(
+    local.common_env_variables, {
+      LIST_ORDERS_DEFAULT_PAGE_SIZE = 25
+      LIST_ORDERS_MAX_PAGE_SIZE     = 100
+    }
+  )
 
   tracing_mode = "Active"
 
@@ -229,8 +327,16 @@ module "list_products_lambda" {
   create_current_version_allowed_triggers = false
   lambda_role                             = aws_iam_role.lambda_execution.arn
 
-  layers                = local.layers
-  environment_variables = local.common_env_variables
+  layers = local.layers
+
+  environment_variables = merge(
+    local.common_env_variables, {
+      CATALOG_REFRESH_SECONDS     = 60
+      CATALOG_FULL_RELOAD_SECONDS = 3600
+      CATALOG_DEFAULT_PAGE_SIZE   = 24
+      CATALOG_MAX_PAGE_SIZE       = 100
+    }
+  )
 
   tracing_mode = "Active"
 
@@ -245,3 +351,146 @@ module "list_products_lambda" {
     Environment = var.environment
   }
 }
+
+# Process Orders Lambda
+module "process_orders_lambda" {
+  source  = "terraform-aws-modules/lambda/aws"
+  version = "~> 7.0"
+
+  function_name = "${var.environment}-process-orders"
+  description   = "Finalise PENDING orders from the orders table stream"
+  handler       = "app.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 60
+  memory_size   = 512
+
+  source_path = "${path.module}/functions/process-orders"
+
+  create_role                             = false
+  publish                                 = local.publish_lambda_version
+  snap_start                              = local.enable_snap_start
+  create_current_version_allowed_triggers = false
+  lambda_role                             = aws_iam_role.lambda_execution.arn
+
+  layers = local.layers
+
+  environment_variables = merge(
+    local.common_env_variables, {
+      # Must exceed the stream mapping's maximum_record_age_in_seconds
+      PENDING_ORDER_TIMEOUT_SECONDS = 900
+    }
+  )
+
+  tracing_mode = "Active"
+
+  allowed_triggers = {
+    PendingOrderSweep = {
+      principal  = "events.amazonaws.com"
+      source_arn = aws_cloudwatch_event_rule.pending_order_sweep.arn
+    }
+  }
+
+  tags = {
+    Environment = var.environment
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "process_orders" {
+  event_source_arn  = aws_dynamodb_table.orders.stream_arn
+  function_name     = module.process_orders_lambda.lambda_function_arn
+  starting_position = "LATEST"
+
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1
+  maximum_retry_attempts             = 5
+  maximum_record_age_in_seconds      = 600
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  # Only new PENDING orders; sync orders and status updates are ignored
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT"]
+        dynamodb = {
+          NewImage = {
+            status = { S = ["PENDING"] }
+          }
+        }
+      })
+    }
+  }
+}
+
+# Records dropped after their last retry leave orders PENDING; this
+# schedule has process-orders mark them FAILED once they time out
+resource "aws_cloudwatch_event_rule" "pending_order_sweep" {
+  name                = "${var.environment}-pending-order-sweep"
+  description         = "Fail orders left PENDING by dropped stream records"
+  schedule_expression = "rate(5 minutes)"
+
+  tags = {
+    Environment = var.environment
+  }
+}
+
+resource "aws_cloudwatch_event_target" "pending_order_sweep" {
+  rule = aws_cloudwatch_event_rule.pending_order_sweep.name
+  arn  = module.process_orders_lambda.lambda_function_arn
+}
+
+# Update Order Stats Lambda
+module "update_order_stats_lambda" {
+  source  = "terraform-aws-modules/lambda/aws"
+  version = "~> 7.0"
+
+  function_name = "${var.environment}-update-order-stats"
+  description   = "Add CREATED orders from the orders table stream to user stats"
+  handler       = "app.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 60
+  memory_size   = 256
+
+  source_path = "${path.module}/functions/update-order-stats"
+
+  create_role                             = false
+  publish                                 = local.publish_lambda_version
+  snap_start                              = local.enable_snap_start
+  create_current_version_allowed_triggers = false
+  lambda_role                             = aws_iam_role.lambda_execution.arn
+
+  layers = local.layers
+
+  environment_variables = local.common_env_variables
+
+  tracing_mode = "Active"
+
+  tags = {
+    Environment = var.environment
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "update_order_stats" {
+  event_source_arn  = aws_dynamodb_table.orders.stream_arn
+  function_name     = module.update_order_stats_lambda.lambda_function_arn
+  starting_position = "LATEST"
+
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 5
+  maximum_retry_attempts             = 10
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  # Orders created synchronously or finalised by process-orders, until the
+  # stats transaction marks them counted
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        dynamodb = {
+          NewImage = {
+            status            = { S = ["CREATED"] }
+            stats_recorded_at = [{ exists = false }]
+          }
+        }
+      })
+    }
+  }
+}
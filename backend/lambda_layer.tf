@@ -26,3 +26,17 @@ module "chaos_layer" {
   source_path = "${path.module}/layers/chaos-layer"
 }
 
+
+# Shop Domain Lambda Layer
+module "shop_layer" {
+  source  = "terraform-aws-modules/lambda/aws"
+  version = "~> 7.0"
+
+  create_layer = true
+
+  layer_name          = "${var.environment}-shop-layer"
+  description         = "Shared shop domain utilities"
+  compatible_runtimes = ["python3.12"]
+
+  source_path = "${path.module}/layers/shop-layer"
+}
@@ -1,18 +1,44 @@
 import json
+import os
 import random
+import threading
 import time
-import boto3
-from botocore.exceptions import ClientError
 from opentelemetry import trace
+from honeycomb.deadline import current_deadline
+from honeycomb.init_profiler import LazyClient
 
 tracer = trace.get_tracer(__name__)
 
-ssm_client = boto3.client("ssm")
+
+def _create_ssm_client():
+    # boto3 is only imported once chaos config is actually read
+    from honeycomb.clients import get_client
+
+    return get_client("ssm")
+
+
+ssm_client = LazyClient("ssm", _create_ssm_client)
+
+DEFAULT_PARAMETER_NAME = "/dev/order-processing/chaos/dynamodb"
+
+# How long a fetched config is served without going back to SSM
+CONFIG_TTL_SECONDS = float(os.environ.get("CHAOS_CONFIG_TTL_SECONDS", "60"))
+# How long past the TTL a stale config is still served while a refresh runs
+CONFIG_STALE_SECONDS = float(os.environ.get("CHAOS_CONFIG_STALE_SECONDS", "300"))
+# Kill switch: skip SSM entirely and never inject chaos
+CHAOS_ENABLED = os.environ.get("CHAOS_ENABLED", "true").lower() != "false"
+
+# Warm-container cache, keyed by parameter name
+_config_cache = {}
+_refreshing = set()
+_cache_lock = threading.Lock()
 
 
 @tracer.start_as_current_span("get_chaos_config")
-def get_chaos_config(parameter_name="/dev/order-processing/chaos/dynamodb"):
-    """Get chaos configuration from SSM parameter"""
+def fetch_chaos_config(parameter_name=DEFAULT_PARAMETER_NAME):
+    """Fetch chaos configuration from SSM parameter"""
+    from botocore.exceptions import ClientError
+
     try:
         response = ssm_client.get_parameter(Name=parameter_name)
         return json.loads(response["Parameter"]["Value"])
@@ -20,19 +46,76 @@ def get_chaos_config(parameter_name="/dev/order-processing/chaos/dynamodb"):
         return {"enabled": False}
 
 
+def _store_config(parameter_name, config):
+    with _cache_lock:
+        _config_cache[parameter_name] = (config, time.monotonic())
+        _refreshing.discard(parameter_name)
+
+
+def _refresh_in_background(parameter_name):
+    """Start a single background refresh for a stale parameter"""
+    with _cache_lock:
+        if parameter_name in _refreshing:
+            return
+        _refreshing.add(parameter_name)
+
+    def refresh():
+        try:
+            _store_config(parameter_name, fetch_chaos_config(parameter_name))
+        except Exception:
+            with _cache_lock:
+                _refreshing.discard(parameter_name)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def get_chaos_config(parameter_name=DEFAULT_PARAMETER_NAME):
+    """
+    Get chaos configuration, served from the warm-container cache.
+
+    Fresh entries are returned as-is. Entries past the TTL but within the
+    stale window are returned immediately while one background refresh
+    runs; anything older is fetched synchronously.
+    """
+    if not CHAOS_ENABLED:
+        return {"enabled": False}
+
+    cached = _config_cache.get(parameter_name)
+    if cached is not None:
+        config, fetched_at = cached
+        age = time.monotonic() - fetched_at
+        if age < CONFIG_TTL_SECONDS:
+            return config
+        if age < CONFIG_TTL_SECONDS + CONFIG_STALE_SECONDS:
+            _refresh_in_background(parameter_name)
+            return config
+
+    config = fetch_chaos_config(parameter_name)
+    _store_config(parameter_name, config)
+    return config
+
+
+def clear_chaos_config_cache():
+    """Drop all cached chaos configuration"""
+    with _cache_lock:
+        _config_cache.clear()
+
+
 def inject_dynamodb_chaos():
     """Inject chaos before DynamoDB operations"""
+    config = get_chaos_config()
+
+    # Disabled fast path: no span, no attributes
+    if not config.get("enabled", False):
+        return
+
     with tracer.start_as_current_span("inject_dynamodb_chaos") as span:
-        config = get_chaos_config()
         span.set_attribute("chaos_config", json.dumps(config))
 
-        if not config.get("enabled", False):
-            return
-
         # Inject latency
         latency_config = config.get("latency", {})
         if latency_config.get("enabled", False):
-            with tracer.start_as_current_span("inject_latency"):
+            with tracer.start_as_current_span("inject_latency") as latency_span:
                 if random.random() < latency_config.get("probability", 0):
                     delay = (
                         random.randint(
@@ -41,6 +124,14 @@ def inject_dynamodb_chaos():
                         )
                         / 1000.0
                     )
+                    # Never sleep through the invocation's remaining budget
+                    deadline = current_deadline()
+                    if deadline is not None and deadline.cap_sleep(delay) < delay:
+                        latency_span.set_attribute(
+                            "chaos.latency_requested_ms", delay * 1000
+                        )
+                        delay = deadline.cap_sleep(delay)
+                    latency_span.set_attribute("chaos.latency_ms", delay * 1000)
                     time.sleep(delay)
                 return
 
@@ -48,6 +139,8 @@ def inject_dynamodb_chaos():
         exception_config = config.get("exceptions", {})
         if exception_config.get("enabled", False):
             if random.random() < exception_config.get("probability", 0):
+                from botocore.exceptions import ClientError
+
                 error_types = exception_config.get("types", ["throttling"])
                 error_type = random.choice(error_types)
 
@@ -0,0 +1,205 @@
+import math
+import os
+import threading
+import boto3
+from botocore.config import Config
+from botocore.httpsession import URLLib3Session
+from .deadline import current_deadline, MIN_CALL_MS
+
+# Tuned for short Lambda invocations rather than botocore's generous defaults
+CONNECT_TIMEOUT = float(os.environ.get("BOTO_CONNECT_TIMEOUT", 1))
+READ_TIMEOUT = float(os.environ.get("BOTO_READ_TIMEOUT", 5))
+MAX_ATTEMPTS = int(os.environ.get("BOTO_MAX_ATTEMPTS", 3))
+MAX_POOL_CONNECTIONS = int(os.environ.get("BOTO_MAX_POOL_CONNECTIONS", 25))
+
+# Error codes botocore retries besides 5xx responses and connection errors
+RETRIED_ERROR_CODES = {
+    "ThrottlingException",
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+}
+
+# Recent botocore takes a read timeout for a single request from its context;
+# older releases (such as the Lambda runtime's) only use the client's config
+REQUEST_READ_TIMEOUT_SUPPORTED = hasattr(URLLib3Session, "_get_request_timeout")
+
+# Without per-request timeouts, requests with less budget than the read
+# timeout are sent by a client built with the budget rounded down to this
+# step, so each shared client needs only a few of them
+CAPPED_TIMEOUT_STEP = 0.5
+
+DEFAULT_CONFIG = Config(
+    connect_timeout=CONNECT_TIMEOUT,
+    read_timeout=READ_TIMEOUT,
+    retries={"mode": "adaptive", "max_attempts": MAX_ATTEMPTS},
+    tcp_keepalive=True,
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+)
+
+# One session and one client/resource per service for the container
+_session = None
+_clients = {}
+_resources = {}
+_capped_clients = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    """Shared boto3 session"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = boto3.session.Session()
+    return _session
+
+
+def get_client(service_name, **config_overrides):
+    """
+    Shared low-level client with the tuned config, cached per service and
+    overrides. Overrides are Config keyword arguments, e.g. a longer
+    read_timeout for synchronous Lambda invokes.
+    """
+    key = (service_name, tuple(sorted(config_overrides.items())))
+    client = _clients.get(key)
+    if client is None:
+        session = get_session()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                config = DEFAULT_CONFIG.merge(Config(**config_overrides))
+                client = session.client(service_name, config=config)
+                bound_to_deadline(client)
+                _clients[key] = client
+    return client
+
+
+def get_resource(service_name):
+    """Shared boto3 resource with the tuned config, cached per service"""
+    resource = _resources.get(service_name)
+    if resource is None:
+        session = get_session()
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = session.resource(service_name, config=DEFAULT_CONFIG)
+                bound_to_deadline(resource.meta.client)
+                _resources[service_name] = resource
+    return resource
+
+
+def bound_to_deadline(client):
+    """
+    Give each request (and each retry) a read timeout no longer than the
+    current invocation's remaining budget, and fail fast with
+    DeadlineExceeded instead of sending one that cannot finish or
+    sleeping before a retry there is no time for. The timeout is set on
+    the request itself (or, on botocore without per-request timeouts, the
+    request is sent by a client built with the shorter timeout), so
+    requests made outside an invocation (e.g. from background threads)
+    keep the client's configured timeouts.
+    """
+    config = client.meta.config
+
+    def before_send(event_name, request=None, **kwargs):
+        deadline = current_deadline()
+        if deadline is None or request is None:
+            return None
+        stage = event_name.split(".", 1)[1]
+        read_timeout = deadline.call_timeout(config.read_timeout, stage)
+        if REQUEST_READ_TIMEOUT_SUPPORTED:
+            request.context["read_timeout"] = read_timeout
+            return None
+        if read_timeout >= config.read_timeout:
+            return None
+        # Returning a response makes botocore skip its own send
+        return capped_client(client, read_timeout)._endpoint.http_session.send(
+            request
+        )
+
+    def before_retry(event_name, response=None, caught_exception=None, **kwargs):
+        deadline = current_deadline()
+        if deadline is None or not is_retryable(response, caught_exception):
+            return
+        deadline.check(event_name.split(".", 1)[1])
+
+    client.meta.events.register("before-send", before_send)
+    client.meta.events.register_first("needs-retry", before_retry)
+    return client
+
+
+def capped_client(client, read_timeout):
+    """
+    Unbound copy of `client` whose read timeout is `read_timeout` rounded
+    down to CAPPED_TIMEOUT_STEP, built on first use and shared
+    """
+    steps = math.floor(read_timeout / CAPPED_TIMEOUT_STEP)
+    read_timeout = max(MIN_CALL_MS / 1000, steps * CAPPED_TIMEOUT_STEP)
+    key = (id(client), read_timeout)
+    capped = _capped_clients.get(key)
+    if capped is None:
+        session = get_session()
+        with _lock:
+            capped = _capped_clients.get(key)
+            if capped is None:
+                capped = session.client(
+                    client.meta.service_model.service_name,
+                    region_name=client.meta.region_name,
+                    endpoint_url=client.meta.endpoint_url,
+                    config=client.meta.config.merge(
+                        Config(read_timeout=read_timeout)
+                    ),
+                )
+                _capped_clients[key] = capped
+    return capped
+
+
+def is_retryable(response, caught_exception):
+    """Whether botocore may retry an attempt with this outcome"""
+    if caught_exception is not None:
+        return True
+    if response is None:
+        return False
+    http_response, parsed = response
+    return (
+        http_response.status_code >= 500
+        or parsed.get("Error", {}).get("Code") in RETRIED_ERROR_CODES
+    )
+
+
+def connection_stats():
+    """
+    HTTP requests sent and TLS connections opened by every shared client
+    since the container started. Requests beyond the connections opened
+    went over a reused (kept-alive) connection.
+    """
+    clients = list(_clients.values())
+    clients += [resource.meta.client for resource in _resources.values()]
+    clients += list(_capped_clients.values())
+
+    requests = connections = 0
+    for client in clients:
+        # pylint: disable=protected-access
+        manager = getattr(client._endpoint.http_session, "_manager", None)
+        if manager is None:
+            continue
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is not None:
+                requests += pool.num_requests
+                connections += pool.num_connections
+
+    return {
+        "requests": requests,
+        "connections": connections,
+        "reused": max(0, requests - connections),
+    }
+
+
+def add_connection_stats(span):
+    """Record container-lifetime connection reuse on a span"""
+    stats = connection_stats()
+    span.set_attribute("aws.http.requests", stats["requests"])
+    span.set_attribute("aws.http.connections", stats["connections"])
+    span.set_attribute("aws.http.reused", stats["reused"])
@@ -1,5 +1,6 @@
 from opentelemetry.trace import Status, StatusCode
 from .enums import HoneycombStatus, HoneycombErrorType
+from .event_processor import on_span_error
 
 
 def add_user_context(span, user_context):
@@ -39,3 +40,4 @@ def add_span_exception(span, err, error_type: HoneycombErrorType):
     span.set_status(Status(StatusCode.ERROR))
     span.record_exception(err)
     span.set_attribute('event.status', HoneycombStatus.FAILURE.value)
+    on_span_error(span)
@@ -1,5 +1,10 @@
 from opentelemetry.context import attach, set_value
 from .utils import get_user_context
+from .event_processor import set_current_event, current_route
+from .sample_rates import head_sample_rate_for
+
+ENRICHMENT_ATTRIBUTES_KEY = "enrichment_attributes"
+HEAD_SAMPLE_RATE_KEY = "head_sample_rate"
 
 
 def set_trace_context(event):
@@ -8,18 +13,32 @@ def set_trace_context(event):
     This will be automatically picked up by ContextEnrichmentProcessor
     and added to all spans.
 
+    The span attributes are built here, once per invocation, so the
+    processor only has to apply them to each span.
+
     Call this once at the beginning of your Lambda handler.
 
     Args:
-        session_id: Session identifier
-        user_context: Dict with user_id, email, username
+        event: API Gateway event carrying the x-session-id header and
+            Cognito authorizer claims
     """
 
     # Extract context first
-    headers = event.get("headers", {})
+    headers = event.get("headers") or {}
     session_id = headers.get("x-session-id", "unknown")
     user_context = get_user_context(event)
+    set_current_event(event)
+
+    attributes = {
+        "session_id": session_id,
+        "user.id": user_context.get("user_id", "unknown"),
+        "user.email": user_context.get("email", "unknown"),
+        "user.username": user_context.get("username", "unknown"),
+    }
 
-    token1 = attach(set_value("session_id", session_id))
-    token2 = attach(set_value("user_context", user_context))
-    return token1, token2
+    ctx = set_value("session_id", session_id)
+    ctx = set_value("user_context", user_context, ctx)
+    ctx = set_value(ENRICHMENT_ATTRIBUTES_KEY, attributes, ctx)
+    # Read by HeadSampler for every span started in the handler
+    ctx = set_value(HEAD_SAMPLE_RATE_KEY, head_sample_rate_for(current_route()), ctx)
+    return attach(ctx)
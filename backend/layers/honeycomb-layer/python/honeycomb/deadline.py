@@ -0,0 +1,111 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from opentelemetry import trace
+
+# Time held back from the Lambda timeout to return a well-formed error
+RESERVE_MS = int(os.environ.get("DEADLINE_RESERVE_MS", 500))
+# Shortest timeout worth giving a downstream call; with less left it fails fast
+MIN_CALL_MS = int(os.environ.get("DEADLINE_MIN_CALL_MS", 50))
+# Remaining budget below which optional work (cache re-checks) is skipped
+OPTIONAL_WORK_MIN_MS = int(os.environ.get("DEADLINE_OPTIONAL_WORK_MIN_MS", 1500))
+
+_current = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting work that cannot finish in this invocation"""
+
+    def __init__(self, stage, remaining_ms):
+        self.stage = stage
+        self.remaining_ms = remaining_ms
+
+    def __str__(self):
+        return (
+            f"Deadline exceeded before {self.stage} "
+            f"({max(0, round(self.remaining_ms))} ms left)"
+        )
+
+
+class Deadline:
+    """
+    Time budget for one invocation, taken from the Lambda context.
+
+    Work is planned against the budget less RESERVE_MS, keeping enough
+    time to report a failure; compensating work (e.g. handing back a
+    redeemed coupon) may spend the reserve via `using_reserve`. A budget
+    of None never expires.
+    """
+
+    def __init__(self, budget_ms, reserve_ms=None):
+        self.budget_ms = budget_ms
+        self.reserve_ms = RESERVE_MS if reserve_ms is None else reserve_ms
+        self.started_at = time.monotonic()
+        self.in_reserve = False
+
+    def remaining_ms(self):
+        """Milliseconds left for planned work"""
+        if self.budget_ms is None:
+            return math.inf
+        left = self.budget_ms - (time.monotonic() - self.started_at) * 1000
+        return left if self.in_reserve else left - self.reserve_ms
+
+    def check(self, stage):
+        """Raise DeadlineExceeded if too little time is left to start `stage`"""
+        remaining = self.remaining_ms()
+        if remaining < MIN_CALL_MS:
+            raise DeadlineExceeded(stage, remaining)
+        return remaining
+
+    def call_timeout(self, default_seconds, stage):
+        """Timeout in seconds for a downstream call, bounded by the budget"""
+        return min(default_seconds, self.check(stage) / 1000)
+
+    def cap_sleep(self, seconds):
+        """Longest part of a sleep that still leaves time for a call after it"""
+        return max(0.0, min(seconds, (self.remaining_ms() - MIN_CALL_MS) / 1000))
+
+    def allows_optional(self, name):
+        """Whether to do optional work now; skips are recorded on the span"""
+        if self.remaining_ms() >= OPTIONAL_WORK_MIN_MS:
+            return True
+        trace.get_current_span().set_attribute(f"deadline.skipped.{name}", True)
+        return False
+
+    @contextmanager
+    def using_reserve(self):
+        """Let the enclosed compensating work spend the reserved time"""
+        in_reserve, self.in_reserve = self.in_reserve, True
+        try:
+            yield
+        finally:
+            self.in_reserve = in_reserve
+
+
+def start_deadline(context):
+    """
+    Start the deadline for an invocation from the Lambda context's remaining
+    time. Call this once at the beginning of your Lambda handler.
+    """
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    deadline = Deadline(get_remaining() if get_remaining else None)
+    _current.set(deadline)
+    return deadline
+
+
+def current_deadline():
+    """The deadline of the invocation being handled, or None"""
+    return _current.get()
+
+
+@contextmanager
+def using_reserve():
+    """Deadline.using_reserve for the current invocation, if it has one"""
+    deadline = _current.get()
+    if deadline is None:
+        yield
+        return
+    with deadline.using_reserve():
+        yield
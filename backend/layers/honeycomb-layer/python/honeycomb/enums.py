@@ -10,4 +10,5 @@ class HoneycombErrorType(Enum):
     EXCEPTION = "exception"
     NO_DATA = "no_data"
     INVALID_DATA = "invalid_data"
+    TIMEOUT = "timeout"
     UNKNOWN = "unknown"
@@ -1,25 +1,156 @@
 import json
+import os
 
 # from .context import set_trace_context
-from .utils import get_user_context
+from .utils import get_user_context, get_body
+from .sample_rates import head_sample_rate_for, sample_rate_for, trace_in_sample
 
+# Top-level API Gateway event fields attached as the "event" attribute
+EVENT_FIELDS = [
+    field.strip()
+    for field in os.environ.get(
+        "HONEYCOMB_EVENT_FIELDS",
+        "httpMethod,path,resource,pathParameters,queryStringParameters,headers",
+    ).split(",")
+    if field.strip()
+]
+
+# Longest string attribute value before truncation
+MAX_ATTRIBUTE_LENGTH = int(os.environ.get("HONEYCOMB_MAX_ATTRIBUTE_LENGTH", 4096))
+
+# Header values replaced with REDACTED wherever the event is attached
+REDACTED_HEADERS = {
+    header.strip().lower()
+    for header in os.environ.get(
+        "HONEYCOMB_REDACTED_HEADERS",
+        "authorization,cookie,x-api-key,x-amz-security-token",
+    ).split(",")
+    if header.strip()
+}
+
+# When to attach the whole (redacted) event: never, on_error, sampled or always
+FULL_EVENT_POLICY = os.environ.get("HONEYCOMB_FULL_EVENT", "on_error")
+FULL_EVENT_SAMPLE_RATE = float(
+    os.environ.get("HONEYCOMB_FULL_EVENT_SAMPLE_RATE", 0.01)
+)
+
+# When to attach handler responses as event.response: never, on_error or always
+RESPONSE_POLICY = os.environ.get("HONEYCOMB_RECORD_RESPONSE", "on_error")
+
+# The event being handled, kept so the full event can be attached on error
+_current = {"event": None, "full_event_attached": False}
+
+
+def truncate(value, max_length=None):
+    """Cap a string attribute value at the configured length"""
+    max_length = max_length or MAX_ATTRIBUTE_LENGTH
+    if len(value) <= max_length:
+        return value
+    return value[:max_length] + f"...[truncated {len(value) - max_length} chars]"
+
+
+def redact_headers(headers):
+    """Copy of headers with sensitive values replaced"""
+    return {
+        key: "REDACTED" if key.lower() in REDACTED_HEADERS else value
+        for key, value in (headers or {}).items()
+    }
+
+
+def summarize_event(event):
+    """Allow-listed, redacted subset of the event"""
+    summary = {field: event.get(field) for field in EVENT_FIELDS if field in event}
+    if "headers" in summary:
+        summary["headers"] = redact_headers(summary["headers"])
+    return summary
+
+
+def set_current_event(event):
+    """Remember the event being handled; called by set_trace_context"""
+    _current["event"] = event
+    _current["full_event_attached"] = False
 
-def add_common_span_attributes(event, span):
-    # Extract common context
-    body = json.loads(event.get("body", "{}")) if event.get("body") else {}
 
+def current_route():
+    """Method and resource of the event being handled, e.g. GET /orders/{order_id}"""
+    event = _current["event"] or {}
+    if not event.get("httpMethod"):
+        return None
+    return f"{event['httpMethod']} {event.get('resource') or event.get('path', '')}"
+
+
+def attach_full_event(span):
+    """Attach the whole event being handled, headers redacted, once per invocation"""
+    event = _current["event"]
+    if event is None or _current["full_event_attached"]:
+        return
+
+    full_event = {**event}
+    if "headers" in full_event:
+        full_event["headers"] = redact_headers(full_event["headers"])
+    if "multiValueHeaders" in full_event:
+        full_event.pop("multiValueHeaders")
+
+    span.set_attribute("event.full", truncate(json.dumps(full_event, default=str)))
+    _current["full_event_attached"] = True
+
+
+def on_span_error(span):
+    """Called when an exception is recorded on a span"""
+    if FULL_EVENT_POLICY == "on_error":
+        attach_full_event(span)
+
+
+def full_event_in_sample(span):
+    """
+    Whether a trace gets the full event under the "sampled" policy: a
+    FULL_EVENT_SAMPLE_RATE share of the traces the route's sampling keeps
+    when successful, decided on the trace ID like sampling itself
+    """
+    if FULL_EVENT_SAMPLE_RATE <= 0:
+        return False
+    route = current_route()
+    sample_rate = (
+        head_sample_rate_for(route)
+        * sample_rate_for(route)
+        * max(1, round(1 / FULL_EVENT_SAMPLE_RATE))
+    )
+    return trace_in_sample(span.get_span_context().trace_id, sample_rate)
+
+
+def add_event_response(span, response, failed=False):
+    """Attach a handler response as event.response, subject to policy"""
+    if RESPONSE_POLICY == "always" or (RESPONSE_POLICY == "on_error" and failed):
+        span.set_attribute(
+            "event.response", truncate(json.dumps(response, default=str))
+        )
+
+
+def add_common_span_attributes(event, span):
+    # Nothing to record on a span the head sampler dropped
+    if not span.is_recording():
+        return
     user_context = get_user_context(event)
 
     # Add common attributes
-    span.set_attribute("event", json.dumps(event))
+    span.set_attribute("event", truncate(json.dumps(summarize_event(event))))
     span.set_attribute("event.method", event.get("httpMethod", ""))
     span.set_attribute("event.path", event.get("path", ""))
-    span.set_attribute("event.input", json.dumps(body))
 
-    # if method is GET, also include query params
+    # if method is GET, the input is the query params, otherwise the raw body
     if event.get("httpMethod", "") == "GET":
         query_params = event.get("queryStringParameters") or {}
-        span.set_attribute("event.input", json.dumps(query_params))
+        span.set_attribute("event.input", truncate(json.dumps(query_params)))
+    else:
+        body = get_body(event)
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        span.set_attribute("event.input", truncate(body))
+
+    if FULL_EVENT_POLICY == "always" or (
+        FULL_EVENT_POLICY == "sampled" and full_event_in_sample(span)
+    ):
+        attach_full_event(span)
 
     if user_context.get("user_id"):
         span.set_attribute("user_id", user_context["user_id"])
@@ -1,14 +1,30 @@
 from opentelemetry import trace
 from .span_processor import ContextEnrichmentProcessor
+from .metrics import METRICS_ENABLED, StageMetricsProcessor
+from .sampling import SAMPLING_ENABLED, enable_head_sampling, enable_tail_sampling
 
 
 def initialize_tracing():
     """
-    Initialize custom tracing with ContextEnrichmentProcessor.
+    Initialize custom tracing with ContextEnrichmentProcessor, per-stage EMF
+    metrics (unless EMF_METRICS is false) and, unless HONEYCOMB_SAMPLING is
+    false, head sampling and tail sampling in front of the exporter.
     Call this once when your Lambda function initializes (outside handler).
     """
     tracer_provider = trace.get_tracer_provider()
     
     # Add custom processor to automatically enrich spans
     if hasattr(tracer_provider, 'add_span_processor'):
-        tracer_provider.add_span_processor(ContextEnrichmentProcessor())
+        enrichment_processor = ContextEnrichmentProcessor()
+        tracer_provider.add_span_processor(enrichment_processor)
+        unsampled = (enrichment_processor,)
+
+        # Metrics see every recorded span, whatever the tail sampling decision
+        if METRICS_ENABLED:
+            metrics_processor = StageMetricsProcessor()
+            tracer_provider.add_span_processor(metrics_processor)
+            unsampled += (metrics_processor,)
+
+        if SAMPLING_ENABLED:
+            enable_head_sampling(tracer_provider)
+            enable_tail_sampling(tracer_provider, keep_unsampled=unsampled)
@@ -0,0 +1,74 @@
+import threading
+import time
+from contextlib import contextmanager
+from opentelemetry import trace
+
+# Timings not yet recorded on a span, as attribute name -> milliseconds
+_pending = {}
+_state = {"cold_start": True, "first_span": None}
+
+
+def record_init_timing(name, duration_ms):
+    """
+    Record an init timing as init.<name>_ms.
+
+    Timings taken before the first span of a cold start wait for it; later
+    ones go on the first span while it is still open, else the current span.
+    """
+    attribute = f"init.{name}_ms"
+    duration_ms = round(duration_ms, 3)
+
+    span = _state["first_span"]
+    if span is None or not span.is_recording():
+        span = trace.get_current_span()
+    if _state["cold_start"] or not span.is_recording():
+        _pending[attribute] = duration_ms
+    else:
+        span.set_attribute(attribute, duration_ms)
+
+
+@contextmanager
+def profile_init(name):
+    """Time the enclosed block (an import or client construction)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_init_timing(name, (time.perf_counter() - start) * 1000)
+
+
+def on_span_start(span):
+    """Called by ContextEnrichmentProcessor for every span"""
+    if _state["cold_start"]:
+        _state["cold_start"] = False
+        _state["first_span"] = span
+        span.set_attribute("init.cold_start", True)
+    if _pending:
+        span.set_attributes(_pending)
+        _pending.clear()
+
+
+class LazyClient:
+    """
+    Stand-in for a boto3 client, resource or table that is built on first
+    attribute access, timed as init.client.<name>_ms. The timing includes
+    any other LazyClient it builds, such as the resource behind a table.
+    """
+
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The underlying object, constructing it if needed"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    with profile_init(f"client.{self._name}"):
+                        self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, attribute):
+        return getattr(self.get(), attribute)
@@ -0,0 +1,35 @@
+import json
+import os
+
+# Keep 1 in N successful traces; per-route rates keyed by "METHOD /resource"
+DEFAULT_SAMPLE_RATE = int(os.environ.get("HONEYCOMB_DEFAULT_SAMPLE_RATE", 1))
+SAMPLE_RATES = json.loads(os.environ.get("HONEYCOMB_SAMPLE_RATES") or "{}")
+
+# Record only 1 in N traces at all, decided when the handler sets the trace
+# context; the tail rates above then apply to the traces recorded
+DEFAULT_HEAD_SAMPLE_RATE = int(os.environ.get("HONEYCOMB_DEFAULT_HEAD_SAMPLE_RATE", 1))
+HEAD_SAMPLE_RATES = json.loads(os.environ.get("HONEYCOMB_HEAD_SAMPLE_RATES") or "{}")
+
+_TRACE_ID_MASK = (1 << 64) - 1
+
+
+def sample_rate_for(route):
+    """Configured (tail) sample rate for a route, falling back to the default"""
+    return max(1, int(SAMPLE_RATES.get(route, DEFAULT_SAMPLE_RATE)))
+
+
+def head_sample_rate_for(route):
+    """Configured head sample rate for a route, falling back to the default"""
+    return max(1, int(HEAD_SAMPLE_RATES.get(route, DEFAULT_HEAD_SAMPLE_RATE)))
+
+
+def trace_in_sample(trace_id, sample_rate):
+    """
+    Deterministic 1-in-`sample_rate` decision on the trace ID, so every
+    function touching the same trace makes the same choice.
+
+    The traces in a sample include those in any sample with a multiple of
+    its rate, so a 1-in-M decision taken among traces already kept 1 in N
+    is trace_in_sample(trace_id, N * M).
+    """
+    return (trace_id & _TRACE_ID_MASK) < (_TRACE_ID_MASK + 1) // sample_rate
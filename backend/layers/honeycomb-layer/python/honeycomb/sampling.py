@@ -0,0 +1,205 @@
+import os
+import threading
+from opentelemetry.context import get_value
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.sampling import Decision, Sampler, SamplingResult
+from opentelemetry.trace import StatusCode
+from .context import HEAD_SAMPLE_RATE_KEY
+from .enums import HoneycombStatus
+from .event_processor import current_route
+from .sample_rates import head_sample_rate_for, sample_rate_for, trace_in_sample
+
+# Set to false to export every span unsampled
+SAMPLING_ENABLED = os.environ.get("HONEYCOMB_SAMPLING", "true").lower() != "false"
+
+# Traces whose local root takes at least this long are always kept
+SLOW_TRACE_MS = float(os.environ.get("HONEYCOMB_SLOW_TRACE_MS", 1000))
+
+# Upper bound on spans held while waiting for their local root to end
+MAX_BUFFERED_SPANS = int(os.environ.get("HONEYCOMB_MAX_BUFFERED_SPANS", 2048))
+
+SAMPLE_RATE_ATTRIBUTE = "SampleRate"
+
+
+def is_local_root(span):
+    """True for the first span of this process in a trace"""
+    return span.parent is None or span.parent.is_remote
+
+
+def is_failed(span):
+    return (
+        span.status.status_code == StatusCode.ERROR
+        or span.attributes.get("event.status") == HoneycombStatus.FAILURE.value
+    )
+
+
+def with_attributes(span, attributes):
+    """Copy of an ended span with extra attributes"""
+    return ReadableSpan(
+        name=span.name,
+        context=span.context,
+        parent=span.parent,
+        resource=span.resource,
+        attributes={**span.attributes, **attributes},
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class HeadSampler(Sampler):
+    """
+    Drops spans of traces outside the head sample of the route being
+    handled, so they are never recorded; other spans are left to the
+    wrapped sampler.
+
+    The rate comes from the context set_trace_context attaches, so spans
+    started before it (such as the Lambda instrumentation's root span) are
+    recorded and are dropped by TailSamplingProcessor instead.
+    """
+
+    def __init__(self, delegate):
+        self._delegate = delegate
+
+    def should_sample(
+        self,
+        parent_context,
+        trace_id,
+        name,
+        kind=None,
+        attributes=None,
+        links=None,
+        trace_state=None,
+    ):
+        head_rate = get_value(HEAD_SAMPLE_RATE_KEY, parent_context)
+        if head_rate and not trace_in_sample(trace_id, head_rate):
+            return SamplingResult(Decision.DROP, trace_state=trace_state)
+        return self._delegate.should_sample(
+            parent_context, trace_id, name, kind, attributes, links, trace_state
+        )
+
+    def get_description(self):
+        return f"HeadSampler{{{self._delegate.get_description()}}}"
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """
+    Holds each trace's spans until its local root span ends, then passes
+    the whole trace on to the wrapped (exporting) processors or drops it.
+
+    Traces outside the route's head sample are dropped. Of the rest,
+    failed traces (an ERROR status or event.status of Failure on any span)
+    and slow traces are always kept, and successful traces are kept 1 in
+    N, where N is the rate configured for the route being handled. Kept
+    spans carry SampleRate (head rate times any tail rate) so Honeycomb
+    can reweight counts.
+    """
+
+    def __init__(self, processors):
+        self._processors = tuple(processors)
+        self._traces = {}
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        for processor in self._processors:
+            processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        trace_id = span.context.trace_id
+        with self._lock:
+            spans = self._traces.setdefault(trace_id, [])
+            spans.append(span)
+            self._buffered += 1
+            if not is_local_root(span) and self._buffered <= MAX_BUFFERED_SPANS:
+                return
+            self._traces.pop(trace_id)
+            self._buffered -= len(spans)
+
+        for kept in self._decide(spans, span if is_local_root(span) else None):
+            for processor in self._processors:
+                processor.on_end(kept)
+
+    def _decide(self, spans, root):
+        """Spans to export from a finished (or overflowing) trace"""
+        if root is None:
+            # Buffer full before the root ended: export as-is, unsampled
+            return spans
+
+        route = current_route()
+        head_rate = head_sample_rate_for(route)
+        if not trace_in_sample(root.context.trace_id, head_rate):
+            return []
+
+        duration_ms = (root.end_time - root.start_time) / 1_000_000
+        if any(is_failed(span) for span in spans):
+            reason, sample_rate = "failure", head_rate
+        elif duration_ms >= SLOW_TRACE_MS:
+            reason, sample_rate = "slow", head_rate
+        else:
+            sample_rate = head_rate * sample_rate_for(route)
+            if not trace_in_sample(root.context.trace_id, sample_rate):
+                return []
+            reason = "sampled"
+
+        root_attributes = {
+            SAMPLE_RATE_ATTRIBUTE: sample_rate,
+            "sampling.reason": reason,
+        }
+        # Children only need SampleRate when it changes their weight
+        child_attributes = {}
+        if sample_rate > 1:
+            child_attributes[SAMPLE_RATE_ATTRIBUTE] = sample_rate
+        return [
+            with_attributes(span, root_attributes if span is root else child_attributes)
+            if span is root or child_attributes
+            else span
+            for span in spans
+        ]
+
+    def shutdown(self):
+        for processor in self._processors:
+            processor.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return all(
+            processor.force_flush(timeout_millis) for processor in self._processors
+        )
+
+
+def enable_head_sampling(tracer_provider):
+    """
+    Put a HeadSampler in front of the provider's sampler. Only tracers
+    created afterwards use it, so call this before the handler's
+    get_tracer.
+    """
+    if not hasattr(tracer_provider, "sampler"):
+        return None
+    if isinstance(tracer_provider.sampler, HeadSampler):
+        return tracer_provider.sampler
+    tracer_provider.sampler = HeadSampler(tracer_provider.sampler)
+    return tracer_provider.sampler
+
+
+def enable_tail_sampling(tracer_provider, keep_unsampled=()):
+    """
+    Route the provider's existing span processors (the ADOT exporter)
+    through a TailSamplingProcessor. Processors in `keep_unsampled`, such
+    as ContextEnrichmentProcessor, stay outside it.
+    """
+    # pylint: disable=protected-access
+    multi_processor = getattr(tracer_provider, "_active_span_processor", None)
+    if multi_processor is None or not hasattr(multi_processor, "_span_processors"):
+        return None
+
+    with multi_processor._lock:
+        processors = multi_processor._span_processors
+        outside = tuple(p for p in processors if p in keep_unsampled)
+        wrapped = tuple(p for p in processors if p not in keep_unsampled)
+        sampler = TailSamplingProcessor(wrapped)
+        multi_processor._span_processors = outside + (sampler,)
+    return sampler
@@ -1,37 +1,61 @@
 from opentelemetry.sdk.trace import SpanProcessor
 from opentelemetry.context import get_value
 from opentelemetry import trace
-from datetime import datetime
+from datetime import datetime, timezone
+from time import time_ns
+from .context import ENRICHMENT_ATTRIBUTES_KEY
+from .deadline import current_deadline
+from .init_profiler import on_span_start
+
+# Second-resolution prefix of the last formatted process time
+_process_time_prefix = {"second": None, "prefix": ""}
+
+
+def format_process_time(start_time_ns):
+    """ISO-8601 UTC time of a span start, reusing the date/time part per second"""
+    second, nanos = divmod(start_time_ns, 1_000_000_000)
+    if second != _process_time_prefix["second"]:
+        _process_time_prefix["prefix"] = datetime.fromtimestamp(
+            second, timezone.utc
+        ).strftime("%Y-%m-%dT%H:%M:%S")
+        _process_time_prefix["second"] = second
+    return f"{_process_time_prefix['prefix']}.{nanos // 1000:06d}Z"
 
 
 class ContextEnrichmentProcessor(SpanProcessor):
     """
     Custom SpanProcessor that automatically adds session_id, user context,
-    operation name, process time, and status to all spans.
+    operation name, process time, remaining invocation budget, and status
+    to all spans.
+
+    The session and user attributes are prepared once per invocation by
+    set_trace_context; each span gets them in a single bulk set.
     """
 
     def on_start(self, span, parent_context=None):
         """Called when a span is started - add common attributes"""
 
-        # Get context from current execution context
-        session_id = get_value("session_id")
-        user_context = get_value("user_context")
+        # Session and user attributes prepared by set_trace_context
+        attributes = get_value(ENRICHMENT_ATTRIBUTES_KEY)
+        attributes = {**attributes} if attributes else {}
 
-        # Add session ID if available
-        if session_id:
-            span.set_attribute("session_id", session_id)
+        # Add operation name from span name
+        attributes["operation.name"] = span.name
 
-        # Add user context if available
-        if user_context:
-            span.set_attribute("user.id", user_context.get("user_id", "unknown"))
-            span.set_attribute("user.email", user_context.get("email", "unknown"))
-            span.set_attribute("user.username", user_context.get("username", "unknown"))
+        # Add process time in UTC, taken from the span's own start time
+        attributes["event.processTime"] = format_process_time(
+            span.start_time or time_ns()
+        )
 
-        # Add operation name from span name
-        span.set_attribute("operation.name", span.name)
+        # Budget left when each stage starts, set by start_deadline
+        deadline = current_deadline()
+        if deadline is not None and deadline.budget_ms is not None:
+            attributes["deadline.remaining_ms"] = round(deadline.remaining_ms(), 1)
+
+        span.set_attributes(attributes)
 
-        # Add process time in UTC
-        span.set_attribute("event.processTime", datetime.utcnow().isoformat() + "Z")
+        # Cold-start import and client timings
+        on_span_start(span)
 
     def on_end(self, span):
         """Called when a span is ended"""
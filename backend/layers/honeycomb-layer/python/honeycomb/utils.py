@@ -1,5 +1,25 @@
+import base64
+import gzip
 import json
+import os
 from decimal import Decimal
+from opentelemetry import trace
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are gzip-encoded only
+    brotli = None
+
+# Compressed bodies are base64-encoded, which API Gateway only decodes for
+# clients when binary media types are configured; keep off otherwise
+COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION', 'false').lower() == 'true'
+# Smaller bodies are sent as-is; compressing them gains little
+COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+
+# Supported content codings, most preferred first
+ENCODERS = {'gzip': lambda data: gzip.compress(data, compresslevel=6, mtime=0)}
+if brotli is not None:
+    ENCODERS = {'br': lambda data: brotli.compress(data, quality=5), **ENCODERS}
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -20,10 +40,106 @@ def get_user_context(event):
     }
 
 
+def get_header(event, name, default=None):
+    """Case-insensitive request header lookup"""
+    headers = event.get('headers') or {}
+    if name in headers:
+        return headers[name]
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return default
+
+
+def get_body(event, default='{}'):
+    """
+    Raw request body, decoded if API Gateway base64-encoded it, as it does
+    for every request once the API's binary media types include */*
+    """
+    body = event.get('body')
+    if not body:
+        return default
+    if event.get('isBase64Encoded'):
+        return base64.b64decode(body).decode()
+    return body
+
+
+def encoded_etag(etag, encoding):
+    """ETag of a content-coded representation, e.g. "<hash>-gzip" for gzip"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
 def get_cors_headers():
     """Return CORS headers"""
     return {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,x-session-id,traceparent,tracestate',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,x-session-id,Idempotency-Key,traceparent,tracestate',
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
+
+
+def choose_encoding(accept_encoding):
+    """Most preferred supported coding the Accept-Encoding header allows, or None"""
+    weights = {}
+    for coding in (accept_encoding or '').split(','):
+        name, _, params = coding.partition(';')
+        weight = 1.0
+        params = params.strip().lower()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODERS:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress_response(event, response, cache=None):
+    """
+    Compress an API Gateway proxy response's body if the client accepts it.
+
+    Bodies of at least COMPRESSION_MIN_BYTES are brotli- or gzip-encoded
+    per the request's Accept-Encoding and returned base64-encoded with a
+    Content-Encoding header. Raw and compressed sizes are recorded on the
+    current span. `cache`, a dict kept with a reused body, saves
+    compressing it again for each request. An ETag header is given the
+    encoding as a suffix, so each representation has its own strong tag.
+    """
+    body = response.get('body')
+    if not COMPRESSION_ENABLED or not body or response.get('isBase64Encoded'):
+        return response
+
+    headers = {**response.get('headers', {}), 'Vary': 'Accept-Encoding'}
+    raw = body.encode()
+    span = trace.get_current_span()
+    span.set_attribute('response.raw_bytes', len(raw))
+
+    encoding = choose_encoding(get_header(event, 'Accept-Encoding'))
+    if encoding is None or len(raw) < COMPRESSION_MIN_BYTES:
+        return {**response, 'headers': headers}
+
+    compressed = cache.get(encoding) if cache is not None else None
+    if compressed is None:
+        compressed = ENCODERS[encoding](raw)
+        if cache is not None:
+            cache[encoding] = compressed
+    span.set_attribute('response.compressed_bytes', len(compressed))
+    if len(compressed) >= len(raw):
+        return {**response, 'headers': headers}
+
+    span.set_attribute('response.encoding', encoding)
+    if 'ETag' in headers:
+        headers['ETag'] = encoded_etag(headers['ETag'], encoding)
+    return {
+        **response,
+        'headers': {**headers, 'Content-Encoding': encoding},
+        'body': base64.b64encode(compressed).decode(),
+        'isBase64Encoded': True,
+    }
@@ -0,0 +1,360 @@
+import os
+import re
+import time
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from itertools import islice
+from chaos_utils import inject_dynamodb_chaos
+from .dynamodb import item_to_json
+
+# Partition value shared by every product in the updated_at index
+CATALOG_PARTITION = "products"
+UPDATED_AT_INDEX = "updated_at-index"
+
+# Attributes returned to clients, keyed by table attribute
+PUBLIC_ATTRIBUTES = {
+    "product_id": "id",
+    "name": "name",
+    "description": "description",
+    "price": "price",
+    "image": "image",
+    "category": "category",
+}
+
+SORT_KEYS = ("name", "-name", "price", "-price")
+
+# Failed updates of an already loaded index are retried after an
+# exponential backoff, doubling from the first delay up to the limit
+BASE_RETRY_SECONDS = 5.0
+MAX_RETRY_SECONDS = 300.0
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric search tokens in a string"""
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+class ProductCatalog:
+    """
+    In-memory, indexed copy of the products table.
+
+    The table is scanned once (in parallel segments) and then kept current
+    by querying the updated_at index for items changed since the newest
+    one seen, at most every `refresh_seconds`. Items with status DELETED
+    are removed; a full reload every `full_reload_seconds` also drops
+    items deleted outright.
+
+    If an update fails once the index has loaded, the stale index keeps
+    being served and the update is not retried until a backoff passes.
+
+    Each product's response JSON is rendered once when it is indexed, so
+    a query only filters, sorts and joins pre-built fragments.
+    """
+
+    def __init__(
+        self,
+        dynamodb,
+        table_name,
+        refresh_seconds=None,
+        full_reload_seconds=None,
+        scan_segments=None,
+    ):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.refresh_seconds = float(
+            refresh_seconds
+            if refresh_seconds is not None
+            else os.environ.get("CATALOG_REFRESH_SECONDS", 60)
+        )
+        self.full_reload_seconds = float(
+            full_reload_seconds
+            if full_reload_seconds is not None
+            else os.environ.get("CATALOG_FULL_RELOAD_SECONDS", 3600)
+        )
+        self.scan_segments = int(
+            scan_segments or os.environ.get("CATALOG_SCAN_SEGMENTS", 4)
+        )
+
+        self._reset()
+        self.loaded_at = None
+        self.refreshed_at = None
+        self.version = 0
+        self.last_refresh_changes = 0
+        self.consecutive_failures = 0
+        self._retry_at = None
+
+    def _reset(self):
+        self._products = {}
+        self._json = {}
+        self._by_category = {}
+        self._by_token = {}
+        self._by_price = []
+        self._vocabulary = None
+        self._sorted = {}
+        self._newest_update = ""
+        # updated_at of every product seen, including DELETED ones
+        self._updated_at = {}
+
+    def refresh_due(self):
+        """Which update the index needs now: "load", "refresh" or None"""
+        now = time.monotonic()
+        if self.loaded_at is None:
+            return "load"
+        if self._retry_at is not None and now < self._retry_at:
+            return None
+        if now - self.loaded_at >= self.full_reload_seconds:
+            return "load"
+        if now - self.refreshed_at >= self.refresh_seconds:
+            return "refresh"
+        return None
+
+    def ensure_fresh(self):
+        """
+        Load the catalog if needed, or apply recent changes once due. A
+        failure is raised; if an index is already loaded, it also backs off
+        further updates so the caller can keep serving the stale index.
+        """
+        due = self.refresh_due()
+        try:
+            if due == "load":
+                self.load()
+            elif due == "refresh":
+                self.refresh()
+        except Exception:
+            if self.loaded_at is not None:
+                self.consecutive_failures += 1
+                delay = BASE_RETRY_SECONDS * 2 ** (self.consecutive_failures - 1)
+                self._retry_at = time.monotonic() + min(delay, MAX_RETRY_SECONDS)
+            raise
+        if due:
+            self.consecutive_failures = 0
+            self._retry_at = None
+        return due
+
+    def load(self):
+        """Replace the index with a full scan of the table"""
+        with ThreadPoolExecutor(max_workers=self.scan_segments) as executor:
+            segments = executor.map(self._scan_segment, range(self.scan_segments))
+            items = [item for segment in segments for item in segment]
+
+        # Sorting the price index once is O(n log n); inserting each item
+        # in order would be O(n^2)
+        self._reset()
+        for item in items:
+            self._upsert(item, keep_sorted=False)
+        self._by_price.sort()
+
+        self.loaded_at = self.refreshed_at = time.monotonic()
+        self.last_refresh_changes = len(items)
+        self.version += 1
+
+    def refresh(self):
+        """
+        Apply products changed since the newest update seen. The query
+        includes that newest update, so products sharing its timestamp are
+        not missed; items no newer than the indexed copy are skipped, and
+        the version only moves when something changed.
+        """
+        changes = 0
+        query_kwargs = {
+            "TableName": self.table_name,
+            "IndexName": UPDATED_AT_INDEX,
+            "KeyConditionExpression": "catalog = :catalog AND updated_at >= :since",
+            "ExpressionAttributeValues": {
+                ":catalog": {"S": CATALOG_PARTITION},
+                ":since": {"S": self._newest_update or "0"},
+            },
+        }
+        while True:
+            inject_dynamodb_chaos()
+            response = self.dynamodb.query(**query_kwargs)
+            for item in response["Items"]:
+                changes += self._upsert(item)
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        self.refreshed_at = time.monotonic()
+        self.last_refresh_changes = changes
+        if changes:
+            self.version += 1
+
+    def search(
+        self,
+        category=None,
+        min_price=None,
+        max_price=None,
+        query=None,
+        sort="name",
+        offset=0,
+        limit=24,
+    ):
+        """
+        Products matching every given filter, as (json fragments, total).
+
+        `category` is a list of categories (any may match), `query` is
+        free text whose tokens must all match a name or description token
+        by prefix, and `sort` is one of SORT_KEYS.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+
+        candidates = None
+        if category:
+            candidates = set()
+            for name in category:
+                candidates |= self._by_category.get(name.lower(), set())
+        if min_price is not None or max_price is not None:
+            in_range = self._price_range(min_price, max_price)
+            candidates = self._intersect(candidates, in_range)
+        if query:
+            for token in tokenize(query):
+                candidates = self._intersect(candidates, self._token_matches(token))
+
+        ordered = self._sorted_ids(sort)
+        if candidates is not None:
+            ordered = [product_id for product_id in ordered if product_id in candidates]
+
+        page = ordered[offset : offset + limit]
+        return [self._json[product_id] for product_id in page], len(ordered)
+
+    def add_span_attributes(self, span):
+        """Export catalog state for this container as span attributes"""
+        span.set_attribute("catalog.size", len(self._products))
+        span.set_attribute("catalog.version", self.version)
+        span.set_attribute("catalog.categories", len(self._by_category))
+        span.set_attribute("catalog.last_refresh_changes", self.last_refresh_changes)
+        span.set_attribute("catalog.consecutive_failures", self.consecutive_failures)
+
+    def _scan_segment(self, segment):
+        items = []
+        scan_kwargs = {
+            "TableName": self.table_name,
+            "Segment": segment,
+            "TotalSegments": self.scan_segments,
+        }
+        while True:
+            inject_dynamodb_chaos()
+            response = self.dynamodb.scan(**scan_kwargs)
+            items.extend(response["Items"])
+            if "LastEvaluatedKey" not in response:
+                return items
+            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def _upsert(self, item, keep_sorted=True):
+        """
+        Index a wire-format product item, replacing any earlier version.
+        Returns False, changing nothing, if the item is no newer than the
+        version already seen. Without `keep_sorted` the price index is
+        appended to, and the caller must sort it.
+        """
+        product_id = item["product_id"]["S"]
+        updated_at = item.get("updated_at", {}).get("S", "")
+        seen = self._updated_at.get(product_id)
+        if seen is not None and updated_at <= seen:
+            return False
+
+        self._remove(product_id)
+        self._updated_at[product_id] = updated_at
+        if updated_at > self._newest_update:
+            self._newest_update = updated_at
+        if item.get("status", {}).get("S") == "DELETED":
+            return True
+
+        product = {
+            "name": item.get("name", {}).get("S", ""),
+            "description": item.get("description", {}).get("S", ""),
+            "category": item.get("category", {}).get("S", ""),
+            "price": Decimal(item.get("price", {}).get("N", "0")),
+        }
+        self._products[product_id] = product
+        self._json[product_id] = item_to_json(
+            {
+                public: item[attribute]
+                for attribute, public in PUBLIC_ATTRIBUTES.items()
+                if attribute in item
+            }
+        )
+
+        self._by_category.setdefault(product["category"].lower(), set()).add(product_id)
+        for token in tokenize(f"{product['name']} {product['description']}"):
+            self._by_token.setdefault(token, set()).add(product_id)
+        if keep_sorted:
+            insort(self._by_price, (product["price"], product_id))
+        else:
+            self._by_price.append((product["price"], product_id))
+
+        self._vocabulary = None
+        self._sorted.clear()
+        return True
+
+    def _remove(self, product_id):
+        product = self._products.pop(product_id, None)
+        if product is None:
+            return
+        self._json.pop(product_id)
+
+        category = product["category"].lower()
+        self._by_category[category].discard(product_id)
+        if not self._by_category[category]:
+            del self._by_category[category]
+
+        for token in tokenize(f"{product['name']} {product['description']}"):
+            self._by_token[token].discard(product_id)
+            if not self._by_token[token]:
+                del self._by_token[token]
+
+        position = bisect_left(self._by_price, (product["price"], product_id))
+        del self._by_price[position]
+
+        self._vocabulary = None
+        self._sorted.clear()
+
+    def _price_range(self, min_price, max_price):
+        start = 0
+        if min_price is not None:
+            start = bisect_left(self._by_price, (min_price, ""))
+        matches = set()
+        for price, product_id in self._by_price[start:]:
+            if max_price is not None and price > max_price:
+                break
+            matches.add(product_id)
+        return matches
+
+    def _token_matches(self, prefix):
+        """Products with any token starting with `prefix`"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._by_token)
+        matches = set()
+        start = bisect_left(self._vocabulary, prefix)
+        for token in islice(self._vocabulary, start, None):
+            if not token.startswith(prefix):
+                break
+            matches |= self._by_token[token]
+        return matches
+
+    def _sorted_ids(self, sort):
+        """All product IDs in `sort` order, cached until the index changes"""
+        if sort not in self._sorted:
+            field = sort.lstrip("-")
+            if field == "price":
+                ordered = [product_id for _, product_id in self._by_price]
+            else:
+                ordered = sorted(
+                    self._products,
+                    key=lambda product_id: (
+                        self._products[product_id]["name"].lower(),
+                        product_id,
+                    ),
+                )
+            if sort.startswith("-"):
+                ordered.reverse()
+            self._sorted[sort] = ordered
+        return self._sorted[sort]
+
+    @staticmethod
+    def _intersect(candidates, matches):
+        return matches if candidates is None else candidates & matches
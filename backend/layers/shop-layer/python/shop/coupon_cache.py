@@ -0,0 +1,175 @@
+import os
+import time
+from collections import OrderedDict
+from chaos_utils import inject_dynamodb_chaos
+from honeycomb.deadline import current_deadline
+
+USAGE_PROJECTION = "current_usage_count, max_usage_count"
+
+
+class CouponCache:
+    """
+    Warm-container cache of coupon definitions.
+
+    Definitions (status, expiry, discount) are kept in a bounded LRU for
+    `ttl_seconds`. Usage counts change on every redemption, so they are
+    re-read with a consistent projected read once older than
+    `usage_ttl_seconds` (0 means always fresh). Unknown codes are cached
+    in a separate, smaller LRU for `negative_ttl_seconds` so guessing
+    codes neither reaches DynamoDB nor evicts real coupons.
+
+    `usage_reader`, if given, replaces the projected re-read: it is called
+    with the cached coupon and returns attributes to merge into it (see
+    CouponUsage.usage_attributes).
+
+    The usage re-read is skipped when the invocation is short of time:
+    redemption enforces the limit atomically, so a stale count only
+    delays rejecting an exhausted coupon until the redeem.
+    """
+
+    def __init__(
+        self,
+        table,
+        max_size=None,
+        ttl_seconds=None,
+        usage_ttl_seconds=None,
+        negative_max_size=None,
+        negative_ttl_seconds=None,
+        usage_reader=None,
+    ):
+        self.table = table
+        self.usage_reader = usage_reader
+        self.max_size = int(max_size or os.environ.get("COUPON_CACHE_MAX_SIZE", 512))
+        self.ttl_seconds = float(
+            ttl_seconds
+            if ttl_seconds is not None
+            else os.environ.get("COUPON_CACHE_TTL_SECONDS", 300)
+        )
+        self.usage_ttl_seconds = float(
+            usage_ttl_seconds
+            if usage_ttl_seconds is not None
+            else os.environ.get("COUPON_CACHE_USAGE_TTL_SECONDS", 5)
+        )
+        self.negative_max_size = int(
+            negative_max_size or os.environ.get("COUPON_CACHE_NEGATIVE_MAX_SIZE", 4096)
+        )
+        self.negative_ttl_seconds = float(
+            negative_ttl_seconds
+            if negative_ttl_seconds is not None
+            else os.environ.get("COUPON_CACHE_NEGATIVE_TTL_SECONDS", 60)
+        )
+
+        self._entries = OrderedDict()
+        self._negative = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.usage_refreshes = 0
+        self.usage_refreshes_skipped = 0
+        self.last_result = None
+
+    def get_coupon(self, coupon_code):
+        """Return the coupon item for a code, or None if it does not exist"""
+        now = time.monotonic()
+
+        negative_expires_at = self._negative.get(coupon_code)
+        if negative_expires_at is not None:
+            if now < negative_expires_at:
+                self.negative_hits += 1
+                self.last_result = "negative_hit"
+                return None
+            del self._negative[coupon_code]
+
+        entry = self._entries.get(coupon_code)
+        if entry is not None and now < entry["expires_at"]:
+            self._entries.move_to_end(coupon_code)
+            self.hits += 1
+            self.last_result = "hit"
+            if now >= entry["usage_expires_at"]:
+                deadline = current_deadline()
+                if deadline is None or deadline.allows_optional("coupon_usage"):
+                    return self._refresh_usage(coupon_code, entry, now)
+                self.usage_refreshes_skipped += 1
+            return entry["coupon"]
+
+        self.misses += 1
+        self.last_result = "miss"
+        return self._load(coupon_code, now)
+
+    def invalidate(self, coupon_code):
+        """Forget everything cached for a code"""
+        self._entries.pop(coupon_code, None)
+        self._negative.pop(coupon_code, None)
+
+    def clear(self):
+        """Drop all cached entries"""
+        self._entries.clear()
+        self._negative.clear()
+
+    def add_span_attributes(self, span):
+        """Export cache counters for this container as span attributes"""
+        span.set_attribute("coupon_cache.result", self.last_result or "none")
+        span.set_attribute("coupon_cache.hits", self.hits)
+        span.set_attribute("coupon_cache.misses", self.misses)
+        span.set_attribute("coupon_cache.negative_hits", self.negative_hits)
+        span.set_attribute("coupon_cache.usage_refreshes", self.usage_refreshes)
+        span.set_attribute(
+            "coupon_cache.usage_refreshes_skipped", self.usage_refreshes_skipped
+        )
+        span.set_attribute("coupon_cache.size", len(self._entries))
+        span.set_attribute("coupon_cache.negative_size", len(self._negative))
+
+    def _load(self, coupon_code, now):
+        inject_dynamodb_chaos()
+        response = self.table.get_item(Key={"coupon_code": coupon_code})
+
+        if "Item" not in response:
+            self._entries.pop(coupon_code, None)
+            self._remember_missing(coupon_code, now)
+            return None
+
+        coupon = response["Item"]
+        if self.usage_reader is not None:
+            coupon = {**coupon, **self.usage_reader(coupon)}
+
+        self._entries[coupon_code] = {
+            "coupon": coupon,
+            "expires_at": now + self.ttl_seconds,
+            "usage_expires_at": now + self.usage_ttl_seconds,
+        }
+        self._entries.move_to_end(coupon_code)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return coupon
+
+    def _refresh_usage(self, coupon_code, entry, now):
+        self.usage_refreshes += 1
+
+        if self.usage_reader is not None:
+            entry["coupon"] = {**entry["coupon"], **self.usage_reader(entry["coupon"])}
+            entry["usage_expires_at"] = now + self.usage_ttl_seconds
+            return entry["coupon"]
+
+        inject_dynamodb_chaos()
+        response = self.table.get_item(
+            Key={"coupon_code": coupon_code},
+            ProjectionExpression=USAGE_PROJECTION,
+            ConsistentRead=True,
+        )
+
+        if "Item" not in response:
+            # Deleted since it was cached
+            del self._entries[coupon_code]
+            self._remember_missing(coupon_code, now)
+            return None
+
+        entry["coupon"] = {**entry["coupon"], **response["Item"]}
+        entry["usage_expires_at"] = now + self.usage_ttl_seconds
+        return entry["coupon"]
+
+    def _remember_missing(self, coupon_code, now):
+        self._negative[coupon_code] = now + self.negative_ttl_seconds
+        self._negative.move_to_end(coupon_code)
+        while len(self._negative) > self.negative_max_size:
+            self._negative.popitem(last=False)
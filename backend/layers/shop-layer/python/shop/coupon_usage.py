@@ -0,0 +1,163 @@
+import os
+import random
+from functools import cached_property
+from botocore.exceptions import ClientError
+from chaos_utils import inject_dynamodb_chaos
+from honeycomb.deadline import using_reserve
+from .dynamodb import batch_get_items
+
+DEFAULT_SHARD_COUNT = int(os.environ.get("COUPON_USAGE_SHARDS", 10))
+
+
+def shard_key(coupon_code, shard):
+    """Partition key of one usage counter shard"""
+    return f"{coupon_code}#{shard}"
+
+
+def stored_shard_count(coupon):
+    """The coupon's pinned shard count, or the current default if unpinned"""
+    return int(coupon.get("usage_shard_count", DEFAULT_SHARD_COUNT))
+
+
+def shard_limits(coupon, shard_count=None):
+    """
+    Per-shard redemption limits for a coupon, or None per shard if unlimited.
+
+    The remaining allowance (max_usage_count less the pre-sharding
+    current_usage_count) is split across shards so that the shard limits
+    sum exactly to it; a redemption that fits its shard can never
+    oversell the coupon.
+    """
+    if shard_count is None:
+        shard_count = stored_shard_count(coupon)
+    max_usage = int(coupon.get("max_usage_count", 0))
+    if max_usage <= 0:
+        return [None] * shard_count
+
+    remaining = max(0, max_usage - int(coupon.get("current_usage_count", 0)))
+    base, extra = divmod(remaining, shard_count)
+    return [base + (1 if shard < extra else 0) for shard in range(shard_count)]
+
+
+class CouponUsage:
+    """
+    Sharded, atomic coupon usage counters.
+
+    Each coupon's usage is spread over N counter items keyed
+    "<coupon_code>#<shard>", so concurrent redemptions of one popular
+    coupon land on different partitions. A redemption is a conditional
+    ADD on a random shard with spare capacity; the total is reconciled by
+    summing the shards.
+
+    The shard count is pinned on the coupon item (`usage_shard_count`) the
+    first time it is redeemed, so changing COUPON_USAGE_SHARDS later never
+    strands usage on shards that would no longer be checked or summed.
+    """
+
+    def __init__(self, dynamodb, table_name, coupons_table_name=None):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.coupons_table_name = coupons_table_name or os.environ["COUPONS_TABLE"]
+
+    @cached_property
+    def table(self):
+        # Built on first use so a lazily constructed resource stays unbuilt
+        return self.dynamodb.Table(self.table_name)
+
+    @cached_property
+    def coupons_table(self):
+        return self.dynamodb.Table(self.coupons_table_name)
+
+    def pin_shard_count(self, coupon):
+        """
+        Return the coupon's stored shard count, storing the current default
+        first if it has none. The stored value wins a race with another
+        writer. The count is also set on `coupon`, which updates a cached
+        copy in place.
+        """
+        if "usage_shard_count" in coupon:
+            return int(coupon["usage_shard_count"])
+
+        inject_dynamodb_chaos()
+        response = self.coupons_table.update_item(
+            Key={"coupon_code": coupon["coupon_code"]},
+            UpdateExpression=(
+                "SET usage_shard_count = if_not_exists(usage_shard_count, :count)"
+            ),
+            ConditionExpression="attribute_exists(coupon_code)",
+            ExpressionAttributeValues={":count": DEFAULT_SHARD_COUNT},
+            ReturnValues="UPDATED_NEW",
+        )
+        coupon["usage_shard_count"] = int(response["Attributes"]["usage_shard_count"])
+        return coupon["usage_shard_count"]
+
+    def redeem(self, coupon):
+        """Atomically take one use; return the shard used, or None if exhausted"""
+        coupon_code = coupon["coupon_code"]
+        limits = shard_limits(coupon, self.pin_shard_count(coupon))
+
+        shards = [shard for shard, limit in enumerate(limits) if limit != 0]
+        random.shuffle(shards)
+
+        for shard in shards:
+            try:
+                self._increment(coupon_code, shard, limits[shard])
+                return shard
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        return None
+
+    def release(self, coupon_code, shard):
+        """
+        Give back a use taken by redeem(), e.g. when the order fails. This
+        may spend the invocation's reserved time, as it often runs after
+        the deadline has cut the order short.
+        """
+        with using_reserve():
+            inject_dynamodb_chaos()
+            try:
+                self.table.update_item(
+                    Key={"shard_key": shard_key(coupon_code, shard)},
+                    UpdateExpression="ADD usage_count :minus_one",
+                    ConditionExpression="usage_count > :zero",
+                    ExpressionAttributeValues={":minus_one": -1, ":zero": 0},
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+
+    def get_usage_count(self, coupon):
+        """Reconciled usage: pre-sharding usage plus the sum of all shards"""
+        coupon_code = coupon["coupon_code"]
+        shard_count = stored_shard_count(coupon)
+
+        keys = [
+            {"shard_key": shard_key(coupon_code, shard)} for shard in range(shard_count)
+        ]
+
+        inject_dynamodb_chaos()
+        shards = batch_get_items(
+            self.dynamodb, self.table_name, keys, projection="usage_count"
+        )
+        redeemed = sum(int(item.get("usage_count", 0)) for item in shards)
+        return int(coupon.get("current_usage_count", 0)) + redeemed
+
+    def usage_attributes(self, coupon):
+        """Usage attributes merged into cached coupons by CouponCache"""
+        return {"redeemed_count": self.get_usage_count(coupon)}
+
+    def _increment(self, coupon_code, shard, limit):
+        kwargs = {
+            "Key": {"shard_key": shard_key(coupon_code, shard)},
+            "UpdateExpression": "ADD usage_count :one",
+            "ExpressionAttributeValues": {":one": 1},
+        }
+        if limit is not None:
+            kwargs["ConditionExpression"] = (
+                "attribute_not_exists(usage_count) OR usage_count < :limit"
+            )
+            kwargs["ExpressionAttributeValues"][":limit"] = limit
+
+        inject_dynamodb_chaos()
+        self.table.update_item(**kwargs)
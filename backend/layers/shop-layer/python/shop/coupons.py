@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from opentelemetry import trace
+from honeycomb.common_attributes import add_span_status
+from honeycomb.enums import HoneycombStatus
+
+tracer = trace.get_tracer(__name__)
+
+
+def validate_coupon(coupon_code, coupon_cache, coupon_usage=None):
+    """
+    Validate a coupon code against its status, expiry and usage limit.
+
+    Returns {"valid": True, "discount_percentage": ..., "coupon_code": ...}
+    or {"valid": False, "error": ...}. Failures are recorded on the child
+    spans; the caller decides how to report them on its own span.
+
+    If `coupon_usage` is given, a valid coupon is also atomically redeemed
+    and the result carries the "usage_shard" to pass to
+    CouponUsage.release() should the order fail.
+    """
+
+    # Query DynamoDB for coupon
+    with tracer.start_as_current_span("query_coupon_dynamodb") as db_span:
+        db_span.set_attribute("coupon.code", coupon_code)
+
+        coupon = coupon_cache.get_coupon(coupon_code)
+        coupon_cache.add_span_attributes(db_span)
+
+        if coupon is None:
+            db_span.set_attribute("error.no_data", "Coupon code not found")
+            add_span_status(db_span, HoneycombStatus.FAILURE)
+            return {"valid": False, "error": "Invalid coupon code"}
+
+        add_span_status(db_span, HoneycombStatus.SUCCESS)
+
+    # Validate coupon status
+    with tracer.start_as_current_span("validate_coupon_rules") as validate_span:
+        validate_span.set_attribute("coupon.status", coupon.get("status", "UNKNOWN"))
+
+        # Check if coupon is active
+        if coupon.get("status") != "ACTIVE":
+            error_msg = f"Coupon is {coupon.get('status', 'inactive')}"
+            validate_span.set_attribute("error.invalid_data", error_msg)
+            add_span_status(validate_span, HoneycombStatus.FAILURE)
+            return {"valid": False, "error": error_msg}
+
+        # Check expiry date
+        expiry_date = coupon.get("expiry_date")
+        if expiry_date:
+            expiry = datetime.fromisoformat(expiry_date)
+            now = datetime.now(timezone.utc)
+            if expiry < now:
+                error_msg = f"Coupon expired on {expiry_date}"
+                validate_span.set_attribute("error.invalid_data", error_msg)
+                validate_span.set_attribute("coupon.expiry_date", expiry_date)
+                add_span_status(validate_span, HoneycombStatus.FAILURE)
+                return {"valid": False, "error": error_msg}
+
+        # Check usage limit
+        max_usage = int(coupon.get("max_usage_count", 0))
+        current_usage = int(
+            coupon.get("redeemed_count", coupon.get("current_usage_count", 0))
+        )
+
+        validate_span.set_attribute("coupon.max_usage", max_usage)
+        validate_span.set_attribute("coupon.current_usage", current_usage)
+
+        if max_usage > 0 and current_usage >= max_usage:
+            error_msg = "Coupon usage limit exceeded"
+            validate_span.set_attribute("error.invalid_data", error_msg)
+            add_span_status(validate_span, HoneycombStatus.FAILURE)
+            return {"valid": False, "error": error_msg}
+
+        add_span_status(validate_span, HoneycombStatus.SUCCESS)
+
+    # Coupon is valid
+    result = {
+        "valid": True,
+        "discount_percentage": float(coupon.get("discount_percentage", 0)),
+        "coupon_code": coupon_code,
+    }
+
+    if coupon_usage is not None:
+        with tracer.start_as_current_span("redeem_coupon") as redeem_span:
+            redeem_span.set_attribute("coupon.code", coupon_code)
+
+            shard = coupon_usage.redeem(coupon)
+            if shard is None:
+                error_msg = "Coupon usage limit exceeded"
+                redeem_span.set_attribute("error.invalid_data", error_msg)
+                add_span_status(redeem_span, HoneycombStatus.FAILURE)
+                return {"valid": False, "error": error_msg}
+
+            redeem_span.set_attribute("coupon.usage_shard", shard)
+            add_span_status(redeem_span, HoneycombStatus.SUCCESS)
+            result["usage_shard"] = shard
+
+    return result
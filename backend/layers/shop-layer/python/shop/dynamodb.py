@@ -0,0 +1,197 @@
+import base64
+import random
+import re
+import time
+from decimal import Decimal
+from json.encoder import encode_basestring_ascii
+from botocore.exceptions import ClientError
+from honeycomb.deadline import current_deadline
+
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+MAX_ATTEMPTS = 8
+BASE_BACKOFF_SECONDS = 0.05
+MAX_BACKOFF_SECONDS = 2.0
+
+RETRYABLE_ERROR_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "InternalServerError",
+    "ServiceUnavailable",
+}
+
+
+def backoff(attempt):
+    """
+    Sleep with exponential backoff and full jitter, cut short so the
+    invocation's deadline is left time for the retry
+    """
+    delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2**attempt))
+    delay = random.uniform(0, delay)
+    deadline = current_deadline()
+    if deadline is not None:
+        delay = deadline.cap_sleep(delay)
+    time.sleep(delay)
+
+
+def chunked(items, size):
+    """Yield successive lists of at most `size` items"""
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def batch_get_items(
+    dynamodb,
+    table_name,
+    keys,
+    projection=None,
+    consistent_read=False,
+    attribute_names=None,
+):
+    """
+    Fetch items by key with BatchGetItem, chunked to the 100 key limit.
+
+    UnprocessedKeys are retried with backoff. Works with both the boto3
+    resource and the low-level client, returning items in whichever
+    format `dynamodb` uses. Raises RuntimeError if keys remain
+    unprocessed after MAX_ATTEMPTS.
+    """
+    items = []
+    for chunk in chunked(list(keys), BATCH_GET_LIMIT):
+        request = {"Keys": chunk, "ConsistentRead": consistent_read}
+        if projection:
+            request["ProjectionExpression"] = projection
+        if attribute_names:
+            request["ExpressionAttributeNames"] = attribute_names
+        request_items = {table_name: request}
+
+        for attempt in range(MAX_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(response.get("Responses", {}).get(table_name, []))
+
+            request_items = response.get("UnprocessedKeys") or {}
+            if not request_items:
+                break
+            backoff(attempt)
+        else:
+            raise RuntimeError(f"BatchGetItem left unprocessed keys for {table_name}")
+
+    return items
+
+
+def batch_write_items(dynamodb, table_name, items, on_error=None):
+    """
+    Put items with BatchWriteItem, chunked to the 25 item limit.
+
+    UnprocessedItems, and whole chunks rejected with a retryable error
+    (e.g. throttling that outlasted the SDK's own retries), are retried
+    with backoff. Items still unwritten after MAX_ATTEMPTS are returned rather
+    than raised, so callers can report per-item results; an empty list
+    means everything was written.
+
+    An error that stops the writes partway (a non-retryable ClientError,
+    or DeadlineExceeded once the invocation runs out of time) is not
+    raised either: chunks already written stay written, and the failed
+    chunk's remaining items and every later chunk are returned as
+    unwritten. The error is passed to `on_error`, if given.
+    """
+    failed = []
+    chunks = list(chunked(list(items), BATCH_WRITE_LIMIT))
+    for position, chunk in enumerate(chunks):
+        requests = [{"PutRequest": {"Item": item}} for item in chunk]
+
+        try:
+            for attempt in range(MAX_ATTEMPTS):
+                try:
+                    response = dynamodb.batch_write_item(
+                        RequestItems={table_name: requests}
+                    )
+                except ClientError as e:
+                    if e.response["Error"]["Code"] not in RETRYABLE_ERROR_CODES:
+                        raise
+                    backoff(attempt)
+                    continue
+
+                requests = (response.get("UnprocessedItems") or {}).get(
+                    table_name, []
+                )
+                if not requests:
+                    break
+                backoff(attempt)
+            else:
+                failed.extend(request["PutRequest"]["Item"] for request in requests)
+        except Exception as e:
+            if on_error is not None:
+                on_error(e)
+            failed.extend(request["PutRequest"]["Item"] for request in requests)
+            for later in chunks[position + 1 :]:
+                failed.extend(later)
+            break
+
+    return failed
+
+
+# JSON number grammar; DynamoDB N values matching it are emitted verbatim
+JSON_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+
+
+def json_number(value):
+    """JSON text for a DynamoDB N value, keeping its exact digits"""
+    if JSON_NUMBER.fullmatch(value):
+        return value
+    return format(Decimal(value), "f")
+
+
+def binary_json(value):
+    """JSON string text holding a binary value as base64"""
+    return '"' + base64.b64encode(value).decode() + '"'
+
+
+def wire_to_json(value):
+    """
+    JSON text for one low-level (wire format) DynamoDB attribute value.
+
+    Numbers keep the exact digits DynamoDB returned instead of going
+    through Decimal and float, and no intermediate Python objects are
+    built. Binary values are emitted as base64 strings.
+    """
+    (kind, data), = value.items()
+    if kind == "S":
+        return encode_basestring_ascii(data)
+    if kind == "N":
+        return json_number(data)
+    if kind == "M":
+        return item_to_json(data)
+    if kind == "L":
+        return "[" + ",".join(map(wire_to_json, data)) + "]"
+    if kind == "BOOL":
+        return "true" if data else "false"
+    if kind == "NULL":
+        return "null"
+    if kind == "SS":
+        return "[" + ",".join(map(encode_basestring_ascii, data)) + "]"
+    if kind == "NS":
+        return "[" + ",".join(map(json_number, data)) + "]"
+    if kind == "B":
+        return binary_json(data)
+    if kind == "BS":
+        return "[" + ",".join(map(binary_json, data)) + "]"
+    raise ValueError(f"Unsupported DynamoDB type: {kind}")
+
+
+def item_to_json(item):
+    """JSON object text for a wire-format item (or M value)"""
+    return (
+        "{"
+        + ",".join(
+            encode_basestring_ascii(name) + ":" + wire_to_json(value)
+            for name, value in item.items()
+        )
+        + "}"
+    )
+
+
+def items_to_json(items):
+    """JSON array text for a list of wire-format items"""
+    return "[" + ",".join(map(item_to_json, items)) + "]"
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import time
+from botocore.exceptions import ClientError
+from chaos_utils import inject_dynamodb_chaos
+from honeycomb.deadline import current_deadline
+
+IN_PROGRESS = "IN_PROGRESS"
+COMPLETED = "COMPLETED"
+
+
+class IdempotencyError(Exception):
+    status_code = 409
+
+    def __init__(self, msg) -> None:
+        self.msg = msg
+
+    def __str__(self) -> str:
+        return json.dumps({"Error": self.msg})
+
+
+class IdempotencyInProgressError(IdempotencyError):
+    status_code = 409
+
+
+class IdempotencyKeyMismatchError(IdempotencyError):
+    status_code = 422
+
+
+def hash_request(body):
+    """Fingerprint of a request body, to detect key reuse with a different payload"""
+    return hashlib.sha256((body or "").encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Records idempotency keys so retried requests replay the first response.
+
+    begin() claims a key with a conditional put. A key already COMPLETED
+    returns its stored response; a key IN_PROGRESS elsewhere is polled
+    for up to `wait_seconds`, or as long as the invocation's deadline
+    allows, before giving up with a 409. An in-progress
+    claim whose lease has lapsed (e.g. the first invocation timed out)
+    can be taken over. Records expire via the table's TTL attribute.
+    """
+
+    def __init__(self, table, ttl_seconds=None, lease_seconds=None, wait_seconds=None):
+        self.table = table
+        self.ttl_seconds = int(
+            ttl_seconds or os.environ.get("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60)
+        )
+        self.lease_seconds = int(
+            lease_seconds or os.environ.get("IDEMPOTENCY_LEASE_SECONDS", 30)
+        )
+        self.wait_seconds = float(
+            wait_seconds
+            if wait_seconds is not None
+            else os.environ.get("IDEMPOTENCY_WAIT_SECONDS", 3)
+        )
+        self.poll_interval_seconds = 0.1
+
+    def begin(self, key, request_hash):
+        """Claim a key; return None if claimed, else the stored response to replay"""
+        now = int(time.time())
+
+        try:
+            inject_dynamodb_chaos()
+            self.table.put_item(
+                Item={
+                    "idempotency_key": key,
+                    "status": IN_PROGRESS,
+                    "request_hash": request_hash,
+                    "lease_expires_at": now + self.lease_seconds,
+                    "expires_at": now + self.ttl_seconds,
+                },
+                ConditionExpression=(
+                    "attribute_not_exists(idempotency_key) OR expires_at < :now "
+                    "OR (#status = :in_progress AND lease_expires_at < :now)"
+                ),
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":now": now, ":in_progress": IN_PROGRESS},
+            )
+            return None
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+        return self._wait_for_completion(key, request_hash)
+
+    def complete(self, key, response):
+        """Store the final response for replay"""
+        inject_dynamodb_chaos()
+        self.table.update_item(
+            Key={"idempotency_key": key},
+            UpdateExpression="SET #status = :completed, #response = :response",
+            ExpressionAttributeNames={"#status": "status", "#response": "response"},
+            ExpressionAttributeValues={
+                ":completed": COMPLETED,
+                ":response": json.dumps(response),
+            },
+        )
+
+    def abandon(self, key):
+        """Release a claim so a retry can run the request again"""
+        inject_dynamodb_chaos()
+        self.table.delete_item(Key={"idempotency_key": key})
+
+    def _wait_for_completion(self, key, request_hash):
+        wait_until = time.monotonic() + self.wait_seconds
+        invocation = current_deadline()
+
+        while True:
+            inject_dynamodb_chaos()
+            record = self.table.get_item(
+                Key={"idempotency_key": key}, ConsistentRead=True
+            ).get("Item")
+
+            if record is None:
+                # Abandoned by the other request: claim it ourselves
+                return self.begin(key, request_hash)
+
+            if record.get("request_hash") != request_hash:
+                raise IdempotencyKeyMismatchError(
+                    "Idempotency-Key was already used with a different request"
+                )
+
+            if record.get("status") == COMPLETED:
+                response = json.loads(record["response"])
+                response.setdefault("headers", {})["Idempotent-Replayed"] = "true"
+                return response
+
+            if int(record["lease_expires_at"]) < int(time.time()):
+                # The other request outlived its lease: take over
+                return self.begin(key, request_hash)
+
+            # Poll again only if there is time left for the read after it
+            pause = min(self.poll_interval_seconds, wait_until - time.monotonic())
+            if invocation is not None:
+                pause = invocation.cap_sleep(pause)
+            if pause <= 0:
+                raise IdempotencyInProgressError(
+                    "A request with this Idempotency-Key is still in progress"
+                )
+            time.sleep(pause)
@@ -0,0 +1,177 @@
+from datetime import datetime
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from chaos_utils import inject_dynamodb_chaos
+from .dynamodb import chunked
+
+# Counted once: the order is marked in the same transaction as the update
+UNCOUNTED_ORDER_CONDITION = (
+    "#status = :created AND attribute_not_exists(stats_recorded_at)"
+)
+
+# Totals are added; the first and latest order fields move only outwards
+TOTALS_UPDATE = "ADD order_count :count, total_spent :total SET updated_at = :now"
+FIRST_ORDER_UPDATE = "first_order_at = :first_at"
+FIRST_ORDER_CONDITION = (
+    "(attribute_not_exists(first_order_at) OR first_order_at > :first_at)"
+)
+LATEST_ORDER_UPDATE = (
+    "last_order_id = :id, last_order_at = :last_at, last_order_total = :last_total"
+)
+LATEST_ORDER_CONDITION = (
+    "(attribute_not_exists(last_order_id) OR last_order_id < :id)"
+)
+
+# Transactions take at most 100 actions: the order marks and one stats update
+MAX_TRANSACTION_ORDERS = 99
+
+
+def cancellation_codes(error):
+    """Per-action cancellation codes of a cancelled transaction, else None"""
+    if error.response["Error"]["Code"] != "TransactionCanceledException":
+        return None
+    return [
+        reason.get("Code", "None")
+        for reason in error.response.get("CancellationReasons", [])
+    ]
+
+
+def summarise(orders):
+    """Stats update values for one user's wire-format orders"""
+    latest = max(orders, key=lambda order: order["order_id"]["S"])
+    return {
+        ":count": {"N": str(len(orders))},
+        ":total": {
+            "N": str(sum(Decimal(order["total_price"]["N"]) for order in orders))
+        },
+        ":first_at": min(
+            (order["created_at"] for order in orders), key=lambda value: value["S"]
+        ),
+        ":now": {"S": datetime.utcnow().isoformat()},
+        ":id": latest["order_id"],
+        ":last_at": latest["created_at"],
+        ":last_total": latest["total_price"],
+    }
+
+
+def extends(stored, attribute, value, before=False):
+    """
+    Whether `value` should replace the stored attribute: always while the
+    stored stats are unknown (None), else if it is unset or `value` is
+    later (or, with `before`, earlier) than it
+    """
+    if stored is None or attribute not in stored:
+        return True
+    current = stored[attribute]["S"]
+    return value["S"] < current if before else value["S"] > current
+
+
+class OrderStats:
+    """
+    Per-user order totals, one item per user.
+
+    The update-order-stats function adds CREATED orders from the orders
+    table stream with an atomic ADD of their count and total, so the
+    aggregate stays correct under concurrent orders and an account view
+    reads it with a single GetItem however many orders the user has.
+    Order IDs are ULIDs, so the latest order is the one with the greatest
+    ID; it only replaces the stored one when newer, and first_order_at
+    only moves earlier. A stats update made on assumptions its condition
+    disproves is retried from the stored values the failure returns.
+
+    Stream records may be delivered more than once, so each user's update
+    is a transaction that also sets `stats_recorded_at` on every order it
+    adds, conditional on it being unset: a redelivered order is dropped
+    from the transaction rather than counted again.
+
+    `dynamodb` is a low-level client; orders are wire-format items, as
+    found in stream records.
+    """
+
+    def __init__(self, dynamodb, table_name, orders_table_name):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.orders_table_name = orders_table_name
+
+    def record(self, orders):
+        """Add one user's CREATED orders to their stats; returns how many were new"""
+        return sum(
+            self._add(chunk) for chunk in chunked(orders, MAX_TRANSACTION_ORDERS)
+        )
+
+    def _add(self, orders):
+        # The stored stats, once a failed condition has returned them
+        stored = None
+        while orders:
+            inject_dynamodb_chaos()
+            try:
+                self._transact(orders, stored)
+                return len(orders)
+            except ClientError as e:
+                codes = cancellation_codes(e)
+                if codes is None:
+                    raise
+                counted = {
+                    index
+                    for index, code in enumerate(codes[:-1])
+                    if code == "ConditionalCheckFailed"
+                }
+                if counted:
+                    orders = [
+                        order
+                        for index, order in enumerate(orders)
+                        if index not in counted
+                    ]
+                elif codes[-1] == "ConditionalCheckFailed":
+                    # The orders are older or newer than assumed: retry,
+                    # moving only the fields they actually extend
+                    stored = e.response["CancellationReasons"][-1].get("Item", {})
+                else:
+                    raise
+        return 0
+
+    def _transact(self, orders, stored):
+        values = summarise(orders)
+        sets = []
+        conditions = []
+        if extends(stored, "first_order_at", values[":first_at"], before=True):
+            sets.append(FIRST_ORDER_UPDATE)
+            conditions.append(FIRST_ORDER_CONDITION)
+        else:
+            del values[":first_at"]
+        if extends(stored, "last_order_id", values[":id"]):
+            sets.append(LATEST_ORDER_UPDATE)
+            conditions.append(LATEST_ORDER_CONDITION)
+        else:
+            for name in (":id", ":last_at", ":last_total"):
+                del values[name]
+
+        stats_update = {
+            "TableName": self.table_name,
+            "Key": {"user_id": orders[0]["user_id"]},
+            "UpdateExpression": ", ".join([TOTALS_UPDATE] + sets),
+            "ExpressionAttributeValues": values,
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+        if conditions:
+            stats_update["ConditionExpression"] = " AND ".join(conditions)
+
+        marks = [
+            {
+                "Update": {
+                    "TableName": self.orders_table_name,
+                    "Key": {"user_id": order["user_id"], "order_id": order["order_id"]},
+                    "UpdateExpression": "SET stats_recorded_at = :now",
+                    "ConditionExpression": UNCOUNTED_ORDER_CONDITION,
+                    "ExpressionAttributeNames": {"#status": "status"},
+                    "ExpressionAttributeValues": {
+                        ":now": values[":now"],
+                        ":created": {"S": "CREATED"},
+                    },
+                }
+            }
+            for order in orders
+        ]
+        self.dynamodb.transact_write_items(
+            TransactItems=marks + [{"Update": stats_update}]
+        )
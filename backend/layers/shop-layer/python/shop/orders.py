@@ -0,0 +1,143 @@
+from datetime import datetime, time, timezone
+from decimal import Decimal
+
+# ULIDs are a 48-bit millisecond timestamp (10 chars) then 80 random bits
+# (16 chars) in Crockford base32, so order IDs sort by creation time
+CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ULID_TIME_LENGTH = 10
+ULID_RANDOM_LENGTH = 16
+
+# Sparse index over orders still PENDING, for the stale order sweep; the
+# attribute is removed when an order is finalised
+PENDING_INDEX = "pending-index"
+PENDING_ATTRIBUTE = "pending_status"
+
+
+def validate_order_items(items):
+    """Raise ValueError if an order's items are not acceptable"""
+    if not isinstance(items, list):
+        raise ValueError("Order items must be a list")
+    if not items:
+        raise ValueError("Order must contain at least one item")
+
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Each item must be an object")
+        product_id = item.get("product_id")
+        if not product_id or not isinstance(product_id, str):
+            raise ValueError("Item product_id is required")
+        quantity = item.get("quantity")
+        if not isinstance(quantity, int) or isinstance(quantity, bool):
+            raise ValueError("Item quantity must be a whole number")
+        if quantity <= 0:
+            raise ValueError("Item quantity must be positive")
+
+
+def calculate_base_price(items):
+    """Total of price x quantity across items, before any discount"""
+    return sum(item["price"] * item["quantity"] for item in items)
+
+
+def apply_discount(total_price, discount_percentage):
+    """Apply a percentage discount, rounded to two decimal places"""
+    if not discount_percentage:
+        return total_price
+    return round(total_price * (1 - discount_percentage / 100), 2)
+
+
+def build_order(
+    order_id,
+    user_context,
+    session_id,
+    items,
+    coupon_code,
+    discount,
+    total_price,
+    status="CREATED",
+):
+    """Build the orders table item, converting numbers to Decimal for DynamoDB"""
+    items_decimal = [
+        {
+            **item,
+            "price": Decimal(str(item["price"])),
+            "quantity": item["quantity"],
+        }
+        for item in items
+    ]
+
+    return {
+        "user_id": user_context["user_id"],
+        "order_id": order_id,
+        "session_id": session_id,
+        "user_email": user_context["email"],
+        "items": items_decimal,
+        "coupon_code": coupon_code or "none",
+        "discount_percentage": Decimal(str(discount)),
+        "total_price": Decimal(str(total_price)),
+        "status": status,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+
+def build_pending_order(order_id, user_context, session_id, items, coupon_code):
+    """
+    Build the orders table item for an order accepted for asynchronous
+    processing. Only product IDs and quantities are kept; the worker adds
+    prices, discount and total when it finalises the order. Until then the
+    order is listed in PENDING_INDEX.
+    """
+    return {
+        "user_id": user_context["user_id"],
+        "order_id": order_id,
+        "session_id": session_id,
+        "user_email": user_context["email"],
+        "items": [
+            {"product_id": item["product_id"], "quantity": item["quantity"]}
+            for item in items
+        ],
+        "coupon_code": coupon_code or "none",
+        "status": "PENDING",
+        PENDING_ATTRIBUTE: "PENDING",
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+
+def ulid_time_prefix(moment):
+    """Timestamp part of any ULID generated at `moment`"""
+    timestamp_ms = int(moment.timestamp() * 1000)
+    chars = []
+    for _ in range(ULID_TIME_LENGTH):
+        chars.append(CROCKFORD_BASE32[timestamp_ms & 31])
+        timestamp_ms >>= 5
+    return "".join(reversed(chars))
+
+
+def ulid_lower_bound(moment):
+    """Smallest ULID with a timestamp at or after `moment`"""
+    return ulid_time_prefix(moment) + "0" * ULID_RANDOM_LENGTH
+
+
+def ulid_upper_bound(moment):
+    """Largest ULID with a timestamp at or before `moment`"""
+    return ulid_time_prefix(moment) + "Z" * ULID_RANDOM_LENGTH
+
+
+def parse_order_date(value, end_of_day=False):
+    """
+    Parse an ISO date or datetime query parameter as UTC.
+
+    A bare date means the start of that day, or its last millisecond when
+    `end_of_day` is set, so ?to=2025-03-31 includes the whole day.
+    """
+    try:
+        if len(value) == 10:
+            day = datetime.fromisoformat(value).date()
+            moment = datetime.combine(day, time.max if end_of_day else time.min)
+        else:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
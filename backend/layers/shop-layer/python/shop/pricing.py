@@ -0,0 +1,121 @@
+import os
+import time
+from collections import OrderedDict
+from chaos_utils import inject_dynamodb_chaos
+from .dynamodb import batch_get_items
+
+PRICE_PROJECTION = "product_id, #name, price, #status"
+PRICE_ATTRIBUTE_NAMES = {"#name": "name", "#status": "status"}
+
+
+class PriceResolver:
+    """
+    Authoritative product names and prices for order items.
+
+    Prices come from the products table, never from the client. Products
+    seen recently are kept in a bounded LRU for `ttl_seconds`; everything
+    else a cart needs is fetched in a single BatchGetItem, so pricing an
+    order is at most one round trip whatever its size.
+    """
+
+    def __init__(self, dynamodb, table_name, ttl_seconds=None, max_size=None):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.ttl_seconds = float(
+            ttl_seconds
+            if ttl_seconds is not None
+            else os.environ.get("PRICE_CACHE_TTL_SECONDS", 60)
+        )
+        self.max_size = int(max_size or os.environ.get("PRICE_CACHE_MAX_SIZE", 4096))
+
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    def get_products(self, product_ids):
+        """
+        Name and price of each product, as {product_id: product}. Products
+        that do not exist or have been deleted are left out.
+        """
+        now = time.monotonic()
+        products = {}
+        missing = []
+        for product_id in set(product_ids):
+            entry = self._entries.get(product_id)
+            if entry is not None and now < entry["expires_at"]:
+                self._entries.move_to_end(product_id)
+                products[product_id] = entry["product"]
+                self.hits += 1
+            else:
+                missing.append(product_id)
+
+        if missing:
+            self.misses += len(missing)
+            products.update(self._fetch(missing, now))
+        return products
+
+    def price_items(self, items, products=None):
+        """
+        Order items with the stored name and price of each product.
+
+        `products` is a get_products result covering the items, for callers
+        pricing several orders from one lookup. Raises ValueError naming
+        any unknown product.
+        """
+        product_ids = [item["product_id"] for item in items]
+        if products is None:
+            products = self.get_products(product_ids)
+
+        unknown = sorted(set(product_ids) - products.keys())
+        if unknown:
+            raise ValueError(f"Unknown product: {', '.join(unknown)}")
+        return [
+            {
+                "product_id": item["product_id"],
+                "name": products[item["product_id"]]["name"],
+                "price": products[item["product_id"]]["price"],
+                "quantity": item["quantity"],
+            }
+            for item in items
+        ]
+
+    def clear(self):
+        """Drop all cached prices"""
+        self._entries.clear()
+
+    def add_span_attributes(self, span):
+        """Export price cache counters for this container as span attributes"""
+        span.set_attribute("price_cache.hits", self.hits)
+        span.set_attribute("price_cache.misses", self.misses)
+        span.set_attribute("price_cache.fetches", self.fetches)
+        span.set_attribute("price_cache.size", len(self._entries))
+
+    def _fetch(self, product_ids, now):
+        inject_dynamodb_chaos()
+        self.fetches += 1
+        items = batch_get_items(
+            self.dynamodb,
+            self.table_name,
+            [{"product_id": product_id} for product_id in product_ids],
+            projection=PRICE_PROJECTION,
+            attribute_names=PRICE_ATTRIBUTE_NAMES,
+        )
+
+        products = {}
+        for item in items:
+            if item.get("status") == "DELETED":
+                self._entries.pop(item["product_id"], None)
+                continue
+            product = {"name": item["name"], "price": float(item["price"])}
+            products[item["product_id"]] = product
+            self._entries[item["product_id"]] = {
+                "product": product,
+                "expires_at": now + self.ttl_seconds,
+            }
+            self._entries.move_to_end(item["product_id"])
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return products
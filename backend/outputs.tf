@@ -33,6 +33,11 @@ output "order_api_url" {
   value       = aws_api_gateway_stage.main.invoke_url
 }
 
+output "catalog_url" {
+  description = "Product catalog URL cached by CloudFront"
+  value       = "https://${aws_cloudfront_distribution.amplify.domain_name}/products"
+}
+
 output "orders_table_name" {
   description = "DynamoDB Orders Table Name"
   value       = aws_dynamodb_table.orders.name
@@ -58,6 +63,11 @@ output "create_order_function_arn" {
   value       = module.create_order_lambda.lambda_function_arn
 }
 
+output "create_orders_batch_function_arn" {
+  description = "Create Orders Batch Lambda Function ARN"
+  value       = module.create_orders_batch_lambda.lambda_function_arn
+}
+
 output "get_order_function_arn" {
   description = "Get Order Lambda Function ARN"
   value       = module.get_order_lambda.lambda_function_arn
@@ -68,6 +78,16 @@ output "list_orders_function_arn" {
   value       = module.list_orders_lambda.lambda_function_arn
 }
 
+output "process_orders_function_arn" {
+  description = "Process Orders Lambda Function ARN"
+  value       = module.process_orders_lambda.lambda_function_arn
+}
+
+output "update_order_stats_function_arn" {
+  description = "Update Order Stats Lambda Function ARN"
+  value       = module.update_order_stats_lambda.lambda_function_arn
+}
+
 output "coupon_service_function_arn" {
   description = "Coupon Service Lambda Function ARN"
   value       = module.coupon_service_lambda.lambda_function_arn
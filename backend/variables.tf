@@ -24,3 +24,19 @@ variable "honeycomb_dataset" {
   type        = string
   default     = "shop-trace"
 }
+
+variable "order_processing_mode" {
+  description = "sync saves orders in the create-order request; async returns 202 and finalises them in process-orders"
+  type        = string
+  default     = "sync"
+  validation {
+    condition     = contains(["sync", "async"], var.order_processing_mode)
+    error_message = "Order processing mode must be sync or async"
+  }
+}
+
+variable "response_compression" {
+  description = "Compress large GET responses in the functions; also sets the API's binary media types to */* so API Gateway decodes them"
+  type        = bool
+  default     = false
+}
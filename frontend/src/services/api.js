@@ -63,7 +63,8 @@ export const orderService = {
   async listProducts() {
     return tracer.startActiveSpan('listProducts', async (span) => {
       try {
-        const response = await api.get('/products')
+        // The CloudFront-cached catalog when configured, else the API directly
+        const response = await api.get(import.meta.env.VITE_CATALOG_URL || '/products')
         span.setAttribute('product.count', response.data.length)
         return response.data
       } finally {
@@ -72,12 +73,18 @@ export const orderService = {
     })
   },
 
-  async createOrder(items, couponCode = null) {
+  // Pass the same idempotencyKey when retrying an order so the backend
+  // replays the original response instead of creating a second order
+  async createOrder(items, couponCode = null, idempotencyKey = uuidv4()) {
     return tracer.startActiveSpan('createOrder', async (span) => {
       try {
         span.setAttribute('order.items_count', items.length)
         if (couponCode) span.setAttribute('order.coupon_code', couponCode)
-        const response = await api.post('/orders', { items, coupon_code: couponCode })
+        const response = await api.post(
+          '/orders',
+          { items, coupon_code: couponCode },
+          { headers: { 'Idempotency-Key': idempotencyKey } }
+        )
         span.setAttribute('order.id', response.data.order_id)
         return response.data
       } finally {
@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
-"""Insert sample coupon data into DynamoDB"""
+"""Insert coupons into DynamoDB: the sample set, a CSV/JSONL file or generated codes"""
 
-import boto3
+import argparse
+import csv
+import hashlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+import boto3
+from botocore.config import Config
 
 # Configuration
 ENVIRONMENT = "dev"
 TABLE_NAME = f"{ENVIRONMENT}-coupons"
 
+CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
 # Sample coupons
 COUPONS = [
     {
@@ -62,24 +75,248 @@ COUPONS = [
 ]
 
 
-def insert_coupons():
-    """Insert coupons into DynamoDB"""
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(TABLE_NAME)
+def read_rows(path):
+    """Stream coupon rows from a .csv or .jsonl file ("-" reads JSONL from stdin)"""
+    if path == "-":
+        for line in sys.stdin:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def token(seed, index, length):
+    """Unguessable but repeatable code fragment for the index-th coupon"""
+    digest = int.from_bytes(hashlib.sha256(f"{seed}:{index}".encode()).digest(), "big")
+    chars = []
+    for _ in range(length):
+        digest, remainder = divmod(digest, 32)
+        chars.append(CROCKFORD_BASE32[remainder])
+    return "".join(chars)
+
+
+def generate_rows(pattern, total, seed, token_length):
+    """
+    Rows for `total` codes from a pattern such as "SPRING-{token}" or
+    "SPRING-{index:07d}". Codes depend only on the seed and index, so a
+    resumed run regenerates exactly the codes it skipped.
+    """
+    for index in range(total):
+        yield {
+            "coupon_code": pattern.format(
+                index=index, token=token(seed, index, token_length)
+            )
+        }
 
-    print(f"Inserting coupons into {TABLE_NAME}...")
 
-    for coupon in COUPONS:
+def to_item(row, defaults):
+    """Coupons table item from an input row, filling missing fields"""
+    item = {**defaults, **{key: value for key, value in row.items() if value != ""}}
+    if not item.get("coupon_code"):
+        raise ValueError(f"Row has no coupon_code: {row}")
+    item["coupon_code"] = str(item["coupon_code"]).strip().upper()
+    try:
+        item["discount_percentage"] = Decimal(str(item["discount_percentage"]))
+    except InvalidOperation:
+        raise ValueError(
+            f"discount_percentage is not a number: {item['discount_percentage']!r}"
+        )
+    item["max_usage_count"] = int(item["max_usage_count"])
+    item["current_usage_count"] = int(item.get("current_usage_count", 0))
+    item["usage_shard_count"] = int(item["usage_shard_count"])
+    return item
+
+
+def to_items(rows, defaults, start_at):
+    """Items for rows numbered from `start_at`, naming the row that fails"""
+    for index, row in enumerate(rows, start_at):
         try:
-            table.put_item(Item=coupon)
-            print(
-                f"✓ Inserted: {coupon['coupon_code']} ({coupon['discount_percentage']}% off)"
+            yield to_item(row, defaults)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError(f"Row {index} is invalid: {e}") from e
+
+
+class Progress:
+    """Thread-safe count of written items, with periodic and final reports"""
+
+    def __init__(self, interval=5.0):
+        self.written = 0
+        self.started_at = time.monotonic()
+        self._reported_at = self.started_at
+        self._interval = interval
+        self._lock = threading.Lock()
+
+    def add(self, written):
+        with self._lock:
+            self.written += written
+            now = time.monotonic()
+            if now - self._reported_at >= self._interval:
+                self._reported_at = now
+                print(f"  {self.written:,} coupons, {self.rate():,.0f}/sec")
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started_at
+        return self.written / elapsed if elapsed else 0.0
+
+
+def write_chunk(table_for_thread, items, progress):
+    """Write one chunk; batch_writer resubmits unprocessed items until done"""
+    with table_for_thread().batch_writer(overwrite_by_pkeys=["coupon_code"]) as batch:
+        for item in items:
+            batch.put_item(Item=item)
+    progress.add(len(items))
+
+
+def load_coupons(rows, args):
+    """
+    Write rows to the table in chunks across a thread pool. Only a bounded
+    number of chunks is in memory at once, so input of any size streams
+    through. Returns the Progress of coupons written (or, on a dry run,
+    validated).
+    """
+    defaults = {
+        "status": args.status,
+        "discount_percentage": args.discount,
+        "expiry_date": (
+            datetime.now(timezone.utc) + timedelta(days=args.expires_in_days)
+        ).isoformat(),
+        "max_usage_count": args.max_usage,
+        "current_usage_count": 0,
+        "usage_shard_count": args.usage_shards,
+    }
+
+    rows = islice(rows, args.start_at, None)
+    if args.limit is not None:
+        rows = islice(rows, args.limit)
+    items = to_items(rows, defaults, args.start_at)
+
+    progress = Progress()
+    if args.dry_run:
+        for item in items:
+            progress.add(1)
+            if progress.written <= 3:
+                print(f"  would write {item}")
+        return progress
+
+    # boto3 resources are not thread-safe: one per worker thread
+    config = Config(
+        retries={"mode": "adaptive", "max_attempts": 10},
+        max_pool_connections=args.workers,
+    )
+    local = threading.local()
+
+    def table_for_thread():
+        if not hasattr(local, "table"):
+            session = boto3.session.Session()
+            local.table = session.resource("dynamodb", config=config).Table(
+                args.table
             )
-        except Exception as e:
-            print(f"✗ Failed to insert {coupon['coupon_code']}: {e}")
+        return local.table
+
+    # Chunk start offset -> future; the lowest unfinished offset (or, if
+    # every chunk submitted was written, the chunk being read) is where a
+    # failed or interrupted run can safely resume
+    in_flight = {}
+    offset = args.start_at
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            while True:
+                chunk = list(islice(items, args.chunk_size))
+                if not chunk:
+                    break
+                future = executor.submit(write_chunk, table_for_thread, chunk, progress)
+                in_flight[offset] = future
+                offset += len(chunk)
+
+                if len(in_flight) >= args.workers * 2:
+                    wait(in_flight.values(), return_when=FIRST_COMPLETED)
+                    for offset, done in list(in_flight.items()):
+                        if done.done():
+                            done.result()
+                            del in_flight[offset]
+
+            for offset in sorted(in_flight):
+                in_flight[offset].result()
+    except (Exception, KeyboardInterrupt):
+        pending = [
+            offset
+            for offset, future in in_flight.items()
+            if not future.done() or future.exception()
+        ]
+        print(f"\nStopped; resume with --start-at {min(pending, default=offset)}")
+        raise
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--file", help="CSV or JSONL file of coupons, - for stdin")
+    source.add_argument(
+        "--pattern",
+        help='Generate codes, e.g. "SPRING-{token}" or "SPRING-{index:07d}"',
+    )
+    parser.add_argument("--count", type=int, help="Codes to generate with --pattern")
+    parser.add_argument("--seed", help="Secret seed for {token}; keep it to resume")
+    parser.add_argument("--token-length", type=int, default=10)
+
+    parser.add_argument("--table", default=TABLE_NAME)
+    parser.add_argument("--status", default="ACTIVE")
+    parser.add_argument("--discount", default="10")
+    parser.add_argument("--expires-in-days", type=int, default=30)
+    parser.add_argument(
+        "--max-usage", type=int, default=1, help="Uses per code; 1 for single-use"
+    )
+
+    parser.add_argument(
+        "--usage-shards",
+        type=int,
+        default=10,
+        help="Usage counter shards stored on each coupon (COUPON_USAGE_SHARDS)",
+    )
+
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument(
+        "--start-at", type=int, default=0, help="Skip this many input rows"
+    )
+    parser.add_argument("--limit", type=int, help="Write at most this many coupons")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.file:
+        rows = read_rows(args.file)
+    elif args.pattern:
+        if args.count is None:
+            parser.error("--pattern needs --count")
+        if "{token" in args.pattern and not args.seed:
+            parser.error("{token} patterns need --seed")
+        rows = generate_rows(args.pattern, args.count, args.seed, args.token_length)
+    else:
+        rows = iter(COUPONS)
+
+    action = "Validating" if args.dry_run else "Inserting"
+    print(f"{action} coupons for {args.table}...")
+
+    try:
+        progress = load_coupons(rows, args)
+    except ValueError as e:
+        # Bad input rather than a bug: the message names the row
+        sys.exit(str(e))
 
-    print("\nDone!")
+    print(
+        f"\nDone! {progress.written:,} coupons in "
+        f"{time.monotonic() - progress.started_at:.1f}s "
+        f"({progress.rate():,.0f}/sec)"
+    )
 
 
 if __name__ == "__main__":
-    insert_coupons()
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Insert sample product data into DynamoDB"""
+
+import boto3
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# Configuration
+ENVIRONMENT = "dev"
+TABLE_NAME = f"{ENVIRONMENT}-products"
+
+# Partition value of the updated_at index used for incremental catalog refresh
+CATALOG_PARTITION = "products"
+
+# Sample products
+PRODUCTS = [
+    {
+        "product_id": "1",
+        "name": "Wireless Headphones",
+        "description": "Premium noise-cancelling wireless headphones",
+        "price": Decimal("299.99"),
+        "image": "https://placehold.co/300x200/1976D2/white?text=Headphones",
+        "category": "Electronics",
+    },
+    {
+        "product_id": "2",
+        "name": "Smart Watch",
+        "description": "Fitness tracking smartwatch with heart rate monitor",
+        "price": Decimal("199.99"),
+        "image": "https://placehold.co/300x200/1976D2/white?text=Smart+Watch",
+        "category": "Electronics",
+    },
+    {
+        "product_id": "3",
+        "name": "Laptop Backpack",
+        "description": "Durable laptop backpack with multiple compartments",
+        "price": Decimal("79.99"),
+        "image": "https://placehold.co/300x200/1976D2/white?text=Backpack",
+        "category": "Accessories",
+    },
+    {
+        "product_id": "4",
+        "name": "Bluetooth Speaker",
+        "description": "Portable waterproof Bluetooth speaker",
+        "price": Decimal("89.99"),
+        "image": "https://placehold.co/300x200/1976D2/white?text=Speaker",
+        "category": "Electronics",
+    },
+    {
+        "product_id": "5",
+        "name": "USB-C Hub",
+        "description": "7-in-1 USB-C hub with HDMI and card reader",
+        "price": Decimal("49.99"),
+        "image": "https://placehold.co/300x200/1976D2/white?text=USB+Hub",
+        "category": "Accessories",
+    },
+    {
+        "product_id": "6",
+        "name": "Wireless Mouse",
+        "description": "Ergonomic wireless mouse with precision tracking",
+        "price": Decimal("39.99"),
+        "image": "https://placehold.co/300x200/1976D2/white?text=Mouse",
+        "category": "Accessories",
+    },
+]
+
+
+def insert_products():
+    """Insert products into DynamoDB"""
+    dynamodb = boto3.resource("dynamodb")
+    table = dynamodb.Table(TABLE_NAME)
+    updated_at = datetime.now(timezone.utc).isoformat()
+
+    print(f"Inserting products into {TABLE_NAME}...")
+
+    with table.batch_writer() as batch:
+        for product in PRODUCTS:
+            batch.put_item(
+                Item={
+                    **product,
+                    "catalog": CATALOG_PARTITION,
+                    "status": "ACTIVE",
+                    "updated_at": updated_at,
+                }
+            )
+            print(f"✓ Inserted: {product['name']} (${product['price']})")
+
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    insert_products()